@@ -0,0 +1,203 @@
+"""
+Versioned feature schema shared by ml-serving and ml-training.
+
+``schemas/<version>.json`` fixes, for each ``feature_version``, the
+feature columns in order, the matrix dtype, and each feature's nested path
+and default. Both services compile it into the same ``FeatureExtractor``, so
+a record becomes the same vector at training and at inference time.
+
+Installed from ``ml-common`` by both services' requirements.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+FEATURE_VERSION = os.getenv("FEATURE_VERSION", "1.0.0")
+SCHEMA_DIR = Path(os.getenv("FEATURE_SCHEMA_DIR", str(Path(__file__).resolve().parent / "schemas")))
+
+FEATURE_CATEGORIES = ("engagement", "emotional", "performance", "behavioral", "profile", "social")
+
+
+class UnknownFeatureVersionError(ValueError):
+    pass
+
+
+def derive_feature_path(name: str) -> Tuple[str, ...]:
+    """Nested path for a flattened name outside any schema: ``<category>_<key>`` or a top-level key."""
+    category, _, key = name.partition("_")
+    if category in FEATURE_CATEGORIES and key:
+        return (category, key)
+    return (name,)
+
+
+def _to_number(value: Any) -> float:
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _lookup(record: Any, path: Tuple[str, ...]) -> Any:
+    for key in path:
+        if type(record) is not dict:
+            return None
+        record = record.get(key)
+    return record
+
+
+class FeatureExtractor:
+    """
+    Turns nested feature records into rows of a fixed column order.
+
+    Missing, null, NaN and non-numeric values take the column default and
+    booleans become 1/0. Each category dict is looked up once per record.
+    """
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        paths: Sequence[Tuple[str, ...]],
+        defaults: Sequence[float],
+        dtype: Any = np.float32,
+    ):
+        self.names = tuple(names)
+        self.paths = tuple(tuple(path) for path in paths)
+        self.dtype = np.dtype(dtype)
+        self.defaults = np.asarray(defaults, dtype=self.dtype)
+
+        # Two-level paths grouped by category; anything else is looked up generically
+        groups: Dict[str, List[Tuple[int, str]]] = {}
+        self._other: List[Tuple[int, Tuple[str, ...]]] = []
+        for index, path in enumerate(self.paths):
+            if len(path) == 2:
+                groups.setdefault(path[0], []).append((index, path[1]))
+            else:
+                self._other.append((index, path))
+        self._groups = [(category, [key for _, key in members]) for category, members in groups.items()]
+        order = [index for members in groups.values() for index, _ in members] + [index for index, _ in self._other]
+        self._order = np.array(order, dtype=np.intp)
+        self._ordered_defaults = self.defaults[self._order] if len(order) else self.defaults
+
+    def _convert(self, values: List[Any], defaults: np.ndarray) -> np.ndarray:
+        try:
+            array = np.array(values, dtype=np.float64)  # None -> NaN, bool -> 1/0
+        except (TypeError, ValueError):
+            array = np.array([_to_number(value) for value in values], dtype=np.float64)
+        missing = np.isnan(array)
+        if missing.any():
+            array[missing] = defaults[missing] if np.ndim(defaults) else defaults
+        return array
+
+    def row(self, features: Dict[str, Any]) -> np.ndarray:
+        """One record as a 1-D array of length ``len(names)``."""
+        values: List[Any] = []
+        for category, keys in self._groups:
+            group = features.get(category) if type(features) is dict else None
+            if type(group) is dict:
+                values.extend([group.get(key) for key in keys])
+            else:
+                values.extend([None] * len(keys))
+        values.extend(_lookup(features, path) for _, path in self._other)
+
+        row = np.empty(len(self.names), dtype=self.dtype)
+        row[self._order] = self._convert(values, self._ordered_defaults)
+        return row
+
+    def vector(self, features: Dict[str, Any]) -> np.ndarray:
+        return self.row(features).reshape(1, -1)
+
+    def matrix(self, records: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Many records as an (n, k) row-major matrix."""
+        matrix = np.empty((len(records), len(self.names)), dtype=self.dtype)
+        self._fill(records, matrix)
+        return matrix
+
+    def columns(self, records: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Many records as a (k, n) array with one contiguous row per feature."""
+        columns = np.empty((len(self.names), len(records)), dtype=self.dtype)
+        self._fill(records, columns.T)
+        return columns
+
+    def _fill(self, records: Sequence[Dict[str, Any]], out: np.ndarray) -> None:
+        # Column at a time: one list of values and one conversion per feature
+        if not len(records):
+            return
+        index = iter(self._order)
+        for category, keys in self._groups:
+            groups = [record.get(category) if type(record) is dict else None for record in records]
+            groups = [group if type(group) is dict else None for group in groups]
+            for key in keys:
+                column = next(index)
+                values = [group.get(key) if group is not None else None for group in groups]
+                out[:, column] = self._convert(values, self.defaults[column])
+        for column, path in self._other:
+            out[:, column] = self._convert([_lookup(record, path) for record in records], self.defaults[column])
+
+
+class FeatureSchema:
+    def __init__(self, version: str, features: List[Dict[str, Any]], dtype: str = "float32"):
+        self.version = version
+        self.dtype = np.dtype(dtype)
+        self.features = features
+        self.names: List[str] = [feature["name"] for feature in features]
+        self.paths: Dict[str, Tuple[str, ...]] = {feature["name"]: tuple(feature["path"]) for feature in features}
+        self.defaults: Dict[str, float] = {feature["name"]: float(feature.get("default", 0.0)) for feature in features}
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "FeatureSchema":
+        return cls(payload["version"], payload["features"], payload.get("dtype", "float32"))
+
+    def path(self, name: str) -> Tuple[str, ...]:
+        return self.paths.get(name) or derive_feature_path(name)
+
+    def extractor(self, names: Optional[Sequence[str]] = None, dtype: Any = None) -> FeatureExtractor:
+        """Extractor for ``names`` (the full schema by default); names outside the schema use derived paths."""
+        return _compile(self, tuple(names) if names is not None else tuple(self.names), np.dtype(dtype or self.dtype))
+
+
+@lru_cache(maxsize=128)
+def _compile(schema: FeatureSchema, names: Tuple[str, ...], dtype: np.dtype) -> FeatureExtractor:
+    return FeatureExtractor(
+        names,
+        [schema.path(name) for name in names],
+        [schema.defaults.get(name, 0.0) for name in names],
+        dtype,
+    )
+
+
+def available_versions() -> List[str]:
+    return sorted(path.stem for path in SCHEMA_DIR.glob("*.json"))
+
+
+@lru_cache(maxsize=16)
+def load_schema(version: str = FEATURE_VERSION) -> FeatureSchema:
+    path = SCHEMA_DIR / f"{version}.json"
+    if not path.exists():
+        raise UnknownFeatureVersionError(
+            f"No feature schema for version '{version}' in {SCHEMA_DIR} (available: {', '.join(available_versions())})"
+        )
+    with path.open("r", encoding="utf-8") as fp:
+        return FeatureSchema.from_dict(json.load(fp))
+
+
+def get_schema(version: Optional[str] = None) -> FeatureSchema:
+    """Schema for ``version``; unknown versions get an empty schema, so every name uses a derived path."""
+    try:
+        return load_schema(version or FEATURE_VERSION)
+    except UnknownFeatureVersionError:
+        return _empty_schema(version or FEATURE_VERSION)
+
+
+@lru_cache(maxsize=16)
+def _empty_schema(version: str) -> FeatureSchema:
+    return FeatureSchema(version, [])
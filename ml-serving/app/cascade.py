@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import os
+import random
+import threading
+from typing import Any, Dict
+
+from .rule_based import determine_risk_level
+
+
+CASCADE_ENABLED = os.getenv("RISK_CASCADE_ENABLED", "false").lower() in {"1", "true", "yes"}
+CASCADE_BAND_LOW = float(os.getenv("RISK_CASCADE_BAND_LOW", "30"))
+CASCADE_BAND_HIGH = float(os.getenv("RISK_CASCADE_BAND_HIGH", "70"))
+CASCADE_AUDIT_RATE = float(os.getenv("RISK_CASCADE_AUDIT_RATE", "0.05"))
+
+
+def in_uncertainty_band(rule_score: float) -> bool:
+    return CASCADE_BAND_LOW <= rule_score <= CASCADE_BAND_HIGH
+
+
+def should_audit() -> bool:
+    return CASCADE_AUDIT_RATE > 0 and random.random() < CASCADE_AUDIT_RATE
+
+
+class CascadeStats:
+    """Counters for one model type, used to tune the uncertainty band."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.skipped = 0
+        self.band_calls = 0
+        self.audit_calls = 0
+        self.band_agreements = 0
+        self.audit_agreements = 0
+        self.abs_error_total = 0.0
+        self.model_calls_timed = 0
+        self.model_cpu_seconds = 0.0
+
+    def record_skip(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.skipped += 1
+
+    def record_model_call(self, audit: bool, rule_score: float, model_score: float, cpu_seconds: float) -> None:
+        agrees = determine_risk_level(rule_score) == determine_risk_level(model_score)
+        with self._lock:
+            self.requests += 1
+            if audit:
+                self.audit_calls += 1
+                self.audit_agreements += int(agrees)
+            else:
+                self.band_calls += 1
+                self.band_agreements += int(agrees)
+            self.abs_error_total += abs(rule_score - model_score)
+            self.model_calls_timed += 1
+            self.model_cpu_seconds += cpu_seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            model_calls = self.band_calls + self.audit_calls
+            avg_cpu = self.model_cpu_seconds / self.model_calls_timed if self.model_calls_timed else 0.0
+            return {
+                "requests": self.requests,
+                "model_calls": model_calls,
+                "skipped": self.skipped,
+                "model_call_rate": round(model_calls / self.requests, 4) if self.requests else None,
+                "audit_calls": self.audit_calls,
+                # How often the model confirms a "decisive" rule-based level; low values mean the band is too narrow
+                "audit_agreement_rate": round(self.audit_agreements / self.audit_calls, 4) if self.audit_calls else None,
+                "band_agreement_rate": round(self.band_agreements / self.band_calls, 4) if self.band_calls else None,
+                "mean_abs_score_gap": round(self.abs_error_total / model_calls, 3) if model_calls else None,
+                "avg_model_cpu_ms": round(avg_cpu * 1000, 3),
+                "estimated_cpu_saved_seconds": round(self.skipped * avg_cpu, 3),
+            }
+
+
+CASCADE_STATS: Dict[str, CascadeStats] = {
+    "dropout": CascadeStats(),
+    "burnout": CascadeStats(),
+}
+
+
+def cascade_report() -> Dict[str, Any]:
+    return {
+        "enabled": CASCADE_ENABLED,
+        "band": [CASCADE_BAND_LOW, CASCADE_BAND_HIGH],
+        "audit_rate": CASCADE_AUDIT_RATE,
+        "models": {model_type: stats.snapshot() for model_type, stats in CASCADE_STATS.items()},
+    }
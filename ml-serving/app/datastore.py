@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from supabase import Client, create_client
+
+try:
+    from psycopg2 import pool as pg_pool
+    from psycopg2.extras import RealDictCursor
+except ImportError:  # pragma: no cover - optional dependency for the direct backend
+    pg_pool = None
+    RealDictCursor = None
+
+
+FeaturePath = Tuple[str, ...]
+
+_SAFE_KEY = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+@lru_cache(maxsize=1)
+def get_supabase() -> Client:
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not key:
+        raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+    return create_client(url, key)
+
+
+def _timestamp(value: Any) -> Optional[str]:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _safe_paths(paths: Optional[Sequence[FeaturePath]]) -> Optional[Sequence[FeaturePath]]:
+    # Paths are inlined into SQL / select lists, so only plain identifiers are projected
+    if paths is None or not all(_SAFE_KEY.match(key) for path in paths for key in path):
+        return None
+    return paths
+
+
+def _nest(values: Dict[FeaturePath, Any]) -> Dict[str, Any]:
+    features: Dict[str, Any] = {}
+    for path, value in values.items():
+        if value is None:
+            continue  # absent in the stored vector; let defaults apply as with a full read
+        node = features
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return features
+
+
+def _feature_record(row: Dict[str, Any], features: Dict[str, Any], version: str) -> Dict[str, Any]:
+    return {
+        "student_id": row.get("student_id"),
+        "feature_version": row.get("feature_version") or version,
+        "feature_timestamp": _timestamp(row.get("extraction_timestamp")),
+        "features": features,
+    }
+
+
+class FeatureStoreBackend:
+    """Data access for the two hot lookups: latest feature row(s) and the deployed model."""
+
+    name = "base"
+
+    def latest_feature_row(
+        self,
+        student_id: str,
+        version: str,
+        paths: Optional[Sequence[FeaturePath]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        rows = self.latest_feature_rows([student_id], version, paths)
+        return rows.get(student_id)
+
+    def latest_feature_rows(
+        self,
+        student_ids: Sequence[str],
+        version: str,
+        paths: Optional[Sequence[FeaturePath]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        raise NotImplementedError
+
+    def deployed_model(self, model_type: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class PostgrestBackend(FeatureStoreBackend):
+    name = "postgrest"
+
+    @staticmethod
+    def _select(paths: Optional[Sequence[FeaturePath]]) -> Tuple[str, Dict[str, FeaturePath]]:
+        if paths is None:
+            return "*", {}
+        aliases = {f"f{index}": path for index, path in enumerate(paths)}
+        columns = ["student_id", "feature_version", "extraction_timestamp"] + [
+            f"{alias}:features->{'->'.join(path)}" for alias, path in aliases.items()
+        ]
+        return ",".join(columns), aliases
+
+    @staticmethod
+    def _record(row: Dict[str, Any], aliases: Dict[str, FeaturePath], version: str) -> Dict[str, Any]:
+        if aliases:
+            features = _nest({path: row.get(alias) for alias, path in aliases.items()})
+        else:
+            features = row.get("features", {})
+        return _feature_record(row, features, version)
+
+    def latest_feature_row(self, student_id, version, paths=None):
+        columns, aliases = self._select(_safe_paths(paths))
+        response = (
+            get_supabase()
+            .table("ml_feature_store")
+            .select(columns)
+            .eq("student_id", student_id)
+            .eq("feature_version", version)
+            .order("extraction_timestamp", desc=True)
+            .limit(1)
+            .execute()
+        )
+        if not response.data:
+            return None
+        return self._record(response.data[0], aliases, version)
+
+    def latest_feature_rows(self, student_ids, version, paths=None):
+        columns, aliases = self._select(_safe_paths(paths))
+        response = (
+            get_supabase()
+            .table("ml_feature_store")
+            .select(columns)
+            .in_("student_id", list(student_ids))
+            .eq("feature_version", version)
+            .order("extraction_timestamp", desc=True)
+            .execute()
+        )
+
+        records: Dict[str, Dict[str, Any]] = {}
+        for row in response.data or []:
+            student_id = row.get("student_id")
+            if student_id in records:
+                continue  # rows are newest-first; keep the latest per student
+            records[student_id] = self._record(row, aliases, version)
+        return records
+
+    def deployed_model(self, model_type):
+        response = (
+            get_supabase()
+            .table("ml_model_versions")
+            .select("*")
+            .eq("model_type", model_type)
+            .eq("deployed", True)
+            .order("deployed_at", desc=True)
+            .limit(1)
+            .execute()
+        )
+        return response.data[0] if response.data else None
+
+
+class PostgresBackend(FeatureStoreBackend):
+    """
+    Direct connection-pooled access, skipping the PostgREST HTTP hop.
+
+    Queries are server-side prepared once per pooled connection; projected
+    feature reads get one prepared statement per distinct path set.
+    """
+
+    name = "postgres"
+
+    def __init__(self, dsn: str, min_connections: int = 1, max_connections: int = 10):
+        if pg_pool is None:
+            raise RuntimeError("psycopg2 is required for ML_DATA_BACKEND=postgres")
+        self._pool = pg_pool.ThreadedConnectionPool(min_connections, max_connections, dsn)
+        self._prepared: Dict[int, set] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _projection(paths: Optional[Sequence[FeaturePath]]) -> Tuple[str, str]:
+        if paths is None:
+            return "features", "full"
+        columns = ", ".join(
+            f"features #> '{{{','.join(path)}}}' AS f{index}" for index, path in enumerate(paths)
+        )
+        signature = hashlib.sha1(repr(tuple(paths)).encode()).hexdigest()[:10]
+        return columns or "NULL AS f_none", signature
+
+    def _execute(self, name: str, definition: str, args: Tuple[Any, ...]) -> List[Dict[str, Any]]:
+        conn = self._pool.getconn()
+        try:
+            conn.autocommit = True
+            with self._lock:
+                prepared = self._prepared.setdefault(id(conn), set())
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                if name not in prepared:
+                    cursor.execute(f"PREPARE {name} AS {definition}")
+                    prepared.add(name)
+                placeholders = ", ".join(["%s"] * len(args))
+                cursor.execute(f"EXECUTE {name} ({placeholders})", args)
+                rows = [dict(row) for row in cursor.fetchall()]
+        except Exception:
+            with self._lock:
+                self._prepared.pop(id(conn), None)
+            self._pool.putconn(conn, close=True)
+            raise
+
+        self._pool.putconn(conn)
+        return rows
+
+    def _records(self, rows, paths, version) -> Dict[str, Dict[str, Any]]:
+        records = {}
+        for row in rows:
+            if paths is None:
+                features = row.get("features") or {}
+            else:
+                features = _nest({path: row.get(f"f{index}") for index, path in enumerate(paths)})
+            records[str(row["student_id"])] = _feature_record(
+                {**row, "student_id": str(row["student_id"])}, features, version
+            )
+        return records
+
+    def latest_feature_row(self, student_id, version, paths=None):
+        paths = _safe_paths(paths)
+        columns, signature = self._projection(paths)
+        rows = self._execute(
+            f"latest_feature_row_{signature}",
+            f"SELECT student_id, feature_version, extraction_timestamp, {columns} "
+            "FROM ml_feature_store WHERE student_id = $1::uuid AND feature_version = $2 "
+            "ORDER BY extraction_timestamp DESC LIMIT 1",
+            (student_id, version),
+        )
+        return self._records(rows, paths, version).get(student_id)
+
+    def latest_feature_rows(self, student_ids, version, paths=None):
+        paths = _safe_paths(paths)
+        columns, signature = self._projection(paths)
+        rows = self._execute(
+            f"latest_feature_rows_{signature}",
+            f"SELECT DISTINCT ON (student_id) student_id, feature_version, extraction_timestamp, {columns} "
+            "FROM ml_feature_store WHERE student_id = ANY($1::uuid[]) AND feature_version = $2 "
+            "ORDER BY student_id, extraction_timestamp DESC",
+            (list(student_ids), version),
+        )
+        return self._records(rows, paths, version)
+
+    def deployed_model(self, model_type):
+        rows = self._execute(
+            "deployed_model",
+            "SELECT * FROM ml_model_versions WHERE model_type = $1 AND deployed "
+            "ORDER BY deployed_at DESC LIMIT 1",
+            (model_type,),
+        )
+        if not rows:
+            return None
+        return {key: _timestamp(value) for key, value in rows[0].items()}
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ml_feature_store (
+  id TEXT PRIMARY KEY,
+  student_id TEXT NOT NULL,
+  feature_version TEXT NOT NULL DEFAULT '1.0.0',
+  features TEXT NOT NULL,
+  extraction_timestamp TEXT,
+  created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ml_feature_store_lookup
+  ON ml_feature_store(student_id, feature_version, extraction_timestamp DESC);
+
+CREATE TABLE IF NOT EXISTS ml_model_versions (
+  id TEXT PRIMARY KEY,
+  model_name TEXT NOT NULL,
+  version TEXT NOT NULL,
+  model_type TEXT NOT NULL,
+  training_data_count INTEGER DEFAULT 0,
+  accuracy_metrics TEXT DEFAULT '{}',
+  hyperparameters TEXT DEFAULT '{}',
+  model_path TEXT,
+  deployed INTEGER DEFAULT 0,
+  deployed_at TEXT,
+  created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ml_model_versions_deployed
+  ON ml_model_versions(model_type, deployed, deployed_at DESC);
+"""
+
+
+class SqliteBackend(FeatureStoreBackend):
+    """Local stand-in with the same tables, for tests and benchmarks."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(SQLITE_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _projection(paths: Optional[Sequence[FeaturePath]]) -> str:
+        if paths is None:
+            return "features"
+        return ", ".join(
+            f"json_extract(features, '$.{'.'.join(path)}') AS f{index}" for index, path in enumerate(paths)
+        ) or "NULL AS f_none"
+
+    def _records(self, rows, paths, version) -> Dict[str, Dict[str, Any]]:
+        records: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            row = dict(row)
+            if row["student_id"] in records:
+                continue
+            if paths is None:
+                features = json.loads(row.get("features") or "{}")
+            else:
+                features = _nest({path: row.get(f"f{index}") for index, path in enumerate(paths)})
+            records[row["student_id"]] = _feature_record(row, features, version)
+        return records
+
+    def latest_feature_row(self, student_id, version, paths=None):
+        paths = _safe_paths(paths)
+        rows = self._connection().execute(
+            f"SELECT student_id, feature_version, extraction_timestamp, {self._projection(paths)} "
+            "FROM ml_feature_store WHERE student_id = ? AND feature_version = ? "
+            "ORDER BY extraction_timestamp DESC LIMIT 1",
+            (student_id, version),
+        ).fetchall()
+        return self._records(rows, paths, version).get(student_id)
+
+    def latest_feature_rows(self, student_ids, version, paths=None):
+        paths = _safe_paths(paths)
+        student_ids = list(student_ids)
+        placeholders = ", ".join("?" * len(student_ids))
+        rows = self._connection().execute(
+            f"SELECT student_id, feature_version, extraction_timestamp, {self._projection(paths)} "
+            f"FROM ml_feature_store WHERE student_id IN ({placeholders}) AND feature_version = ? "
+            "ORDER BY extraction_timestamp DESC",
+            (*student_ids, version),
+        ).fetchall()
+        return self._records(rows, paths, version)
+
+    def deployed_model(self, model_type):
+        row = self._connection().execute(
+            "SELECT * FROM ml_model_versions WHERE model_type = ? AND deployed = 1 "
+            "ORDER BY deployed_at DESC LIMIT 1",
+            (model_type,),
+        ).fetchone()
+        if row is None:
+            return None
+        metadata = dict(row)
+        for key in ("accuracy_metrics", "hyperparameters"):
+            if isinstance(metadata.get(key), str):
+                metadata[key] = json.loads(metadata[key])
+        metadata["deployed"] = bool(metadata.get("deployed"))
+        return metadata
+
+
+@lru_cache(maxsize=1)
+def get_data_backend() -> FeatureStoreBackend:
+    backend = os.getenv("ML_DATA_BACKEND", "postgrest").lower()
+    if backend == "postgrest":
+        return PostgrestBackend()
+
+    database_url = os.getenv("DATABASE_URL")
+    if backend == "postgres":
+        if not database_url:
+            raise RuntimeError("DATABASE_URL must be set for ML_DATA_BACKEND=postgres")
+        return PostgresBackend(
+            database_url,
+            min_connections=int(os.getenv("DATABASE_POOL_MIN", "1")),
+            max_connections=int(os.getenv("DATABASE_POOL_MAX", "10")),
+        )
+    if backend == "sqlite":
+        path = (database_url or "sqlite:///ml_serving.sqlite3").removeprefix("sqlite:///")
+        return SqliteBackend(path)
+
+    raise RuntimeError(f"Unknown ML_DATA_BACKEND '{backend}'")
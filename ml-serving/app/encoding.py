@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Type, TypeVar
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional fast JSON encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional binary encoder
+    msgpack = None
+
+
+M = TypeVar("M", bound=BaseModel)
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def construct(model_cls: Type[M], **fields: Any) -> M:
+    """Build a response model from values the service already produced, skipping validation."""
+    if hasattr(model_cls, "model_construct"):
+        return model_cls.model_construct(**fields)
+    return model_cls.construct(**fields)  # pydantic v1
+
+
+def dump(model: BaseModel) -> Dict[str, Any]:
+    if hasattr(model, "model_dump"):
+        return model.model_dump()
+    return model.dict()  # pydantic v1
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} as msgpack")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} as JSON")
+
+
+def negotiate(request: Request) -> str:
+    accept = request.headers.get("accept", "")
+    if msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES):
+        return "msgpack"
+    return "json"
+
+
+def encode_response(payload: BaseModel, request: Request, status_code: int = 200) -> Response:
+    """
+    Serialise a response model according to the caller's ``Accept`` header.
+
+    Returning a ``Response`` directly bypasses FastAPI's response_model
+    re-validation and ``jsonable_encoder`` pass; the models handed in here are
+    built by the service itself.
+    """
+    if negotiate(request) == "msgpack":
+        body = msgpack.packb(dump(payload), default=_msgpack_default, use_bin_type=True)
+        return Response(content=body, status_code=status_code, media_type="application/msgpack")
+
+    if hasattr(payload, "model_dump_json"):
+        # pydantic v2 serialises straight to bytes in its core; faster than orjson over model_dump()
+        body = payload.model_dump_json().encode()
+    elif orjson is not None:
+        body = orjson.dumps(dump(payload), option=orjson.OPT_NON_STR_KEYS)
+    else:
+        body = json.dumps(dump(payload), default=_json_default).encode()
+    return Response(content=body, status_code=status_code, media_type="application/json")
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from .threads import model_threads
+
+
+class ExplanationUnavailableError(RuntimeError):
+    pass
+
+
+FEATURE_LABELS: Dict[str, str] = {
+    "engagement_checkin_completion_rate_7d": "Daily check-in completion (7d)",
+    "engagement_checkin_completion_rate_30d": "Daily check-in completion (30d)",
+    "engagement_current_streak": "Current learning streak",
+    "engagement_streak_break_count": "Learning streak breaks",
+    "engagement_chat_session_count_30d": "Mentor/chat sessions (30d)",
+    "engagement_chat_message_count_30d": "Chat messages (30d)",
+    "emotional_avg_emotion_score_7d": "Self-reported mood (7d)",
+    "emotional_avg_emotion_score_30d": "Self-reported mood (30d)",
+    "emotional_avg_energy_level_7d": "Energy level (7d)",
+    "emotional_avg_energy_level_30d": "Energy level (30d)",
+    "emotional_stress_days_count_30d": "High-stress days (30d)",
+    "emotional_low_energy_days_count_30d": "Low-energy days (30d)",
+    "emotional_emotion_trend": "Week-over-week emotion trend",
+    "emotional_emotion_volatility": "Emotion volatility",
+    "performance_ark_progress_rate_30d": "ARK progress rate (30d)",
+    "performance_ark_progress_rate_7d": "ARK progress rate (7d)",
+    "performance_xp_earning_rate": "XP earning rate",
+    "performance_progress_decline_days_30d": "Underperformance days (30d)",
+    "performance_milestone_completion_rate": "Milestone completion rate",
+    "behavioral_behavioral_change_score": "Behavioural change score",
+    "behavioral_consistency_score": "Study consistency",
+    "profile_motivation_level": "Motivation level",
+    "profile_confidence_level": "Confidence level",
+    "profile_stress_level": "Reported stress level",
+}
+
+
+def humanize_feature_name(name: str) -> str:
+    if name in FEATURE_LABELS:
+        return FEATURE_LABELS[name]
+    category, _, rest = name.partition("_")
+    if not rest:
+        return name.replace("_", " ").capitalize()
+    return f"{category.capitalize()}: {rest.replace('_', ' ')}"
+
+
+def compute_contributions(model: Any, matrix: np.ndarray) -> np.ndarray:
+    """
+    Per-feature contributions (log-odds for classifiers) from the model's
+    native tree SHAP output. The last column is the bias term.
+    """
+    if hasattr(model, "get_booster"):
+        import xgboost as xgb
+
+        # Same thread count as the model's own predict, so explanations stay within the budget
+        dmatrix = xgb.DMatrix(matrix, nthread=model_threads(model))
+        return model.get_booster().predict(dmatrix, pred_contribs=True)
+
+    if hasattr(model, "booster_"):
+        contributions = model.predict(matrix, pred_contrib=True)
+        if isinstance(contributions, list):  # multiclass sparse output
+            raise ExplanationUnavailableError("Multiclass contributions are not supported")
+        if contributions.shape[1] != matrix.shape[1] + 1:
+            raise ExplanationUnavailableError("Multiclass contributions are not supported")
+        return np.asarray(contributions)
+
+    raise ExplanationUnavailableError(
+        f"Model type '{type(model).__name__}' has no native contribution output"
+    )
+
+
+def rank_contributions(
+    contributions: np.ndarray,
+    raw_values: np.ndarray,
+    feature_names: Sequence[str],
+) -> List[Dict[str, Any]]:
+    """Order one row's contributions by absolute impact, dropping zero-impact features."""
+    row = contributions[:-1]
+    order = np.argsort(-np.abs(row))
+    return [
+        {
+            "feature": feature_names[index],
+            "label": humanize_feature_name(feature_names[index]),
+            "value": float(raw_values[index]),
+            "contribution": round(float(row[index]), 4),
+        }
+        for index in order
+        if row[index] != 0
+    ]
+
+
+def describe_factors(ranked: List[Dict[str, Any]], limit: int = 4) -> List[str]:
+    risk_raising = [item for item in ranked if item["contribution"] > 0][:limit]
+    return [f"{item['label']} at {item['value']:g} is raising risk" for item in risk_raising]
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import os
+import sys
+import types
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - /proc fallback below
+    psutil = None
+
+
+def process_rss_bytes() -> Optional[int]:
+    if psutil is not None:
+        return psutil.Process(os.getpid()).memory_info().rss
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _final_estimator(model: Any) -> Any:
+    if hasattr(model, "steps"):  # sklearn Pipeline
+        return model.steps[-1][1]
+    return model
+
+
+def count_trees(model: Any) -> Optional[int]:
+    model = _final_estimator(model)
+    if hasattr(model, "get_booster"):
+        return len(model.get_booster().get_dump())
+    if hasattr(model, "booster_"):
+        return model.booster_.num_trees()
+    estimators = getattr(model, "estimators_", None)
+    if estimators is not None:
+        return int(getattr(estimators, "size", len(estimators)))
+    return None
+
+
+def count_features(artifact: Any) -> Optional[int]:
+    if isinstance(artifact, dict) and artifact.get("feature_names"):
+        return len(artifact["feature_names"])
+    model = artifact.get("model") if isinstance(artifact, dict) else artifact
+    if hasattr(model, "steps"):
+        vocabulary = getattr(model.steps[0][1], "vocabulary_", None)
+        if vocabulary is not None:
+            return len(vocabulary)
+    count = getattr(_final_estimator(model), "n_features_in_", None)
+    return int(count) if count is not None else None
+
+
+# Approximate bytes per node of the native tree structs (split or leaf plus its statistics)
+XGBOOST_NODE_BYTES = 36
+LIGHTGBM_NODE_BYTES = 40
+
+
+def _native_model_bytes(obj: Any) -> Optional[int]:
+    """Size of a booster's trees held outside the Python heap, or None for other objects."""
+    module = type(obj).__module__
+    if module.startswith("xgboost") and hasattr(obj, "get_dump"):
+        return sum(tree.count("\n") for tree in obj.get_dump()) * XGBOOST_NODE_BYTES
+    if module.startswith("lightgbm") and hasattr(obj, "dump_model"):
+        trees = obj.dump_model().get("tree_info", [])
+        return sum(2 * tree.get("num_leaves", 1) - 1 for tree in trees) * LIGHTGBM_NODE_BYTES
+    return None
+
+
+def estimate_memory_bytes(artifact: Any) -> Optional[int]:
+    """
+    Approximate resident size by walking the artifact: numpy buffers, pandas
+    frames, native boosters (XGBoost/LightGBM trees live outside the Python
+    heap and are sized by node count) and the Python objects holding them.
+    """
+    seen = set()
+    stack = [artifact]
+    total = 0
+    try:
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen or isinstance(obj, (type, types.ModuleType)):
+                continue
+            seen.add(id(obj))
+            if isinstance(obj, np.ndarray):
+                if obj.base is None:
+                    total += obj.nbytes
+                else:  # a view; its buffer is counted once, with the owner
+                    stack.append(obj.base)
+                if obj.dtype == object:
+                    stack.extend(obj.ravel().tolist())
+                continue
+            if hasattr(obj, "memory_usage") and hasattr(obj, "index"):  # pandas frame or series
+                total += int(np.sum(obj.memory_usage(deep=True)))
+                continue
+            native = _native_model_bytes(obj)
+            if native is not None:
+                total += native
+                continue
+            total += sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                stack.extend(obj)
+            elif hasattr(obj, "__dict__"):
+                stack.append(vars(obj))
+    except Exception:  # noqa: BLE001
+        return None
+    return total
+
+
+def profile_artifact(artifact: Any, path: Optional[str]) -> Dict[str, Any]:
+    model = artifact.get("model") if isinstance(artifact, dict) else artifact
+    size = None
+    if path and os.path.exists(path):
+        size = os.path.getsize(path)
+    return {
+        "model_class": type(_final_estimator(model)).__name__,
+        "file_bytes": size,
+        "estimated_memory_bytes": estimate_memory_bytes(artifact),
+        "trees": count_trees(model),
+        "features": count_features(artifact),
+    }
@@ -1,42 +1,114 @@
 from __future__ import annotations
 
 import os
+import time
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from feature_schema import FEATURE_VERSION, FeatureSchema, get_schema
 
+from .cascade import (
+    CASCADE_ENABLED,
+    CASCADE_STATS,
+    cascade_report,
+    in_uncertainty_band,
+    should_audit,
+)
+from .encoding import construct, encode_response
+from .explain import (
+    ExplanationUnavailableError,
+    compute_contributions,
+    describe_factors,
+    rank_contributions,
+)
+from .introspect import process_rss_bytes, profile_artifact
 from .models import (
+    CareerBatchRequest,
+    CareerBatchResponse,
+    CareerPrediction,
+    CareerRecommendation,
+    CareerRequest,
     DifficultyPrediction,
     DifficultyRequest,
+    ExplainRequest,
+    ExplainResponse,
+    FeatureContribution,
     HealthResponse,
     PredictionMetadata,
     RiskPrediction,
     RiskRequest,
     RiskResponse,
+    SentimentPrediction,
+    SentimentRequest,
+    SentimentResponse,
+    StudentExplanation,
+    WhatIfRequest,
+    WhatIfResponse,
 )
+from .cache import LRUCache
 from .registry import (
     MODEL_CACHE,
     ModelFileMissingError,
     ModelNotDeployedError,
+    RegistryUnavailableError,
     clear_model_cache,
-    flatten_features,
+    extract_feature_matrix,
+    extract_feature_vector,
+    get_data_backend,
     load_model_artifact,
-    vectorise_features,
-    get_supabase,
+    load_model_artifacts,
+    required_feature_paths,
+    select_columns,
+    union_feature_names,
 )
+from .resilience import breaker_states, call_with_budget
+from .threads import has_parallel_copy, inference_model, thread_report
 from .rule_based import (
+    RULE_FEATURE_PATHS,
     determine_risk_level,
     rule_based_burnout,
+    rule_based_career,
     rule_based_difficulty,
     rule_based_dropout,
+    rule_based_sentiment,
 )
 
 
-FEATURE_VERSION = os.getenv("FEATURE_VERSION", "1.0.0")
 RELOAD_TOKEN = os.getenv("MODEL_RELOAD_TOKEN")
+FEATURE_CACHE_SIZE = int(os.getenv("FEATURE_CACHE_SIZE", "10000"))
+FEATURE_CACHE_MAX_AGE_SECONDS = float(os.getenv("FEATURE_CACHE_MAX_AGE_SECONDS", "86400"))
+
+# Last known feature vector per (student, version), served when the feature store is slow or down
+FEATURE_CACHE: LRUCache[Dict[str, Any]] = LRUCache(FEATURE_CACHE_SIZE)
+
+SENTIMENT_MAX_BATCH = int(os.getenv("SENTIMENT_MAX_BATCH", "2000"))
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "20000"))
+
+# Scored texts keyed by (model version, text); chat histories repeat short messages a lot
+SENTIMENT_CACHE: LRUCache[Dict[str, Any]] = LRUCache(SENTIMENT_CACHE_SIZE)
+
+CAREER_MAX_BATCH = int(os.getenv("CAREER_MAX_BATCH", "1000"))
+CAREER_CACHE_SIZE = int(os.getenv("CAREER_CACHE_SIZE", "50000"))
+CAREER_CACHE_TTL_SECONDS = float(os.getenv("CAREER_CACHE_TTL_SECONDS", "21600"))
+EXPLAIN_MAX_BATCH = int(os.getenv("EXPLAIN_MAX_BATCH", "500"))
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", "50000"))
+WHAT_IF_MAX_POINTS = int(os.getenv("WHAT_IF_MAX_POINTS", "10000"))
+FEATURE_FETCH_CHUNK = int(os.getenv("FEATURE_FETCH_CHUNK", "100"))
+
+# Ranked contributions keyed by (model type, model version, student, feature timestamp)
+EXPLANATION_CACHE: LRUCache[Dict[str, Any]] = LRUCache(EXPLANATION_CACHE_SIZE)
+
+# Full bucket ranking per (student, feature version) so dashboards skip inference
+CAREER_CACHE: LRUCache[Dict[str, Any]] = LRUCache(CAREER_CACHE_SIZE, ttl_seconds=CAREER_CACHE_TTL_SECONDS)
+
+RISK_RULES = {
+    "dropout": rule_based_dropout,
+    "burnout": rule_based_burnout,
+}
+
 
 app = FastAPI(title="Mentark ML Serving API", version="1.0.0")
 app.add_middleware(
@@ -47,8 +119,7 @@ app.add_middleware(
 )
 
 
-@app.post("/admin/reload")
-def reload_models(request: Request):
+def _require_admin_token(request: Request) -> None:
     provided_token = (
         request.headers.get("x-reload-token")
         or request.query_params.get("token")
@@ -57,33 +128,118 @@ def reload_models(request: Request):
     if RELOAD_TOKEN and provided_token != RELOAD_TOKEN:
         raise HTTPException(status_code=403, detail="Invalid reload token")
 
+
+@app.post("/admin/reload")
+def reload_models(request: Request):
+    _require_admin_token(request)
     clear_model_cache()
+    CAREER_CACHE.clear()
+    SENTIMENT_CACHE.clear()
+    EXPLANATION_CACHE.clear()
     return {"success": True, "message": "Model cache cleared"}
 
 
-def _fetch_feature_vector(student_id: str, feature_version: Optional[str]) -> Optional[Dict[str, Any]]:
-    supabase = get_supabase()
+@app.get("/admin/cascade")
+def cascade_stats(request: Request) -> Dict[str, Any]:
+    _require_admin_token(request)
+    return cascade_report()
+
+
+@app.get("/admin/models")
+def model_stats(request: Request) -> Dict[str, Any]:
+    _require_admin_token(request)
+    now = time.time()
+    models = {}
+    for model_type, bundle in list(MODEL_CACHE.items()):
+        if "profile" not in bundle:
+            # Walking big artifacts for the size estimate is slow; do it once per load
+            bundle["profile"] = profile_artifact(bundle["artifact"], bundle.get("path"))
+        artifact = bundle["artifact"]
+        model = artifact.get("model") if isinstance(artifact, dict) else artifact
+        models[model_type] = {
+            "version": bundle.get("version"),
+            "path": bundle.get("path"),
+            "loaded_at": bundle.get("loaded_at"),
+            "load_ms": round(bundle.get("load_seconds", 0.0) * 1000, 2),
+            "load_rss_delta_bytes": bundle.get("load_rss_delta_bytes"),
+            **bundle["profile"],
+            "parallel_copy": has_parallel_copy(model),
+            "seconds_since_last_use": round(now - bundle["last_used"], 1) if bundle.get("last_used") else None,
+            "threads": bundle.get("threads"),
+        }
+    return {"process_rss_bytes": process_rss_bytes(), "models": models}
+
+
+def _feature_paths(model_types: Optional[List[str]]):
+    # Nested paths the models and heuristics read; None means fetch the full record
+    return required_feature_paths(model_types, RULE_FEATURE_PATHS) if model_types else None
+
+
+def _query_feature_vector(
+    student_id: str,
+    version: str,
+    model_types: Optional[List[str]] = None,
+) -> Optional[Dict[str, Any]]:
+    return get_data_backend().latest_feature_row(student_id, version, _feature_paths(model_types))
+
+
+def _fetch_feature_vector(
+    student_id: str,
+    feature_version: Optional[str],
+    model_types: Optional[List[str]] = None,
+) -> Optional[Dict[str, Any]]:
     version = feature_version or FEATURE_VERSION
+    cache_key = (student_id, version)
 
-    response = (
-        supabase.table("ml_feature_store")
-        .select("*")
-        .eq("student_id", student_id)
-        .eq("feature_version", version)
-        .order("extraction_timestamp", desc=True)
-        .limit(1)
-        .execute()
-    )
+    try:
+        record = call_with_budget(
+            "feature_store", lambda: _query_feature_vector(student_id, version, model_types)
+        )
+    except Exception as exc:  # noqa: BLE001
+        cached = FEATURE_CACHE.get(cache_key, max_age=FEATURE_CACHE_MAX_AGE_SECONDS)
+        if cached is None:
+            raise HTTPException(status_code=503, detail=f"Feature store unavailable: {exc}") from exc
+        return {**cached, "stale": True, "stale_reason": str(exc)}
 
-    if not response.data:
-        return None
+    if record is not None:
+        FEATURE_CACHE.set(cache_key, record)
+    return record
 
-    record = response.data[0]
-    return {
-        "feature_version": record.get("feature_version", version),
-        "feature_timestamp": record.get("extraction_timestamp"),
-        "features": record.get("features", {}),
-    }
+
+def _query_feature_vectors(
+    student_ids: List[str],
+    version: str,
+    model_types: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    return get_data_backend().latest_feature_rows(student_ids, version, _feature_paths(model_types))
+
+
+def _fetch_feature_vectors(
+    student_ids: List[str],
+    feature_version: Optional[str],
+    model_types: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    version = feature_version or FEATURE_VERSION
+    records: Dict[str, Dict[str, Any]] = {}
+
+    for start in range(0, len(student_ids), FEATURE_FETCH_CHUNK):
+        chunk = student_ids[start:start + FEATURE_FETCH_CHUNK]
+        try:
+            fetched = call_with_budget(
+                "feature_store", lambda: _query_feature_vectors(chunk, version, model_types)
+            )
+        except Exception as exc:  # noqa: BLE001
+            for student_id in chunk:
+                cached = FEATURE_CACHE.get((student_id, version), max_age=FEATURE_CACHE_MAX_AGE_SECONDS)
+                if cached is not None:
+                    records[student_id] = {**cached, "stale": True, "stale_reason": str(exc)}
+            continue
+
+        for student_id, record in fetched.items():
+            FEATURE_CACHE.set((student_id, version), record)
+            records[student_id] = record
+
+    return records
 
 
 def _build_metadata(
@@ -92,31 +248,31 @@ def _build_metadata(
     feature_timestamp: Optional[str],
     used_fallback: bool,
     fallback_reason: Optional[str],
+    feature_record: Optional[Dict[str, Any]] = None,
 ) -> PredictionMetadata:
-    return PredictionMetadata(
+    feature_record = feature_record or {}
+    return construct(
+        PredictionMetadata,
         model_name=metadata.get("model_name"),
         model_version=metadata.get("version"),
         feature_version=feature_version,
         feature_timestamp=datetime.fromisoformat(feature_timestamp) if feature_timestamp else None,
         used_fallback=used_fallback,
         fallback_reason=fallback_reason,
+        stale=feature_record.get("stale", False),
+        stale_reason=feature_record.get("stale_reason"),
     )
 
 
-def _predict_with_model(
+def _score_artifact(
     model_type: str,
-    raw_features: Dict[str, Any],
-    feature_names_key: str = "feature_names",
-    proba_index: int = 1,
+    artifact: Dict[str, Any],
+    vector: np.ndarray,
+    proba_index: int,
+    feature_names: Optional[List[str]] = None,
+    explain: bool = False,
 ) -> Dict[str, Any]:
-    artifact_bundle = load_model_artifact(model_type)
-    artifact = artifact_bundle["artifact"]
-    flat = flatten_features(raw_features)
-    feature_names = artifact.get(feature_names_key)
-    if not feature_names:
-        raise RuntimeError(f"Missing feature names for model '{model_type}'")
-
-    vector = vectorise_features(flat, feature_names)
+    raw_vector = vector
     scaler = artifact.get("scaler")
     if scaler is not None:
         vector = scaler.transform(vector)
@@ -125,39 +281,104 @@ def _predict_with_model(
     if model is None:
         raise RuntimeError(f"Model object missing for '{model_type}'")
 
-    metadata = artifact_bundle.get("metadata", {})
+    with inference_model(model, len(vector)) as runner:
+        if hasattr(runner, "predict_proba"):
+            probabilities = runner.predict_proba(vector)
+            probability = float(probabilities[0][proba_index])
+            output = {
+                "score": probability * 100,
+                "probability": probability,
+            }
+        else:
+            predictions = runner.predict(vector)
+            output = {"value": float(predictions[0])}
 
-    if hasattr(model, "predict_proba"):
-        probabilities = model.predict_proba(vector)
-        probability = float(probabilities[0][proba_index])
-        score = probability * 100
-        return {
-            "score": score,
-            "probability": probability,
-            "metadata": metadata,
-        }
+        if explain and feature_names:
+            try:
+                contributions = compute_contributions(runner, vector)
+                output["contributions"] = rank_contributions(contributions[0], raw_vector[0], feature_names)
+            except ExplanationUnavailableError:
+                pass
 
-    predictions = model.predict(vector)
-    value = float(predictions[0])
-    return {
-        "value": value,
-        "metadata": metadata,
-    }
+    return output
+
+
+def _predict_with_models(
+    model_types: List[str],
+    raw_features: Dict[str, Any],
+    feature_names_key: str = "feature_names",
+    proba_index: int = 1,
+    explain: bool = False,
+) -> Dict[str, Union[Dict[str, Any], Exception]]:
+    """
+    Score one feature record against several models.
+
+    Artifacts are resolved concurrently, the record is flattened once and a
+    single base vector over the union of the models' feature names is shared,
+    with each model taking its own column view. Failures are returned per
+    model type so callers can fall back independently.
+    """
+    outputs: Dict[str, Union[Dict[str, Any], Exception]] = {}
+    resolved: Dict[str, Dict[str, Any]] = {}
+
+    for model_type, bundle in load_model_artifacts(model_types).items():
+        if isinstance(bundle, Exception):
+            outputs[model_type] = bundle
+            continue
+        if not bundle["artifact"].get(feature_names_key):
+            outputs[model_type] = RuntimeError(f"Missing feature names for model '{model_type}'")
+            continue
+        resolved[model_type] = bundle
+
+    if not resolved:
+        return outputs
+
+    base_names = union_feature_names(bundle["artifact"][feature_names_key] for bundle in resolved.values())
+    base_vector = extract_feature_vector(raw_features, base_names)
+
+    for model_type, bundle in resolved.items():
+        artifact = bundle["artifact"]
+        try:
+            feature_names = artifact[feature_names_key]
+            vector = select_columns(base_vector, base_names, feature_names)
+            output = _score_artifact(model_type, artifact, vector, proba_index, feature_names, explain)
+        except Exception as exc:  # noqa: BLE001
+            outputs[model_type] = exc
+            continue
+        output["metadata"] = bundle.get("metadata", {})
+        output["version"] = bundle.get("version")
+        outputs[model_type] = output
+
+    return outputs
+
+
+def _predict_with_model(
+    model_type: str,
+    raw_features: Dict[str, Any],
+    feature_names_key: str = "feature_names",
+    proba_index: int = 1,
+) -> Dict[str, Any]:
+    output = _predict_with_models([model_type], raw_features, feature_names_key, proba_index)[model_type]
+    if isinstance(output, Exception):
+        raise output
+    return output
 
 
 def _compose_risk_prediction(
     primary_score: float,
     fallback_payload: Dict[str, Any],
     metadata: PredictionMetadata,
+    model_factors: Optional[List[str]] = None,
 ) -> RiskPrediction:
     level = determine_risk_level(primary_score)
     probability = primary_score / 100
 
-    # Use heuristic factors for interpretability
-    factors = fallback_payload.get("factors", [])
+    # Model predictions are explained by their own contributions; heuristics explain the fallback
+    factors = model_factors or fallback_payload.get("factors", [])
     recommendations = fallback_payload.get("recommendations", [])
 
-    return RiskPrediction(
+    return construct(
+        RiskPrediction,
         score=round(primary_score, 2),
         level=level,
         probability=round(probability, 3),
@@ -167,10 +388,30 @@ def _compose_risk_prediction(
     )
 
 
+def _explanation_key(model_type: str, version: Optional[str], student_id: str, feature_record: Dict[str, Any]):
+    return (model_type, version, student_id, feature_record.get("feature_timestamp"))
+
+
+def _explanation_factors(
+    model_type: str,
+    student_id: str,
+    feature_record: Dict[str, Any],
+    model_output: Dict[str, Any],
+) -> Optional[List[str]]:
+    """Factors from contributions computed for this call (cached) or cached earlier; None if neither."""
+    key = _explanation_key(model_type, model_output.get("version"), student_id, feature_record)
+    contributions = model_output.get("contributions")
+    if contributions is None:
+        entry = EXPLANATION_CACHE.get(key)
+        return describe_factors(entry["contributions"]) if entry is not None else None
+    EXPLANATION_CACHE.set(key, {"score": model_output["score"], "contributions": contributions})
+    return describe_factors(contributions)
+
+
 @app.get("/health", response_model=HealthResponse)
 def health() -> HealthResponse:
     deployed = {}
-    for model_type in ["dropout", "burnout", "difficulty", "sentiment"]:
+    for model_type in ["dropout", "burnout", "career", "difficulty", "sentiment"]:
         if model_type in MODEL_CACHE:
             deployed[model_type] = MODEL_CACHE[model_type]["version"]
         else:
@@ -182,12 +423,18 @@ def health() -> HealthResponse:
         cache={k: v.get("loaded_at") for k, v in MODEL_CACHE.items()},
         deployed_models=deployed,
         feature_version=FEATURE_VERSION,
+        circuit_breakers=breaker_states(),
+        feature_cache=FEATURE_CACHE.stats(),
+        inference_threads={
+            **thread_report(),
+            "models": {model_type: bundle.get("threads") for model_type, bundle in MODEL_CACHE.items()},
+        },
     )
 
 
 @app.post("/predict/risk", response_model=RiskResponse)
-def predict_risk(request: RiskRequest) -> RiskResponse:
-    feature_record = _fetch_feature_vector(request.student_id, request.feature_version)
+def predict_risk(request: RiskRequest, http_request: Request) -> Response:
+    feature_record = _fetch_feature_vector(request.student_id, request.feature_version, list(RISK_RULES))
     if not feature_record:
         raise HTTPException(status_code=404, detail="Feature vector not found for student")
 
@@ -195,76 +442,87 @@ def predict_risk(request: RiskRequest) -> RiskResponse:
     feature_version = feature_record["feature_version"]
     feature_timestamp = feature_record.get("feature_timestamp")
 
-    dropout_payload = rule_based_dropout(features)
-    burnout_payload = rule_based_burnout(features)
+    payloads = {model_type: rule(features) for model_type, rule in RISK_RULES.items()}
+    scores = {model_type: payload["score"] for model_type, payload in payloads.items()}
+    factors: Dict[str, Optional[List[str]]] = {model_type: None for model_type in RISK_RULES}
+    metadata = {
+        model_type: _build_metadata(
+            {"model_name": f"rule_based_{model_type}", "version": "fallback"},
+            feature_version,
+            feature_timestamp,
+            used_fallback=True,
+            fallback_reason="Rule-based baseline",
+            feature_record=feature_record,
+        )
+        for model_type in RISK_RULES
+    }
 
-    dropout_score = dropout_payload["score"]
-    dropout_metadata = PredictionMetadata(
-        model_name="rule_based_dropout",
-        model_version="fallback",
-        feature_version=feature_version,
-        feature_timestamp=datetime.fromisoformat(feature_timestamp) if feature_timestamp else None,
-        used_fallback=True,
-        fallback_reason="Rule-based baseline",
-    )
+    if not request.force_fallback:
+        use_cascade = CASCADE_ENABLED if request.cascade is None else request.cascade
+        model_types: List[str] = []
+        audits: Dict[str, bool] = {}
+        for model_type in RISK_RULES:
+            if not use_cascade or in_uncertainty_band(scores[model_type]):
+                model_types.append(model_type)
+                audits[model_type] = False
+            elif should_audit():
+                model_types.append(model_type)
+                audits[model_type] = True
+            else:
+                CASCADE_STATS[model_type].record_skip()
+                metadata[model_type].fallback_reason = "Cascade: rule-based score outside uncertainty band"
 
-    burnout_score = burnout_payload["score"]
-    burnout_metadata = PredictionMetadata(
-        model_name="rule_based_burnout",
-        model_version="fallback",
-        feature_version=feature_version,
-        feature_timestamp=datetime.fromisoformat(feature_timestamp) if feature_timestamp else None,
-        used_fallback=True,
-        fallback_reason="Rule-based baseline",
-    )
+        cpu_started = time.thread_time()
+        model_outputs = _predict_with_models(model_types, features, explain=request.explain) if model_types else {}
+        cpu_per_model = (time.thread_time() - cpu_started) / max(len(model_types), 1)
 
-    if not request.force_fallback:
-        try:
-            dropout_model_output = _predict_with_model("dropout", features)
-            dropout_score = dropout_model_output["score"]
-            dropout_metadata = _build_metadata(
-                dropout_model_output["metadata"],
-                feature_version,
-                feature_timestamp,
-                used_fallback=False,
-                fallback_reason=None,
-            )
-        except (ModelNotDeployedError, ModelFileMissingError) as exc:
-            dropout_metadata.fallback_reason = str(exc)
-        except Exception as exc:  # noqa: BLE001
-            dropout_metadata.fallback_reason = f"Model inference failed: {exc}"  # keep fallback
+        for model_type, model_output in model_outputs.items():
+            if isinstance(model_output, (ModelNotDeployedError, ModelFileMissingError, RegistryUnavailableError)):
+                metadata[model_type].fallback_reason = str(model_output)
+                continue
+            if isinstance(model_output, Exception):
+                metadata[model_type].fallback_reason = f"Model inference failed: {model_output}"  # keep fallback
+                continue
 
-        try:
-            burnout_model_output = _predict_with_model("burnout", features)
-            burnout_score = burnout_model_output["score"]
-            burnout_metadata = _build_metadata(
-                burnout_model_output["metadata"],
+            if use_cascade:
+                CASCADE_STATS[model_type].record_model_call(
+                    audits[model_type], scores[model_type], model_output["score"], cpu_per_model
+                )
+            scores[model_type] = model_output["score"]
+            factors[model_type] = _explanation_factors(model_type, request.student_id, feature_record, model_output)
+            metadata[model_type] = _build_metadata(
+                model_output["metadata"],
                 feature_version,
                 feature_timestamp,
                 used_fallback=False,
                 fallback_reason=None,
+                feature_record=feature_record,
             )
-        except (ModelNotDeployedError, ModelFileMissingError) as exc:
-            burnout_metadata.fallback_reason = str(exc)
-        except Exception as exc:  # noqa: BLE001
-            burnout_metadata.fallback_reason = f"Model inference failed: {exc}"
 
-    dropout_prediction = _compose_risk_prediction(dropout_score, dropout_payload, dropout_metadata)
-    burnout_prediction = _compose_risk_prediction(burnout_score, burnout_payload, burnout_metadata)
+    dropout_prediction = _compose_risk_prediction(
+        scores["dropout"], payloads["dropout"], metadata["dropout"], factors["dropout"]
+    )
+    burnout_prediction = _compose_risk_prediction(
+        scores["burnout"], payloads["burnout"], metadata["burnout"], factors["burnout"]
+    )
 
     disengagement = round((dropout_prediction.score + burnout_prediction.score) / 2, 2)
 
-    return RiskResponse(
-        dropout=dropout_prediction,
-        burnout=burnout_prediction,
-        disengagement_score=disengagement,
-        generated_at=datetime.utcnow(),
+    return encode_response(
+        construct(
+            RiskResponse,
+            dropout=dropout_prediction,
+            burnout=burnout_prediction,
+            disengagement_score=disengagement,
+            generated_at=datetime.utcnow(),
+        ),
+        http_request,
     )
 
 
 @app.post("/predict/difficulty", response_model=DifficultyPrediction)
-def predict_difficulty(request: DifficultyRequest) -> DifficultyPrediction:
-    feature_record = _fetch_feature_vector(request.student_id, request.feature_version)
+def predict_difficulty(request: DifficultyRequest, http_request: Request) -> Response:
+    feature_record = _fetch_feature_vector(request.student_id, request.feature_version, ["difficulty"])
     if not feature_record:
         raise HTTPException(status_code=404, detail="Feature vector not found for student")
 
@@ -274,13 +532,13 @@ def predict_difficulty(request: DifficultyRequest) -> DifficultyPrediction:
 
     fallback_payload = rule_based_difficulty(features)
     difficulty_score = fallback_payload["difficulty_score"]
-    metadata = PredictionMetadata(
-        model_name="rule_based_difficulty",
-        model_version="fallback",
-        feature_version=feature_version,
-        feature_timestamp=datetime.fromisoformat(feature_timestamp) if feature_timestamp else None,
+    metadata = _build_metadata(
+        {"model_name": "rule_based_difficulty", "version": "fallback"},
+        feature_version,
+        feature_timestamp,
         used_fallback=True,
         fallback_reason="Rule-based baseline",
+        feature_record=feature_record,
     )
 
     if not request.force_fallback:
@@ -293,8 +551,9 @@ def predict_difficulty(request: DifficultyRequest) -> DifficultyPrediction:
                 feature_timestamp,
                 used_fallback=False,
                 fallback_reason=None,
+                feature_record=feature_record,
             )
-        except (ModelNotDeployedError, ModelFileMissingError) as exc:
+        except (ModelNotDeployedError, ModelFileMissingError, RegistryUnavailableError) as exc:
             metadata.fallback_reason = str(exc)
         except Exception as exc:  # noqa: BLE001
             metadata.fallback_reason = f"Model inference failed: {exc}"
@@ -312,10 +571,577 @@ def predict_difficulty(request: DifficultyRequest) -> DifficultyPrediction:
             recommended_level = "foundational"
         confidence = min(0.95, max(0.4, np.interp(difficulty_score, [0.5, 5.0], [0.45, 0.9])))
 
-    return DifficultyPrediction(
-        difficulty_score=round(difficulty_score, 2),
-        recommended_level=recommended_level,
-        confidence=round(float(confidence), 3),
-        recommendations=fallback_payload.get("recommendations", []),
+    return encode_response(
+        construct(
+            DifficultyPrediction,
+            difficulty_score=round(difficulty_score, 2),
+            recommended_level=recommended_level,
+            confidence=round(float(confidence), 3),
+            recommendations=fallback_payload.get("recommendations", []),
+            metadata=metadata,
+        ),
+        http_request,
+    )
+
+
+def _score_sentiment_texts(pipeline: Any, texts: List[str]) -> List[Dict[str, Any]]:
+    # One TF-IDF transform and one predict_proba for the whole batch
+    with inference_model(pipeline, len(texts)) as runner:
+        probabilities = runner.predict_proba(texts)
+    classes = [str(label) for label in pipeline.classes_]
+    results = []
+    for row in probabilities:
+        best = int(np.argmax(row))
+        results.append(
+            {
+                "label": classes[best],
+                "probability": round(float(row[best]), 3),
+                "probabilities": {label: round(float(p), 3) for label, p in zip(classes, row)},
+            }
+        )
+    return results
+
+
+@app.post("/predict/sentiment", response_model=SentimentResponse)
+def predict_sentiment(request: SentimentRequest, http_request: Request) -> Response:
+    if not request.texts:
+        raise HTTPException(status_code=422, detail="At least one text is required")
+    if len(request.texts) > SENTIMENT_MAX_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.texts)} texts (max {SENTIMENT_MAX_BATCH})",
+        )
+
+    texts = [text.strip() for text in request.texts]
+    metadata = _build_metadata(
+        {"model_name": "rule_based_sentiment", "version": "fallback"},
+        FEATURE_VERSION,
+        None,
+        used_fallback=True,
+        fallback_reason="Rule-based baseline",
+    )
+
+    pipeline = None
+    version = "fallback"
+    if not request.force_fallback:
+        try:
+            bundle = load_model_artifact("sentiment")
+            pipeline = bundle["artifact"]
+            if not hasattr(pipeline, "predict_proba"):
+                raise RuntimeError("Sentiment artifact does not support predict_proba")
+            version = bundle.get("version") or "unknown"
+            metadata = _build_metadata(
+                bundle.get("metadata", {}),
+                FEATURE_VERSION,
+                None,
+                used_fallback=False,
+                fallback_reason=None,
+            )
+        except (ModelNotDeployedError, ModelFileMissingError, RegistryUnavailableError) as exc:
+            pipeline = None
+            metadata.fallback_reason = str(exc)
+        except Exception as exc:  # noqa: BLE001
+            pipeline = None
+            metadata.fallback_reason = f"Model inference failed: {exc}"
+
+    scored: Dict[str, Dict[str, Any]] = {}
+    cached_texts = set()
+    pending: List[str] = []
+    for text in dict.fromkeys(texts):
+        if not text:
+            scored[text] = rule_based_sentiment(text)
+            continue
+        hit = SENTIMENT_CACHE.get((version, text))
+        if hit is not None:
+            scored[text] = hit
+            cached_texts.add(text)
+        else:
+            pending.append(text)
+
+    if pending:
+        results = None
+        if pipeline is not None:
+            try:
+                results = _score_sentiment_texts(pipeline, pending)
+            except Exception as exc:  # noqa: BLE001
+                version = "fallback"
+                metadata = _build_metadata(
+                    {"model_name": "rule_based_sentiment", "version": "fallback"},
+                    FEATURE_VERSION,
+                    None,
+                    used_fallback=True,
+                    fallback_reason=f"Model inference failed: {exc}",
+                )
+        if results is None:
+            results = [rule_based_sentiment(text) for text in pending]
+        for text, result in zip(pending, results):
+            scored[text] = result
+            SENTIMENT_CACHE.set((version, text), result)
+
+    predictions = [
+        construct(SentimentPrediction, **scored[text], cached=text in cached_texts)
+        for text in texts
+    ]
+
+    return encode_response(
+        construct(
+            SentimentResponse,
+            predictions=predictions,
+            metadata=metadata,
+            generated_at=datetime.utcnow(),
+        ),
+        http_request,
+    )
+
+
+def _rank_career_buckets(
+    feature_records: List[Dict[str, Any]],
+    force_fallback: bool,
+) -> Tuple[List[List[Tuple[str, float]]], Dict[str, Any], Optional[str]]:
+    """Rank career buckets for many feature records with one predict_proba call."""
+    fallback_reason = "Rule-based baseline"
+    if not force_fallback:
+        try:
+            bundle = load_model_artifact("career")
+            artifact = bundle["artifact"]
+            feature_names = artifact.get("feature_names")
+            model = artifact.get("model")
+            if not feature_names or model is None:
+                raise RuntimeError("Career artifact is missing its model or feature names")
+
+            matrix = extract_feature_matrix([record["features"] for record in feature_records], feature_names)
+            scaler = artifact.get("scaler")
+            if scaler is not None:
+                matrix = scaler.transform(matrix)
+
+            with inference_model(model, len(matrix)) as runner:
+                probabilities = runner.predict_proba(matrix)
+            classes = artifact.get("classes")
+            labels = [
+                str(classes[int(label)]) if classes is not None else str(label)
+                for label in model.classes_
+            ]
+            order = np.argsort(-probabilities, axis=1)
+            rankings = [
+                [(labels[column], float(row[column])) for column in row_order]
+                for row, row_order in zip(probabilities, order)
+            ]
+            return rankings, bundle.get("metadata", {}), None
+        except (ModelNotDeployedError, ModelFileMissingError, RegistryUnavailableError) as exc:
+            fallback_reason = str(exc)
+        except Exception as exc:  # noqa: BLE001
+            fallback_reason = f"Model inference failed: {exc}"
+
+    rankings = [rule_based_career(record["features"])["ranked"] for record in feature_records]
+    return rankings, {"model_name": "rule_based_career", "version": "fallback"}, fallback_reason
+
+
+def _career_prediction(
+    student_id: str,
+    ranking: List[Tuple[str, float]],
+    metadata: PredictionMetadata,
+    top_k: int,
+    generated_at: datetime,
+    cached: bool = False,
+) -> CareerPrediction:
+    return construct(
+        CareerPrediction,
+        student_id=student_id,
+        recommendations=[
+            construct(CareerRecommendation, bucket=bucket, probability=round(probability, 3))
+            for bucket, probability in ranking[:top_k]
+        ],
         metadata=metadata,
+        generated_at=generated_at,
+        cached=cached,
+    )
+
+
+def _predict_careers(
+    records: Dict[str, Dict[str, Any]],
+    force_fallback: bool,
+) -> Dict[str, Dict[str, Any]]:
+    student_ids = list(records)
+    rankings, model_metadata, fallback_reason = _rank_career_buckets(
+        [records[student_id] for student_id in student_ids], force_fallback
+    )
+    generated_at = datetime.utcnow()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for student_id, ranking in zip(student_ids, rankings):
+        record = records[student_id]
+        metadata = _build_metadata(
+            model_metadata,
+            record["feature_version"],
+            record.get("feature_timestamp"),
+            used_fallback=fallback_reason is not None,
+            fallback_reason=fallback_reason,
+            feature_record=record,
+        )
+        entry = {
+            "ranking": ranking,
+            "metadata": metadata,
+            "generated_at": generated_at,
+            "model_version": model_metadata.get("version"),
+        }
+        # Rule-based rankings are never cached: a hit skips the registry, so a
+        # fallback would outlive the next deployment or a registry outage
+        if fallback_reason is None and not metadata.stale:
+            CAREER_CACHE.set((student_id, record["feature_version"]), entry)
+        results[student_id] = entry
+    return results
+
+
+def _cached_career(student_id: str, version: str) -> Optional[Dict[str, Any]]:
+    entry = CAREER_CACHE.get((student_id, version))
+    if entry is None:
+        return None
+    # Only trust entries produced by the artifact that is currently loaded
+    current_version = (MODEL_CACHE.get("career") or {}).get("version")
+    if current_version is None or entry["model_version"] != current_version:
+        return None
+    return entry
+
+
+@app.post("/predict/career", response_model=CareerPrediction)
+def predict_career(request: CareerRequest, http_request: Request) -> Response:
+    version = request.feature_version or FEATURE_VERSION
+    if request.use_cache and not request.force_fallback:
+        entry = _cached_career(request.student_id, version)
+        if entry is not None:
+            return encode_response(
+                _career_prediction(
+                    request.student_id,
+                    entry["ranking"],
+                    entry["metadata"],
+                    request.top_k,
+                    entry["generated_at"],
+                    cached=True,
+                ),
+                http_request,
+            )
+
+    feature_record = _fetch_feature_vector(request.student_id, request.feature_version, ["career"])
+    if not feature_record:
+        raise HTTPException(status_code=404, detail="Feature vector not found for student")
+
+    entry = _predict_careers({request.student_id: feature_record}, request.force_fallback)[request.student_id]
+    return encode_response(
+        _career_prediction(
+            request.student_id,
+            entry["ranking"],
+            entry["metadata"],
+            request.top_k,
+            entry["generated_at"],
+        ),
+        http_request,
+    )
+
+
+@app.post("/predict/career/batch", response_model=CareerBatchResponse)
+def predict_career_batch(request: CareerBatchRequest, http_request: Request) -> Response:
+    student_ids = list(dict.fromkeys(request.student_ids))
+    if not student_ids:
+        raise HTTPException(status_code=422, detail="At least one student_id is required")
+    if len(student_ids) > CAREER_MAX_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(student_ids)} students (max {CAREER_MAX_BATCH})",
+        )
+
+    records = _fetch_feature_vectors(student_ids, request.feature_version, ["career"])
+    missing = [student_id for student_id in student_ids if student_id not in records]
+    results = _predict_careers(records, request.force_fallback) if records else {}
+
+    if request.precompute:
+        # Warm-up mode for scheduled jobs: results live in the cache, not the response
+        return encode_response(
+            construct(
+                CareerBatchResponse,
+                missing=missing,
+                precomputed=len(results),
+                generated_at=datetime.utcnow(),
+            ),
+            http_request,
+        )
+
+    return encode_response(
+        construct(
+            CareerBatchResponse,
+            predictions=[
+                _career_prediction(
+                    student_id,
+                    entry["ranking"],
+                    entry["metadata"],
+                    request.top_k,
+                    entry["generated_at"],
+                )
+                for student_id, entry in results.items()
+            ],
+            missing=missing,
+            generated_at=datetime.utcnow(),
+        ),
+        http_request,
+    )
+
+
+def _apply_overrides(
+    features: Dict[str, Any],
+    overrides: Dict[str, float],
+    schema: FeatureSchema,
+) -> Dict[str, Any]:
+    # Copy only the branches that change; the rest of the record is shared
+    updated = dict(features)
+    for name, value in overrides.items():
+        path = schema.path(name)
+        node = updated
+        for key in path[:-1]:
+            child = node.get(key)
+            node[key] = dict(child) if isinstance(child, dict) else {}
+            node = node[key]
+        node[path[-1]] = value
+    return updated
+
+
+@app.post("/predict/risk/what-if", response_model=WhatIfResponse)
+def predict_risk_what_if(request: WhatIfRequest, http_request: Request) -> Response:
+    unknown_models = [model_type for model_type in request.models if model_type not in RISK_RULES]
+    if unknown_models or not request.models:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Supported models are {sorted(RISK_RULES)}; got {request.models}",
+        )
+    if not request.perturbations or any(not values for values in request.perturbations.values()):
+        raise HTTPException(status_code=422, detail="Each perturbed feature needs at least one value")
+
+    axis_names = list(request.perturbations)
+    axes = [np.asarray(request.perturbations[name], dtype=np.float64) for name in axis_names]
+    grid_shape = [len(axis) for axis in axes]
+    point_count = int(np.prod(grid_shape))
+    if point_count > WHAT_IF_MAX_POINTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Grid has {point_count} points (max {WHAT_IF_MAX_POINTS})",
+        )
+
+    model_types = list(dict.fromkeys(request.models))
+    feature_record = _fetch_feature_vector(request.student_id, request.feature_version, model_types)
+    if not feature_record:
+        raise HTTPException(status_code=404, detail="Feature vector not found for student")
+
+    features = feature_record["features"]
+    feature_version = feature_record["feature_version"]
+    feature_timestamp = feature_record.get("feature_timestamp")
+
+    bundles: Dict[str, Any] = {}
+    fallback_reasons: Dict[str, str] = {model_type: "Rule-based baseline" for model_type in model_types}
+    if not request.force_fallback:
+        for model_type, bundle in load_model_artifacts(model_types).items():
+            if isinstance(bundle, (ModelNotDeployedError, ModelFileMissingError, RegistryUnavailableError)):
+                fallback_reasons[model_type] = str(bundle)
+            elif isinstance(bundle, Exception):
+                fallback_reasons[model_type] = f"Model inference failed: {bundle}"
+            elif not bundle["artifact"].get("feature_names"):
+                fallback_reasons[model_type] = f"Missing feature names for model '{model_type}'"
+            else:
+                bundles[model_type] = bundle
+
+    # A swept feature must be an input of a model that scores the sweep: an artifact's
+    # feature names, or the schema for models swept with the rule-based heuristics
+    known = {name for bundle in bundles.values() for name in bundle["artifact"]["feature_names"]}
+    if len(bundles) < len(model_types):
+        known.update(get_schema(feature_version).names)
+    unknown_features = [name for name in axis_names if name not in known]
+    if unknown_features:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown features for models {model_types}: {unknown_features}",
+        )
+
+    # Row 0 is the unperturbed baseline; rows 1.. follow the grid in row-major order
+    grid = np.stack([mesh.ravel() for mesh in np.meshgrid(*axes, indexing="ij")], axis=1)
+
+    baseline: Dict[str, float] = {}
+    surfaces: Dict[str, List[float]] = {}
+    metadata: Dict[str, PredictionMetadata] = {}
+
+    if bundles:
+        base_names = union_feature_names(
+            [bundle["artifact"]["feature_names"] for bundle in bundles.values()] + [axis_names]
+        )
+        base_vector = extract_feature_vector(features, base_names)
+        matrix = np.repeat(base_vector, point_count + 1, axis=0)
+        positions = [base_names.index(name) for name in axis_names]
+        matrix[1:, positions] = grid
+
+        for model_type, bundle in bundles.items():
+            artifact = bundle["artifact"]
+            try:
+                vector = select_columns(matrix, base_names, artifact["feature_names"])
+                scaler = artifact.get("scaler")
+                if scaler is not None:
+                    vector = scaler.transform(vector)
+                with inference_model(artifact["model"], len(vector)) as runner:
+                    scores = runner.predict_proba(vector)[:, 1].astype(np.float64) * 100
+            except Exception as exc:  # noqa: BLE001
+                fallback_reasons[model_type] = f"Model inference failed: {exc}"
+                continue
+            baseline[model_type] = round(float(scores[0]), 2)
+            surfaces[model_type] = np.round(scores[1:], 2).tolist()
+            metadata[model_type] = _build_metadata(
+                bundle.get("metadata", {}),
+                feature_version,
+                feature_timestamp,
+                used_fallback=False,
+                fallback_reason=None,
+                feature_record=feature_record,
+            )
+
+    rule_models = [model_type for model_type in model_types if model_type not in surfaces]
+    if rule_models:
+        schema = get_schema(feature_version)
+        rule_scores: Dict[str, List[float]] = {model_type: [] for model_type in rule_models}
+        for point in grid:
+            perturbed = _apply_overrides(features, dict(zip(axis_names, point.tolist())), schema)
+            for model_type in rule_models:
+                rule_scores[model_type].append(RISK_RULES[model_type](perturbed)["score"])
+        for model_type in rule_models:
+            baseline[model_type] = RISK_RULES[model_type](features)["score"]
+            surfaces[model_type] = rule_scores[model_type]
+            metadata[model_type] = _build_metadata(
+                {"model_name": f"rule_based_{model_type}", "version": "fallback"},
+                feature_version,
+                feature_timestamp,
+                used_fallback=True,
+                fallback_reason=fallback_reasons[model_type],
+                feature_record=feature_record,
+            )
+
+    return encode_response(
+        construct(
+            WhatIfResponse,
+            student_id=request.student_id,
+            axes={name: axis.tolist() for name, axis in zip(axis_names, axes)},
+            grid_shape=grid_shape,
+            baseline={model_type: baseline[model_type] for model_type in model_types},
+            surfaces={model_type: surfaces[model_type] for model_type in model_types},
+            metadata={model_type: metadata[model_type] for model_type in model_types},
+            generated_at=datetime.utcnow(),
+        ),
+        http_request,
+    )
+
+
+@app.post("/predict/risk/explain", response_model=ExplainResponse)
+def explain_risk(request: ExplainRequest, http_request: Request) -> Response:
+    student_ids = list(dict.fromkeys(request.student_ids))
+    model_types = list(dict.fromkeys(request.models))
+    if not student_ids:
+        raise HTTPException(status_code=422, detail="At least one student_id is required")
+    if len(student_ids) > EXPLAIN_MAX_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(student_ids)} students (max {EXPLAIN_MAX_BATCH})",
+        )
+    unsupported = [model_type for model_type in model_types if model_type not in RISK_RULES]
+    if unsupported or not model_types:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Supported models are {sorted(RISK_RULES)}; got {request.models}",
+        )
+
+    records = _fetch_feature_vectors(student_ids, request.feature_version, model_types)
+    missing = [student_id for student_id in student_ids if student_id not in records]
+    present = [student_id for student_id in student_ids if student_id in records]
+
+    unavailable: Dict[str, str] = {}
+    bundles: Dict[str, Dict[str, Any]] = {}
+    for model_type, bundle in load_model_artifacts(model_types).items():
+        if isinstance(bundle, Exception):
+            unavailable[model_type] = str(bundle)
+        elif not bundle["artifact"].get("feature_names"):
+            unavailable[model_type] = f"Missing feature names for model '{model_type}'"
+        else:
+            bundles[model_type] = bundle
+
+    results: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    pending: Dict[str, List[int]] = {}
+    for model_type, bundle in bundles.items():
+        for row, student_id in enumerate(present):
+            entry = EXPLANATION_CACHE.get(
+                _explanation_key(model_type, bundle.get("version"), student_id, records[student_id])
+            )
+            if entry is not None:
+                results[(model_type, student_id)] = {**entry, "cached": True}
+            else:
+                pending.setdefault(model_type, []).append(row)
+
+    if pending:
+        # One base matrix for every student still needing an explanation, shared by all models
+        base_names = union_feature_names(bundles[model_type]["artifact"]["feature_names"] for model_type in pending)
+        base_matrix = extract_feature_matrix([records[student_id]["features"] for student_id in present], base_names)
+
+        for model_type, rows in pending.items():
+            bundle = bundles[model_type]
+            artifact = bundle["artifact"]
+            feature_names = artifact["feature_names"]
+            raw = select_columns(base_matrix[rows], base_names, feature_names)
+            try:
+                scaled = artifact["scaler"].transform(raw) if artifact.get("scaler") is not None else raw
+                with inference_model(artifact["model"], len(scaled)) as runner:
+                    scores = runner.predict_proba(scaled)[:, 1].astype(np.float64) * 100
+                    contributions = compute_contributions(runner, scaled)
+            except Exception as exc:  # noqa: BLE001
+                unavailable[model_type] = f"Explanation failed: {exc}"
+                continue
+
+            for position, row in enumerate(rows):
+                student_id = present[row]
+                entry = {
+                    "score": float(scores[position]),
+                    "contributions": rank_contributions(contributions[position], raw[position], feature_names),
+                }
+                EXPLANATION_CACHE.set(
+                    _explanation_key(model_type, bundle.get("version"), student_id, records[student_id]),
+                    entry,
+                )
+                results[(model_type, student_id)] = {**entry, "cached": False}
+
+    explanations = []
+    for student_id in present:
+        record = records[student_id]
+        for model_type in model_types:
+            entry = results.get((model_type, student_id))
+            if entry is None:
+                continue
+            explanations.append(
+                construct(
+                    StudentExplanation,
+                    student_id=student_id,
+                    model_type=model_type,
+                    score=round(entry["score"], 2),
+                    contributions=[
+                        construct(FeatureContribution, **item) for item in entry["contributions"][: request.top_k]
+                    ],
+                    metadata=_build_metadata(
+                        bundles[model_type].get("metadata", {}),
+                        record["feature_version"],
+                        record.get("feature_timestamp"),
+                        used_fallback=False,
+                        fallback_reason=None,
+                        feature_record=record,
+                    ),
+                    cached=entry["cached"],
+                )
+            )
+
+    return encode_response(
+        construct(
+            ExplainResponse,
+            explanations=explanations,
+            missing=missing,
+            unavailable=unavailable,
+            generated_at=datetime.utcnow(),
+        ),
+        http_request,
     )
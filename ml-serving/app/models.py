@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -13,6 +13,8 @@ class PredictionMetadata(BaseModel):
     feature_timestamp: Optional[datetime] = None
     used_fallback: bool = False
     fallback_reason: Optional[str] = None
+    stale: bool = False
+    stale_reason: Optional[str] = None
 
 
 class RiskPrediction(BaseModel):
@@ -28,6 +30,8 @@ class RiskRequest(BaseModel):
     student_id: str
     feature_version: Optional[str] = None
     force_fallback: bool = False
+    cascade: Optional[bool] = None
+    explain: bool = False
 
 
 class RiskResponse(BaseModel):
@@ -52,9 +56,114 @@ class DifficultyPrediction(BaseModel):
     metadata: PredictionMetadata
 
 
+class SentimentRequest(BaseModel):
+    texts: List[str]
+    force_fallback: bool = False
+
+
+class SentimentPrediction(BaseModel):
+    label: str
+    probability: float = Field(..., ge=0.0, le=1.0)
+    probabilities: Dict[str, float] = {}
+    cached: bool = False
+
+
+class SentimentResponse(BaseModel):
+    predictions: List[SentimentPrediction]
+    metadata: PredictionMetadata
+    generated_at: datetime
+
+
+class CareerRequest(BaseModel):
+    student_id: str
+    top_k: int = Field(3, ge=1, le=20)
+    feature_version: Optional[str] = None
+    force_fallback: bool = False
+    use_cache: bool = True
+
+
+class CareerBatchRequest(BaseModel):
+    student_ids: List[str]
+    top_k: int = Field(3, ge=1, le=20)
+    feature_version: Optional[str] = None
+    force_fallback: bool = False
+    precompute: bool = False
+
+
+class CareerRecommendation(BaseModel):
+    bucket: str
+    probability: float = Field(..., ge=0.0, le=1.0)
+
+
+class CareerPrediction(BaseModel):
+    student_id: str
+    recommendations: List[CareerRecommendation]
+    metadata: PredictionMetadata
+    generated_at: datetime
+    cached: bool = False
+
+
+class CareerBatchResponse(BaseModel):
+    predictions: List[CareerPrediction] = []
+    missing: List[str] = []
+    precomputed: int = 0
+    generated_at: datetime
+
+
+class WhatIfRequest(BaseModel):
+    student_id: str
+    perturbations: Dict[str, List[float]]
+    models: List[str] = ["dropout", "burnout"]
+    feature_version: Optional[str] = None
+    force_fallback: bool = False
+
+
+class WhatIfResponse(BaseModel):
+    student_id: str
+    axes: Dict[str, List[float]]
+    grid_shape: List[int]
+    baseline: Dict[str, float]
+    surfaces: Dict[str, List[float]]
+    metadata: Dict[str, PredictionMetadata]
+    generated_at: datetime
+
+
+class ExplainRequest(BaseModel):
+    student_ids: List[str]
+    models: List[str] = ["dropout", "burnout"]
+    top_k: int = Field(5, ge=1, le=50)
+    feature_version: Optional[str] = None
+
+
+class FeatureContribution(BaseModel):
+    feature: str
+    label: str
+    value: float
+    contribution: float
+
+
+class StudentExplanation(BaseModel):
+    student_id: str
+    model_type: str
+    score: float = Field(..., ge=0, le=100)
+    contributions: List[FeatureContribution]
+    metadata: PredictionMetadata
+    cached: bool = False
+
+
+class ExplainResponse(BaseModel):
+    explanations: List[StudentExplanation] = []
+    missing: List[str] = []
+    unavailable: Dict[str, str] = {}
+    generated_at: datetime
+
+
 class HealthResponse(BaseModel):
     status: str
     timestamp: datetime
     cache: Dict[str, str]
     deployed_models: Dict[str, Optional[str]]
     feature_version: Optional[str]
+    circuit_breakers: Dict[str, Dict[str, Any]] = {}
+    feature_cache: Dict[str, Any] = {}
+    inference_threads: Dict[str, Any] = {}
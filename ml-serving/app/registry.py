@@ -1,18 +1,52 @@
 from __future__ import annotations
 
+import importlib
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
 import joblib
 import numpy as np
-from supabase import Client, create_client
+from feature_schema import FEATURE_VERSION, FeatureExtractor, get_schema
+
+from .datastore import get_data_backend, get_supabase  # noqa: F401 - re-exported
+from .introspect import process_rss_bytes
+from .resilience import call_with_budget
+from .threads import configure_artifact
 
 
 MODEL_CACHE: Dict[str, Dict[str, Any]] = {}
 
+# Model types the registry reported as not deployed; they need no feature paths beyond the rules
+NOT_DEPLOYED: Dict[str, str] = {}
+
+# Metadata lookups and artifact loads for different model types are independent I/O
+_ARTIFACT_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ARTIFACT_POOL_SIZE", "4")),
+    thread_name_prefix="artifact",
+)
+
+
+# Unpickling is mostly GIL-bound, so serialising loads costs little and keeps each
+# load's time and RSS growth its own rather than blurred by its neighbours
+_LOAD_LOCK = threading.Lock()
+
+# Modules the artifacts unpickle into; imported before the first timed load so
+# it is not charged with the one-off library import
+MODEL_MODULES = (
+    "sklearn.feature_extraction.text",
+    "sklearn.linear_model",
+    "sklearn.pipeline",
+    "sklearn.preprocessing",
+    "xgboost.sklearn",
+    "lightgbm.sklearn",
+)
+
 
 class ModelNotDeployedError(RuntimeError):
     pass
@@ -22,6 +56,10 @@ class ModelFileMissingError(RuntimeError):
     pass
 
 
+class RegistryUnavailableError(RuntimeError):
+    pass
+
+
 def get_model_registry_dir() -> Path:
     registry = os.getenv("MODEL_REGISTRY_DIR", "../ml-training/data/models")
     base = Path(__file__).resolve().parents[2]
@@ -29,32 +67,36 @@ def get_model_registry_dir() -> Path:
     return candidate
 
 
-@lru_cache(maxsize=1)
-def get_supabase() -> Client:
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-    if not url or not key:
-        raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
-    return create_client(url, key)
-
-
 def fetch_deployed_model_metadata(model_type: str) -> Dict[str, Any]:
-    supabase = get_supabase()
-    response = supabase.table("ml_model_versions").select("*").eq("model_type", model_type).eq("deployed", True).order("deployed_at", desc=True).limit(1).execute()
+    def query():
+        metadata = get_data_backend().deployed_model(model_type)
+        if not metadata:
+            NOT_DEPLOYED[model_type] = datetime.utcnow().isoformat()
+            raise ModelNotDeployedError(f"No deployed model found for type '{model_type}'")
 
-    if not response.data:
-        raise ModelNotDeployedError(f"No deployed model found for type '{model_type}'")
+        NOT_DEPLOYED.pop(model_type, None)
+        return metadata
 
-    return response.data[0]
+    return call_with_budget("registry", query, passthrough=(ModelNotDeployedError,))
 
 
 def load_model_artifact(model_type: str) -> Dict[str, Any]:
-    metadata = fetch_deployed_model_metadata(model_type)
+    try:
+        metadata = fetch_deployed_model_metadata(model_type)
+    except ModelNotDeployedError:
+        raise
+    except Exception as exc:  # noqa: BLE001 - timeouts, open circuit, backend errors
+        # Keep serving the last artifact we resolved rather than failing with the registry
+        cached = MODEL_CACHE.get(model_type)
+        if cached:
+            return _mark_used(cached)
+        raise RegistryUnavailableError(f"Model registry unavailable: {exc}") from exc
+
     version = metadata.get("version")
 
     cached = MODEL_CACHE.get(model_type)
     if cached and cached.get("version") == version:
-        return cached
+        return _mark_used(cached)
 
     model_path = metadata.get("model_path")
     if not model_path:
@@ -74,34 +116,130 @@ def load_model_artifact(model_type: str) -> Dict[str, Any]:
         else:
             raise ModelFileMissingError(f"Model file not found: {candidate}")
 
-    artifact = joblib.load(candidate)
+    import_model_modules()
+    with _LOAD_LOCK:
+        rss_before = process_rss_bytes()
+        started = time.perf_counter()
+        artifact = joblib.load(candidate)
+        load_seconds = time.perf_counter() - started
+        rss_after = process_rss_bytes()
     MODEL_CACHE[model_type] = {
         "artifact": artifact,
         "version": version,
         "metadata": metadata,
         "path": str(candidate),
         "loaded_at": datetime.utcnow().isoformat(),
+        "threads": configure_artifact(artifact),
+        "load_seconds": load_seconds,
+        "load_rss_delta_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        "last_used": time.time(),
     }
     return MODEL_CACHE[model_type]
 
 
+@lru_cache(maxsize=1)
+def import_model_modules() -> Tuple[str, ...]:
+    """Import the installed model libraries once; returns the modules that loaded."""
+    loaded = []
+    for name in MODEL_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        loaded.append(name)
+    return tuple(loaded)
+
+
+def _mark_used(bundle: Dict[str, Any]) -> Dict[str, Any]:
+    bundle["last_used"] = time.time()
+    return bundle
+
+
+def load_model_artifacts(model_types: Iterable[str]) -> Dict[str, Union[Dict[str, Any], Exception]]:
+    """Resolve several artifacts concurrently; failures are returned per model type."""
+    futures = {model_type: _ARTIFACT_POOL.submit(load_model_artifact, model_type) for model_type in model_types}
+    bundles: Dict[str, Union[Dict[str, Any], Exception]] = {}
+    for model_type, future in futures.items():
+        try:
+            bundles[model_type] = future.result()
+        except Exception as exc:  # noqa: BLE001
+            bundles[model_type] = exc
+    return bundles
+
+
 def clear_model_cache(model_type: Optional[str] = None) -> None:
     if model_type:
         MODEL_CACHE.pop(model_type, None)
+        NOT_DEPLOYED.pop(model_type, None)
     else:
         MODEL_CACHE.clear()
+        NOT_DEPLOYED.clear()
 
 
-def flatten_features(features: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
-    flat: Dict[str, Any] = {}
-    for key, value in features.items():
-        path = f"{prefix}{key}" if not prefix else f"{prefix}_{key}"
-        if isinstance(value, dict):
-            flat.update(flatten_features(value, path))
-        else:
-            flat[path] = value
-    return flat
+def feature_name_path(name: str) -> Tuple[str, ...]:
+    """Nested path for a flattened feature name, as the schema extractor reads it."""
+    return get_schema(FEATURE_VERSION).path(name)
+
+
+def required_feature_paths(
+    model_types: Iterable[str],
+    base_paths: Iterable[Tuple[str, ...]] = (),
+) -> Optional[List[Tuple[str, ...]]]:
+    """
+    Union of nested feature paths read by the loaded artifacts and ``base_paths``.
+
+    Returns None when a requested model type has not been resolved yet; callers
+    then fetch the full feature record.
+    """
+    for model_type in model_types:
+        if model_type not in MODEL_CACHE and model_type not in NOT_DEPLOYED:
+            return None
+
+    paths: Dict[Tuple[str, ...], None] = dict.fromkeys(base_paths)
+    # Include every loaded artifact so cached records stay usable across endpoints
+    for bundle in list(MODEL_CACHE.values()):
+        artifact = bundle.get("artifact")
+        feature_names = artifact.get("feature_names") if isinstance(artifact, dict) else None
+        for name in feature_names or []:
+            paths[feature_name_path(name)] = None
+    return list(paths)
+
+
+def feature_extractor(feature_names: Sequence[str], version: Optional[str] = None) -> FeatureExtractor:
+    """Compiled schema extractor for ``feature_names``; shared with ml-training, cached per name list."""
+    return get_schema(version).extractor(feature_names)
+
+
+def extract_feature_vector(
+    features: Dict[str, Any],
+    feature_names: Sequence[str],
+    version: Optional[str] = None,
+) -> np.ndarray:
+    """One nested feature record as a (1, n) float64 row, with values rounded like the training frames."""
+    return feature_extractor(feature_names, version).vector(features).astype(np.float64)
+
+
+def extract_feature_matrix(
+    records: Sequence[Dict[str, Any]],
+    feature_names: Sequence[str],
+    version: Optional[str] = None,
+) -> np.ndarray:
+    return feature_extractor(feature_names, version).matrix(records).astype(np.float64)
+
+
+def union_feature_names(name_lists: Iterable[Sequence[str]]) -> List[str]:
+    return list(dict.fromkeys(name for names in name_lists for name in names))
+
+
+@lru_cache(maxsize=64)
+def column_index(base_names: Tuple[str, ...], feature_names: Tuple[str, ...]) -> Optional[np.ndarray]:
+    """Columns of ``base_names`` to take for ``feature_names``; None when they already match."""
+    if base_names == feature_names:
+        return None
+    position = {name: index for index, name in enumerate(base_names)}
+    return np.array([position[name] for name in feature_names], dtype=np.intp)
 
 
-def vectorise_features(flat_features: Dict[str, Any], feature_names: list[str]) -> np.ndarray:
-    return np.array([flat_features.get(name, 0) for name in feature_names]).reshape(1, -1)
+def select_columns(base: np.ndarray, base_names: Sequence[str], feature_names: Sequence[str]) -> np.ndarray:
+    index = column_index(tuple(base_names), tuple(feature_names))
+    return base if index is None else base[:, index]
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+
+T = TypeVar("T")
+
+# Per-stage time budgets in milliseconds. A value of 0 disables the deadline.
+STAGE_BUDGETS_MS: Dict[str, float] = {
+    "feature_store": float(os.getenv("FEATURE_STORE_TIMEOUT_MS", "800")),
+    "registry": float(os.getenv("REGISTRY_TIMEOUT_MS", "500")),
+}
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30"))
+
+_STAGE_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("STAGE_POOL_SIZE", "16")),
+    thread_name_prefix="stage",
+)
+
+
+class StageTimeoutError(RuntimeError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a half-open probe after the reset window."""
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                # Let exactly one request through to test the dependency
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.failure_threshold > 0 and self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures}
+
+
+BREAKERS: Dict[str, CircuitBreaker] = {
+    stage: CircuitBreaker(stage, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+    for stage in STAGE_BUDGETS_MS
+}
+
+
+def call_with_budget(
+    stage: str,
+    fn: Callable[[], T],
+    passthrough: Tuple[Type[BaseException], ...] = (),
+) -> T:
+    """
+    Run ``fn`` under the stage's time budget and circuit breaker.
+
+    Exceptions listed in ``passthrough`` are treated as valid answers from the
+    dependency and do not count as breaker failures.
+    """
+    breaker = BREAKERS[stage]
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit open for {stage} after {breaker.failures} failures")
+
+    budget_ms = STAGE_BUDGETS_MS.get(stage, 0)
+    try:
+        if budget_ms > 0:
+            future = _STAGE_POOL.submit(fn)
+            try:
+                result = future.result(timeout=budget_ms / 1000)
+            except FutureTimeoutError as exc:
+                future.cancel()
+                raise StageTimeoutError(f"{stage} exceeded {budget_ms:.0f}ms budget") from exc
+        else:
+            result = fn()
+    except passthrough:
+        breaker.record_success()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+
+    breaker.record_success()
+    return result
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    return {stage: breaker.snapshot() for stage, breaker in BREAKERS.items()}
@@ -3,6 +3,29 @@ from __future__ import annotations
 from typing import Dict, List, Tuple
 
 
+# Every nested feature the heuristics read; projected feature-store reads must include these
+RULE_FEATURE_PATHS: List[Tuple[str, ...]] = [
+    ("behavioral", "behavioral_change_score"),
+    ("behavioral", "consistency_score"),
+    ("emotional", "avg_emotion_score_7d"),
+    ("emotional", "avg_energy_level_7d"),
+    ("emotional", "emotion_trend"),
+    ("emotional", "low_energy_days_count_30d"),
+    ("emotional", "stress_days_count_30d"),
+    ("engagement", "chat_session_count_30d"),
+    ("engagement", "checkin_completion_rate_7d"),
+    ("engagement", "streak_break_count"),
+    ("performance", "ark_progress_rate_30d"),
+    ("performance", "milestone_completion_rate"),
+    ("performance", "progress_decline_days_30d"),
+    ("performance", "xp_earning_rate"),
+    ("profile", "confidence_level"),
+    ("profile", "goals_count"),
+    ("profile", "hours_per_week"),
+    ("profile", "motivation_level"),
+]
+
+
 def _get_nested(data: Dict, *keys, default=None):
     value = data
     for key in keys:
@@ -184,3 +207,73 @@ def rule_based_difficulty(features: Dict) -> Dict:
         "confidence": round(_clamp(confidence_score, 0.4, 0.95), 3),
         "recommendations": recommendations,
     }
+
+
+_POSITIVE_TERMS = {
+    "confident", "enjoy", "enjoyed", "excited", "focused", "glad", "good", "great",
+    "happy", "improved", "improving", "love", "motivated", "productive", "progress",
+    "proud", "relaxed", "thanks", "understand", "understood",
+}
+
+_NEGATIVE_TERMS = {
+    "angry", "anxious", "bored", "burnout", "confused", "depressed", "difficult",
+    "exhausted", "fail", "failed", "frustrated", "give up", "hate", "lonely", "lost",
+    "overwhelmed", "quit", "sad", "stressed", "stuck", "tired", "worried",
+}
+
+
+def rule_based_sentiment(text: str) -> Dict:
+    normalized = f" {' '.join(''.join(ch if ch.isalnum() else ' ' for ch in text.lower()).split())} "
+    positive = sum(1 for term in _POSITIVE_TERMS if f" {term} " in normalized)
+    negative = sum(1 for term in _NEGATIVE_TERMS if f" {term} " in normalized)
+
+    polarity = (positive - negative) / (positive + negative + 1)
+    positive_p = _clamp(0.3 + polarity * 0.55, 0.05, 0.9)
+    negative_p = _clamp(0.3 - polarity * 0.55, 0.05, 0.9)
+    neutral_p = max(0.05, 1 - positive_p - negative_p)
+    total = positive_p + negative_p + neutral_p
+
+    probabilities = {
+        "negative": round(negative_p / total, 3),
+        "neutral": round(neutral_p / total, 3),
+        "positive": round(positive_p / total, 3),
+    }
+    label = max(probabilities, key=probabilities.get)
+
+    return {
+        "label": label,
+        "probability": probabilities[label],
+        "probabilities": probabilities,
+    }
+
+
+CAREER_BUCKETS = ["career_explorer", "career_builder", "career_leader", "career_champion"]
+
+
+def rule_based_career(features: Dict) -> Dict:
+    motivation = _get_nested(features, "profile", "motivation_level", default=6.0)
+    confidence = _get_nested(features, "profile", "confidence_level", default=6.0)
+    goals = _get_nested(features, "profile", "goals_count", default=0)
+    progress_rate = _get_nested(features, "performance", "ark_progress_rate_30d", default=0.0)
+    milestones = _get_nested(features, "performance", "milestone_completion_rate", default=0.0)
+    consistency = _get_nested(features, "behavioral", "consistency_score", default=0.0)
+
+    # 0..1 readiness blend; higher readiness shifts mass to the more advanced buckets
+    readiness = (
+        _clamp(motivation / 10, 0, 1) * 0.25
+        + _clamp(confidence / 10, 0, 1) * 0.2
+        + _clamp(goals / 5, 0, 1) * 0.1
+        + _clamp(progress_rate, 0, 1) * 0.2
+        + _clamp(milestones, 0, 1) * 0.15
+        + _clamp(consistency, 0, 1) * 0.1
+    )
+    position = readiness * (len(CAREER_BUCKETS) - 1)
+    weights = [1 / (1 + abs(position - index) * 2) for index in range(len(CAREER_BUCKETS))]
+    total = sum(weights)
+
+    ranked: List[Tuple[str, float]] = sorted(
+        ((bucket, round(weight / total, 3)) for bucket, weight in zip(CAREER_BUCKETS, weights)),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    return {"ranked": ranked}
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import copy
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+def _available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+WORKER_PROCESSES = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Threads one process may spend on a single inference call; defaults to its share of the CPUs
+INFERENCE_THREAD_BUDGET = int(os.getenv("INFERENCE_THREAD_BUDGET", "0")) or max(
+    1, _available_cpus() // max(WORKER_PROCESSES, 1)
+)
+# Batches smaller than this run single-threaded; thread start-up costs more than it saves
+PARALLEL_MIN_ROWS = int(os.getenv("INFERENCE_PARALLEL_MIN_ROWS", "512"))
+BLAS_THREADS = int(os.getenv("INFERENCE_BLAS_THREADS", "1"))
+
+# Libraries that initialise their OpenMP/BLAS runtimes after this import pick these up
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+for _variable in ("OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_variable, str(BLAS_THREADS))
+
+try:
+    from threadpoolctl import threadpool_info, threadpool_limits
+except ImportError:  # pragma: no cover - threadpoolctl ships with scikit-learn
+    threadpool_info = threadpool_limits = None
+
+if threadpool_limits is not None:
+    # Runtimes numpy/scipy already loaded ignore the environment; cap them directly
+    threadpool_limits(limits=BLAS_THREADS, user_api="blas")
+
+# One multi-threaded call at a time keeps the process within its budget
+_PARALLEL_SLOT = threading.BoundedSemaphore(1)
+_PARALLEL_MODELS: "weakref.WeakKeyDictionary[Any, Any]" = weakref.WeakKeyDictionary()
+_PARALLEL_LOCK = threading.Lock()
+
+_STATS_LOCK = threading.Lock()
+CALL_STATS = {"single": 0, "parallel": 0, "parallel_busy": 0}
+
+
+def set_model_threads(model: Any, threads: int) -> Optional[str]:
+    """Set the inference thread count on a fitted model; returns the library configured."""
+    if hasattr(model, "steps"):  # sklearn Pipeline
+        libraries = [set_model_threads(step, threads) for _, step in model.steps if hasattr(step, "get_params")]
+        return next((library for library in libraries if library), None)
+
+    if hasattr(model, "get_booster"):
+        model.set_params(n_jobs=threads)
+        model.get_booster().set_param({"nthread": threads})
+        return "xgboost"
+
+    if hasattr(model, "booster_"):
+        model.set_params(n_jobs=threads)  # LightGBM passes n_jobs to predict as num_threads
+        return "lightgbm"
+
+    if hasattr(model, "get_params") and "n_jobs" in model.get_params(deep=False):
+        model.set_params(n_jobs=threads)
+        return "sklearn"
+
+    return None
+
+
+def model_threads(model: Any) -> int:
+    """Thread count a model was configured with by ``set_model_threads``; 1 when unset."""
+    if hasattr(model, "steps"):
+        model = model.steps[-1][1]
+    params = model.get_params(deep=False) if hasattr(model, "get_params") else {}
+    threads = params.get("n_jobs")
+    return threads if isinstance(threads, int) and threads > 0 else 1
+
+
+def configure_artifact(artifact: Any) -> Dict[str, Any]:
+    """Make a freshly loaded artifact single-threaded and describe its thread configuration."""
+    model = artifact.get("model") if isinstance(artifact, dict) else artifact
+    library = set_model_threads(model, 1) if model is not None else None
+    return {
+        "library": library or type(model).__name__,
+        "single_threads": 1,
+        "parallel_threads": INFERENCE_THREAD_BUDGET if library else 1,
+    }
+
+
+def _parallel_model(model: Any) -> Any:
+    with _PARALLEL_LOCK:
+        parallel = _PARALLEL_MODELS.get(model)
+        if parallel is None:
+            # A separate copy, so single-threaded callers never see a changed nthread
+            parallel = copy.deepcopy(model)
+            if set_model_threads(parallel, INFERENCE_THREAD_BUDGET) is None:
+                parallel = model
+            _PARALLEL_MODELS[model] = parallel
+        return parallel
+
+
+def has_parallel_copy(model: Any) -> bool:
+    with _PARALLEL_LOCK:
+        return model in _PARALLEL_MODELS
+
+
+def _count(key: str) -> None:
+    with _STATS_LOCK:
+        CALL_STATS[key] += 1
+
+
+@contextmanager
+def inference_model(model: Any, rows: int) -> Iterator[Any]:
+    """
+    Yield the model to run ``rows`` rows through.
+
+    Small batches use the single-threaded model. Large batches use a copy
+    configured with the full thread budget when no other large batch holds it;
+    otherwise they run single-threaded rather than oversubscribing the cores.
+    """
+    if rows < PARALLEL_MIN_ROWS or INFERENCE_THREAD_BUDGET <= 1:
+        _count("single")
+        yield model
+        return
+
+    if not _PARALLEL_SLOT.acquire(blocking=False):
+        _count("parallel_busy")
+        yield model
+        return
+
+    try:
+        _count("parallel")
+        yield _parallel_model(model)
+    finally:
+        _PARALLEL_SLOT.release()
+
+
+def _threadpools() -> List[Dict[str, Any]]:
+    if threadpool_info is None:
+        return []
+    seen = {}
+    for pool in threadpool_info():
+        key = (pool.get("user_api"), pool.get("internal_api"), pool.get("prefix"))
+        seen[key] = {
+            "user_api": pool.get("user_api"),
+            "internal_api": pool.get("internal_api"),
+            "library": pool.get("prefix"),
+            "num_threads": pool.get("num_threads"),
+        }
+    return list(seen.values())
+
+
+def thread_report() -> Dict[str, Any]:
+    with _STATS_LOCK:
+        calls = dict(CALL_STATS)
+    return {
+        "cpus": _available_cpus(),
+        "worker_processes": WORKER_PROCESSES,
+        "budget": INFERENCE_THREAD_BUDGET,
+        "parallel_min_rows": PARALLEL_MIN_ROWS,
+        "blas_threads": BLAS_THREADS,
+        "omp_num_threads": os.environ.get("OMP_NUM_THREADS"),
+        "threadpools": _threadpools(),
+        "calls": calls,
+    }
@@ -0,0 +1,96 @@
+"""
+Time the hot data-access queries against the configured ML_DATA_BACKEND.
+
+    ML_DATA_BACKEND=sqlite DATABASE_URL=sqlite:///bench.sqlite3 \
+        python -m bench.backend_latency --seed-students 2000 --lookups 5000
+
+    ML_DATA_BACKEND=postgres DATABASE_URL=postgresql://... python -m bench.backend_latency
+
+Prints a JSON report with per-query latency percentiles.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.datastore import SqliteBackend, get_data_backend
+from app.rule_based import RULE_FEATURE_PATHS
+from bench import synthetic
+
+
+def seed_sqlite(backend: SqliteBackend, students: int, rows_per_student: int = 3) -> List[str]:
+    conn = backend._connection()
+    conn.executescript(synthetic.SCHEMA)
+    synthetic.seed_database(conn, students, rows_per_student)
+    now = datetime.utcnow()
+    conn.execute(
+        "INSERT OR REPLACE INTO ml_model_versions (id, model_name, version, model_type, model_path, deployed, deployed_at) "
+        "VALUES ('bench-dropout', 'bench_dropout', '0.0.1', 'dropout', 'missing.pkl', 1, ?)",
+        (now.isoformat(),),
+    )
+    conn.commit()
+    return [row[0] for row in conn.execute("SELECT DISTINCT student_id FROM ml_feature_store")]
+
+
+def time_calls(fn: Callable[[], object], count: int) -> Dict[str, float]:
+    samples = np.empty(count)
+    for index in range(count):
+        started = time.perf_counter()
+        fn()
+        samples[index] = (time.perf_counter() - started) * 1000
+    return {
+        "calls": count,
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ml-serving data-access backends")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--seed-students", type=int, default=0, help="Seed synthetic rows (sqlite only)")
+    parser.add_argument("--student-ids", nargs="*", default=None)
+    args = parser.parse_args()
+
+    backend = get_data_backend()
+    student_ids = args.student_ids or []
+    if args.seed_students:
+        if not isinstance(backend, SqliteBackend):
+            raise SystemExit("--seed-students is only supported for the sqlite backend")
+        student_ids = seed_sqlite(backend, args.seed_students)
+    if not student_ids:
+        raise SystemExit("Provide --student-ids or --seed-students")
+
+    rng = random.Random(11)
+    paths = list(RULE_FEATURE_PATHS)
+    report = {
+        "backend": backend.name,
+        "latest_feature_row_full": time_calls(
+            lambda: backend.latest_feature_row(rng.choice(student_ids), "1.0.0"), args.lookups
+        ),
+        "latest_feature_row_projected": time_calls(
+            lambda: backend.latest_feature_row(rng.choice(student_ids), "1.0.0", paths), args.lookups
+        ),
+        "latest_feature_rows_batch": time_calls(
+            lambda: backend.latest_feature_rows(
+                rng.sample(student_ids, min(args.batch_size, len(student_ids))), "1.0.0", paths
+            ),
+            max(1, args.lookups // 20),
+        ),
+        "deployed_model": time_calls(lambda: backend.deployed_model("dropout"), args.lookups),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""
+End-to-end load test of the serving app against the local Supabase stand-in.
+
+    python -m bench.loadtest --students 2000 --concurrency 16 --duration 30
+    python -m bench.loadtest --rate 200 --mix risk=0.6,difficulty=0.3,health=0.1 --output current.json
+    python -m bench.loadtest --compare main HEAD --duration 20 --output compare.json
+
+Starts ``bench.fake_supabase`` and ``uvicorn app.main:app`` as subprocesses,
+drives ``/predict/risk``, ``/predict/difficulty`` and ``/health`` from a pool
+of client threads, and prints a JSON report with throughput, latency
+percentiles, error and fallback rates, and the RSS of the uvicorn process
+tree. With ``--rate`` the load is open-loop and latency is measured from each
+request's scheduled start, so queueing delay is included. With ``--compare``
+each revision is checked out into a temporary git worktree and measured
+against the same data, fake latency and load.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+from bench import synthetic
+from bench.fake_supabase import FAKE_KEY
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - /proc fallback below
+    psutil = None
+
+
+SERVING_DIR = Path(__file__).resolve().parents[1]
+REPO_ROOT = SERVING_DIR.parent
+DEFAULT_REGISTRY_DIR = REPO_ROOT / "ml-training" / "data" / "models"
+
+ENDPOINTS = ("risk", "difficulty", "health")
+DEFAULT_MIX = "risk=0.6,difficulty=0.3,health=0.1"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url: str, timeout: float, process: subprocess.Popen) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{process.args} exited with code {process.returncode}")
+        try:
+            if requests.get(url, timeout=1).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+def stop(process: Optional[subprocess.Popen]) -> None:
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def process_tree_rss(pid: int) -> int:
+    """Resident memory in bytes of ``pid`` and all its descendants (uvicorn workers)."""
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+            return sum(process.memory_info().rss for process in processes if process.is_running())
+        except psutil.NoSuchProcess:
+            return 0
+
+    parents: Dict[int, int] = {}
+    for entry in Path("/proc").iterdir():
+        if entry.name.isdigit():
+            try:
+                stat = (entry / "stat").read_text()
+            except OSError:
+                continue
+            parents[int(entry.name)] = int(stat.rsplit(")", 1)[1].split()[1])
+    tree, frontier = {pid}, [pid]
+    while frontier:
+        current = frontier.pop()
+        children = [child for child, parent in parents.items() if parent == current]
+        tree.update(children)
+        frontier.extend(children)
+    total = 0
+    for member in tree:
+        try:
+            for line in Path(f"/proc/{member}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return total
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid: int, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[int] = []
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            self.samples.append(process_tree_rss(self.pid))
+            self._stopped.wait(self.interval)
+
+    def stop(self) -> Dict[str, Optional[float]]:
+        self._stopped.set()
+        self.join()
+        self.samples.append(process_tree_rss(self.pid))
+        samples = [sample for sample in self.samples if sample]
+        if not samples:
+            return {"peak_mb": None, "final_mb": None}
+        return {"peak_mb": round(max(samples) / 2**20, 1), "final_mb": round(samples[-1] / 2**20, 1)}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}', expected one of {ENDPOINTS}")
+        mix[name] = float(weight)
+    return mix
+
+
+def used_fallback(endpoint: str, body: Dict[str, Any]) -> Optional[bool]:
+    if endpoint == "risk":
+        return any(body[model_type]["metadata"]["used_fallback"] for model_type in ("dropout", "burnout"))
+    if endpoint == "difficulty":
+        return bool(body["metadata"]["used_fallback"])
+    return None
+
+
+def send(session: requests.Session, base_url: str, endpoint: str, student_id: str, timeout: float) -> Tuple[bool, Optional[bool]]:
+    try:
+        if endpoint == "health":
+            response = session.get(f"{base_url}/health", timeout=timeout)
+        else:
+            path = "/predict/risk" if endpoint == "risk" else "/predict/difficulty"
+            response = session.post(f"{base_url}{path}", json={"student_id": student_id}, timeout=timeout)
+    except requests.RequestException:
+        return False, None
+    if response.status_code >= 400:
+        return False, None
+    return True, used_fallback(endpoint, response.json())
+
+
+def drive(
+    base_url: str,
+    student_ids: List[str],
+    mix: Dict[str, float],
+    concurrency: int,
+    duration: float,
+    rate: Optional[float],
+    timeout: float,
+    seed: int = 13,
+) -> Tuple[List[Tuple[str, float, bool, Optional[bool]]], float]:
+    """Run the load; returns ``(endpoint, latency_ms, ok, fallback)`` samples and the elapsed seconds."""
+    endpoints, weights = list(mix), list(mix.values())
+    samples: List[Tuple[str, float, bool, Optional[bool]]] = []
+    lock = threading.Lock()
+    ticket = itertools.count()
+    started = time.perf_counter()
+    deadline = started + duration
+
+    def worker(index: int) -> None:
+        rng = random.Random(seed + index)
+        session = requests.Session()
+        local = []
+        while True:
+            if rate:
+                with lock:
+                    scheduled = started + next(ticket) / rate
+                if scheduled >= deadline:
+                    break
+                time.sleep(max(0.0, scheduled - time.perf_counter()))
+            else:
+                scheduled = time.perf_counter()
+                if scheduled >= deadline:
+                    break
+            endpoint = rng.choices(endpoints, weights)[0]
+            ok, fallback = send(session, base_url, endpoint, rng.choice(student_ids), timeout)
+            local.append((endpoint, (time.perf_counter() - scheduled) * 1000, ok, fallback))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def summarise(samples: List[Tuple[str, float, bool, Optional[bool]]], elapsed: float) -> Dict[str, Any]:
+    def stats(rows: List[Tuple[str, float, bool, Optional[bool]]]) -> Dict[str, Any]:
+        if not rows:
+            return {"requests": 0}
+        latencies = np.array([row[1] for row in rows])
+        errors = sum(1 for row in rows if not row[2])
+        fallbacks = [row[3] for row in rows if row[3] is not None]
+        return {
+            "requests": len(rows),
+            "throughput_rps": round(len(rows) / elapsed, 2),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+            "max_ms": round(float(latencies.max()), 2),
+            "error_rate": round(errors / len(rows), 4),
+            "fallback_rate": round(sum(fallbacks) / len(fallbacks), 4) if fallbacks else None,
+        }
+
+    report = {"overall": stats(samples)}
+    for endpoint in ENDPOINTS:
+        rows = [row for row in samples if row[0] == endpoint]
+        if rows:
+            report[endpoint] = stats(rows)
+    return report
+
+
+def prepare_data(db_path: str, students: int, registry_dir: Path) -> List[str]:
+    conn = synthetic.connect(db_path)
+    existing = conn.execute("SELECT COUNT(DISTINCT student_id) FROM ml_feature_store").fetchone()[0]
+    if existing < students:
+        synthetic.seed_database(conn, students - existing)
+    if registry_dir.exists():
+        synthetic.register_models(conn, registry_dir)
+    student_ids = [row[0] for row in conn.execute("SELECT DISTINCT student_id FROM ml_feature_store")]
+    conn.close()
+    return student_ids
+
+
+def start_fake(args: argparse.Namespace, db_path: str) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "bench.fake_supabase",
+            "--db", db_path,
+            "--port", str(port),
+            "--latency-ms", str(args.fake_latency_ms),
+            "--jitter-ms", str(args.fake_jitter_ms),
+            "--error-rate", str(args.fake_error_rate),
+        ],
+        cwd=SERVING_DIR,
+        stdout=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    wait_until_ready(f"{url}/__fake/config", 30, process)
+    return process, url
+
+
+def measure(
+    args: argparse.Namespace,
+    serving_dir: Path,
+    fake_url: str,
+    student_ids: List[str],
+) -> Dict[str, Any]:
+    port = free_port()
+    env = {
+        **os.environ,
+        "SUPABASE_URL": fake_url,
+        "SUPABASE_SERVICE_ROLE_KEY": FAKE_KEY,
+        "ML_DATA_BACKEND": "postgrest",
+        "MODEL_REGISTRY_DIR": str(Path(args.registry_dir).resolve()),
+        **dict(item.split("=", 1) for item in args.env),
+    }
+    app = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--workers", str(args.workers),
+            "--log-level", "warning",
+        ],
+        cwd=serving_dir,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(f"{base_url}/health", 60, app)
+        mix = parse_mix(args.mix)
+        if args.warmup:
+            drive(base_url, student_ids, mix, args.concurrency, args.warmup, args.rate, args.timeout)
+        sampler = RssSampler(app.pid)
+        sampler.start()
+        samples, elapsed = drive(base_url, student_ids, mix, args.concurrency, args.duration, args.rate, args.timeout)
+        report = summarise(samples, elapsed)
+        report["worker_rss"] = sampler.stop()
+        report["worker_rss"]["workers"] = args.workers
+        return report
+    finally:
+        stop(app)
+
+
+def git_worktree(revision: str) -> Tuple[Path, str]:
+    commit = subprocess.check_output(["git", "rev-parse", "--short", revision], cwd=REPO_ROOT, text=True).strip()
+    path = Path(tempfile.mkdtemp(prefix=f"loadtest-{commit}-"))
+    subprocess.check_call(
+        ["git", "worktree", "add", "--detach", str(path), revision],
+        cwd=REPO_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return path, commit
+
+
+def compare_reports(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """Relative change of candidate vs baseline; negative latency and positive throughput are improvements."""
+    delta: Dict[str, Any] = {}
+    for section, metrics in candidate.items():
+        base = baseline.get(section)
+        if not isinstance(metrics, dict) or not isinstance(base, dict):
+            continue
+        delta[section] = {
+            key: round((value - base[key]) / base[key], 4)
+            for key, value in metrics.items()
+            if key.endswith(("_ms", "_rps", "_mb")) and isinstance(value, (int, float)) and base.get(key)
+        }
+    return delta
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test ml-serving against the local Supabase stand-in")
+    parser.add_argument("--db", default=None, help="SQLite feature store (created with synthetic data if missing)")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--registry-dir", default=str(DEFAULT_REGISTRY_DIR))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=None, help="Target requests/sec (open-loop); default closed-loop")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra app environment")
+    parser.add_argument("--fake-latency-ms", type=float, default=10.0)
+    parser.add_argument("--fake-jitter-ms", type=float, default=5.0)
+    parser.add_argument("--fake-error-rate", type=float, default=0.0)
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"), default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    parse_mix(args.mix)
+
+    db_path = args.db or str(Path(tempfile.mkdtemp(prefix="loadtest-")) / "feature_store.sqlite3")
+    student_ids = prepare_data(db_path, args.students, Path(args.registry_dir))
+
+    settings = {
+        key: getattr(args, key)
+        for key in ("concurrency", "rate", "duration", "mix", "workers", "fake_latency_ms", "fake_jitter_ms", "fake_error_rate")
+    }
+    settings["students"] = len(student_ids)
+
+    fake, fake_url = start_fake(args, db_path)
+    try:
+        if not args.compare:
+            report: Dict[str, Any] = {"settings": settings, "results": measure(args, SERVING_DIR, fake_url, student_ids)}
+        else:
+            runs = {}
+            for label, revision in zip(("baseline", "candidate"), args.compare):
+                worktree, commit = git_worktree(revision)
+                try:
+                    runs[label] = {
+                        "revision": revision,
+                        "commit": commit,
+                        "results": measure(args, worktree / "ml-serving", fake_url, student_ids),
+                    }
+                finally:
+                    subprocess.call(
+                        ["git", "worktree", "remove", "--force", str(worktree)],
+                        cwd=REPO_ROOT,
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                    )
+            report = {
+                "settings": settings,
+                **runs,
+                "delta": compare_reports(runs["baseline"]["results"], runs["candidate"]["results"]),
+            }
+    finally:
+        stop(fake)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
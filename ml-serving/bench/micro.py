@@ -0,0 +1,198 @@
+"""
+Microbenchmarks for the serving hot path.
+
+    python -m bench.micro --save micro-baseline.json
+    python -m bench.micro --check micro-baseline.json          # exit 1 on regressions
+    python -m bench.micro --check micro-baseline.json --only rule_based
+
+Each benchmark is timed with ``timeit`` autoranging. The best of
+``--repeats`` runs is reported as ``ns_per_op``; the best is used because it
+is the least sensitive to scheduler noise. The saved JSON carries a
+``threshold_pct`` per benchmark, and ``--check`` fails when the current
+``ns_per_op`` exceeds the baseline by more than that (or by ``--threshold``
+when given). Artifacts are trained on ``bench.synthetic`` feature vectors
+in the same ``{"model", "scaler", "feature_names"}`` layout as the trainers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from feature_schema import get_schema
+
+from app.encoding import construct, dump
+from app.main import _build_metadata, _compose_risk_prediction
+from app.models import PredictionMetadata, RiskResponse
+from app.registry import extract_feature_matrix, extract_feature_vector, feature_extractor
+from app.rule_based import rule_based_burnout, rule_based_difficulty, rule_based_dropout
+from app.threads import configure_artifact
+from bench import synthetic
+
+
+DEFAULT_THRESHOLD_PCT = 15.0
+
+# Benchmarks dominated by native code with their own threading are noisier
+THRESHOLD_OVERRIDES_PCT = {
+    "predict_proba_single": 25.0,
+    "predict_proba_batch_per_row": 25.0,
+    "predict_proba_single_loop_per_row": 25.0,
+}
+
+BATCH_SIZE = 256
+
+
+def build_artifact(samples: int = 2000, seed: int = 5) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBClassifier
+
+    rng = random.Random(seed)
+    vectors, labels = [], []
+    for _ in range(samples):
+        risk = rng.betavariate(2, 3)
+        features = synthetic.generate_feature_vector(rng, risk)
+        vectors.append(features)
+        labels.append(int(synthetic.generate_label("dropout", features, risk, rng)["outcome_type"] == "dropout"))
+
+    feature_names = list(get_schema().names)
+    matrix = extract_feature_matrix(vectors, feature_names)
+    scaler = StandardScaler().fit(matrix)
+    model = XGBClassifier(n_estimators=100, max_depth=4, learning_rate=0.1)
+    model.fit(scaler.transform(matrix), np.array(labels))
+    artifact = {"model": model, "scaler": scaler, "feature_names": feature_names}
+    configure_artifact(artifact)  # same thread settings the registry applies on load
+    return artifact, vectors
+
+
+def time_op(fn: Callable[[], Any], repeats: int, per_call: int = 1) -> Dict[str, float]:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = np.array(timer.repeat(repeat=repeats, number=number)) / (number * per_call) * 1e9
+    return {"ns_per_op": round(float(runs.min()), 1), "median_ns": round(float(np.median(runs)), 1)}
+
+
+def benchmarks(artifact: Dict[str, Any], vectors: List[Dict[str, Any]]) -> Dict[str, Tuple[Callable[[], Any], int]]:
+    """Name -> (callable, operations per call)."""
+    features = vectors[0]
+    names = artifact["feature_names"]
+    extractor = feature_extractor(names)
+    model, scaler = artifact["model"], artifact["scaler"]
+    row = extract_feature_vector(features, names)
+    batch = extract_feature_matrix(vectors[:BATCH_SIZE], names)
+    rows = [batch[index : index + 1] for index in range(BATCH_SIZE)]
+    fallback = rule_based_dropout(features)
+    metadata = _build_metadata(
+        {"model_name": "dropout_xgb", "version": "1.0.0"},
+        feature_version="1.0.0",
+        feature_timestamp=datetime.utcnow().isoformat(),
+        used_fallback=False,
+        fallback_reason=None,
+    )
+    prediction = _compose_risk_prediction(62.5, fallback, metadata)
+    response_fields = {
+        "dropout": prediction,
+        "burnout": prediction,
+        "disengagement_score": 48.2,
+        "generated_at": datetime.utcnow(),
+    }
+    response_payload = {
+        **response_fields,
+        "dropout": dump(prediction),
+        "burnout": dump(prediction),
+    }
+
+    def single_loop() -> None:
+        for single in rows:
+            model.predict_proba(scaler.transform(single))
+
+    return {
+        "feature_extractor_vector": (lambda: extractor.vector(features), 1),
+        "feature_extractor_matrix_per_row": (lambda: extractor.matrix(vectors[:BATCH_SIZE]), BATCH_SIZE),
+        "extract_feature_vector": (lambda: extract_feature_vector(features, names), 1),
+        "extract_feature_matrix_per_row": (lambda: extract_feature_matrix(vectors[:BATCH_SIZE], names), BATCH_SIZE),
+        "rule_based_dropout": (lambda: rule_based_dropout(features), 1),
+        "rule_based_burnout": (lambda: rule_based_burnout(features), 1),
+        "rule_based_difficulty": (lambda: rule_based_difficulty(features), 1),
+        "compose_risk_prediction": (lambda: _compose_risk_prediction(62.5, fallback, metadata), 1),
+        "pydantic_validate_risk_response": (lambda: RiskResponse(**response_payload), 1),
+        "pydantic_construct_risk_response": (lambda: construct(RiskResponse, **response_fields), 1),
+        "pydantic_validate_metadata": (lambda: PredictionMetadata(model_name="dropout_xgb", used_fallback=False), 1),
+        "predict_proba_single": (lambda: model.predict_proba(scaler.transform(row)), 1),
+        "predict_proba_single_loop_per_row": (single_loop, BATCH_SIZE),
+        "predict_proba_batch_per_row": (lambda: model.predict_proba(scaler.transform(batch)), BATCH_SIZE),
+    }
+
+
+def run(only: List[str], repeats: int) -> Dict[str, Any]:
+    artifact, vectors = build_artifact()
+    results = {}
+    for name, (fn, per_call) in benchmarks(artifact, vectors).items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        results[name] = {
+            **time_op(fn, repeats, per_call),
+            "threshold_pct": THRESHOLD_OVERRIDES_PCT.get(name, DEFAULT_THRESHOLD_PCT),
+        }
+    return {
+        "generated_at": datetime.utcnow().isoformat(),
+        "environment": {"python": platform.python_version(), "machine": platform.machine(), "processor": platform.processor()},
+        "batch_size": BATCH_SIZE,
+        "benchmarks": results,
+    }
+
+
+def check(current: Dict[str, Any], baseline: Dict[str, Any], threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+    rows = []
+    for name, result in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if not base:
+            continue
+        limit = threshold if threshold is not None else base.get("threshold_pct", DEFAULT_THRESHOLD_PCT)
+        change = (result["ns_per_op"] - base["ns_per_op"]) / base["ns_per_op"] * 100
+        rows.append(
+            {
+                "benchmark": name,
+                "baseline_ns": base["ns_per_op"],
+                "current_ns": result["ns_per_op"],
+                "change_pct": round(change, 1),
+                "threshold_pct": limit,
+                "regressed": change > limit,
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmark ml-serving hot-path functions")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--only", nargs="*", default=[], help="Run benchmarks whose name contains any of these")
+    parser.add_argument("--save", default=None, help="Write results (with thresholds) to this JSON file")
+    parser.add_argument("--check", default=None, help="Compare against a saved baseline; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=None, help="Override every threshold (percent)")
+    args = parser.parse_args()
+
+    current = run(args.only, args.repeats)
+    report: Dict[str, Any] = current
+    regressions: List[Dict[str, Any]] = []
+    if args.check:
+        comparison = check(current, json.loads(Path(args.check).read_text()), args.threshold)
+        regressions = [row for row in comparison if row["regressed"]]
+        report = {**current, "comparison": comparison, "regressions": [row["benchmark"] for row in regressions]}
+    if args.save:
+        Path(args.save).write_text(json.dumps(current, indent=2) + "\n")
+
+    print(json.dumps(report, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
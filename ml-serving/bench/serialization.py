@@ -0,0 +1,116 @@
+"""
+Compare response serialisation paths for ``RiskResponse`` payloads.
+
+    python -m bench.serialization --predictions 1000 --repeats 20
+
+``fastapi_default`` reproduces what FastAPI does when an endpoint returns a
+model under ``response_model``: re-validate the dumped payload, run it
+through ``jsonable_encoder`` and ``json.dumps`` it. The other rows are the
+paths taken by ``app.encoding.encode_response`` (``orjson`` is its pydantic
+v1 JSON path). Prints a JSON report with milliseconds per batch of
+predictions and encoded bytes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+from app import encoding
+from app.models import PredictionMetadata, RiskPrediction, RiskResponse
+
+
+def build_responses(count: int) -> List[RiskResponse]:
+    rng = random.Random(3)
+    responses = []
+    for _ in range(count):
+        predictions = {}
+        for model_type in ("dropout", "burnout"):
+            score = round(rng.random() * 100, 2)
+            metadata = encoding.construct(
+                PredictionMetadata,
+                model_name=f"{model_type}_xgb",
+                model_version="1.0.0",
+                feature_version="1.0.0",
+                feature_timestamp=datetime.utcnow(),
+                used_fallback=False,
+                fallback_reason=None,
+                stale=False,
+                stale_reason=None,
+            )
+            predictions[model_type] = encoding.construct(
+                RiskPrediction,
+                score=score,
+                level="high" if score >= 70 else "medium" if score >= 40 else "low",
+                probability=round(score / 100, 4),
+                factors=["Learning streak breaks at 4 is raising risk", "Energy level (7d) at 3.1 is raising risk"],
+                recommendations=["Schedule a mentor check-in this week"],
+                metadata=metadata,
+            )
+        responses.append(
+            encoding.construct(
+                RiskResponse,
+                dropout=predictions["dropout"],
+                burnout=predictions["burnout"],
+                disengagement_score=round(rng.random() * 100, 2),
+                generated_at=datetime.utcnow(),
+            )
+        )
+    return responses
+
+
+def fastapi_default(response: RiskResponse) -> bytes:
+    validated = RiskResponse.model_validate(encoding.dump(response))
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def time_batch(encode: Callable[[RiskResponse], bytes], responses: List[RiskResponse], repeats: int) -> Dict[str, float]:
+    samples = np.empty(repeats)
+    size = 0
+    for index in range(repeats):
+        started = time.perf_counter()
+        size = sum(len(encode(response)) for response in responses)
+        samples[index] = (time.perf_counter() - started) * 1000
+    return {
+        "ms_per_batch": round(float(np.median(samples)), 3),
+        "us_per_prediction": round(float(np.median(samples)) * 1000 / len(responses), 3),
+        "bytes_per_batch": size,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ml-serving response serialisation")
+    parser.add_argument("--predictions", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    responses = build_responses(args.predictions)
+    paths: Dict[str, Callable[[RiskResponse], bytes]] = {
+        "fastapi_default": fastapi_default,
+        "model_dump_json": lambda response: response.model_dump_json().encode(),
+    }
+    if encoding.orjson is not None:
+        paths["orjson"] = lambda response: encoding.orjson.dumps(
+            encoding.dump(response), option=encoding.orjson.OPT_NON_STR_KEYS
+        )
+    if encoding.msgpack is not None:
+        paths["msgpack"] = lambda response: encoding.msgpack.packb(
+            encoding.dump(response), default=encoding._msgpack_default, use_bin_type=True
+        )
+
+    report = {
+        "predictions": args.predictions,
+        "paths": {name: time_batch(encode, responses, args.repeats) for name, encode in paths.items()},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Synthetic students for local benchmarks.
+
+    python -m bench.synthetic --db bench.sqlite3 --students 5000
+    python -m bench.synthetic --db bench.sqlite3 --students 5000 --parquet-dir bench-data/
+
+Feature vectors follow the nested layout written by
+``lib/ml/data-collection/feature-extractor.ts``. Each student has a latent
+risk level that moves engagement, emotional, performance, behavioral and
+profile features together, so labels derived from it are learnable and
+rule-based scores spread across all risk levels.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.datastore import SQLITE_SCHEMA
+
+
+FEATURE_VERSION = "1.0.0"
+
+TRAINING_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ml_training_data (
+  id TEXT PRIMARY KEY,
+  student_id TEXT NOT NULL,
+  feature_vector_id TEXT REFERENCES ml_feature_store(id),
+  label_type TEXT NOT NULL,
+  label_value TEXT NOT NULL,
+  label_confidence REAL DEFAULT 1.0,
+  labeled_by TEXT,
+  labeled_at TEXT,
+  created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ml_training_data_type
+  ON ml_training_data(label_type, labeled_at DESC);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ml_model_versions_name_version
+  ON ml_model_versions(model_name, version);
+"""
+
+SCHEMA = SQLITE_SCHEMA + TRAINING_SCHEMA
+
+TABLES = ("ml_feature_store", "ml_model_versions", "ml_training_data")
+
+LABEL_TYPES = ("dropout", "burnout", "career_success", "ark_difficulty", "sentiment")
+
+CAREER_OUTCOMES = ("career_builder", "career_explorer", "career_focused", "career_transition")
+
+SENTIMENT_TEXTS = {
+    "positive": [
+        "I finally finished my project and feel great about it",
+        "Today was productive, the mentor session really helped",
+        "Loving the new ARK, I learned a lot this week",
+    ],
+    "neutral": [
+        "Had classes today and did some reading",
+        "Checked in and reviewed my notes",
+        "Working through the next milestone",
+    ],
+    "negative": [
+        "I am exhausted and behind on everything",
+        "Feeling stressed and overwhelmed with deadlines",
+        "I can't focus and I'm worried about failing",
+    ],
+}
+
+
+def _clip(value: float, low: float, high: float) -> float:
+    return max(low, min(high, value))
+
+
+def _sigmoid(value: float) -> float:
+    return 1.0 / (1.0 + math.exp(-value))
+
+
+def generate_feature_vector(rng: random.Random, risk: float) -> Dict[str, Dict[str, Any]]:
+    """One nested feature vector for a student with latent ``risk`` in [0, 1]."""
+    engaged = 1.0 - risk
+
+    def noisy(center: float, spread: float, low: float = 0.0, high: float = 1.0) -> float:
+        return round(_clip(rng.gauss(center, spread), low, high), 3)
+
+    current_streak = int(_clip(rng.gauss(engaged * 20, 4), 0, 60))
+    xp_30d = int(_clip(rng.gauss(engaged * 3000, 500), 0, 10000))
+    emotion_7d = noisy(3 + engaged * 5, 1.2, 1, 10)
+    emotion_30d = noisy(3 + engaged * 5, 0.8, 1, 10)
+
+    return {
+        "engagement": {
+            "checkin_completion_rate_30d": noisy(engaged * 0.9 + 0.05, 0.1),
+            "checkin_completion_rate_7d": noisy(engaged * 0.9 + 0.05, 0.15),
+            "current_streak": current_streak,
+            "longest_streak": current_streak + int(abs(rng.gauss(5, 4))),
+            "streak_break_count": int(_clip(rng.gauss(risk * 8, 1.5), 0, 20)),
+            "chat_message_count_30d": int(_clip(rng.gauss(engaged * 80, 20), 0, 400)),
+            "chat_session_count_30d": int(_clip(rng.gauss(engaged * 15, 4), 0, 60)),
+            "avg_chat_message_length": noisy(60, 25, 5, 300),
+        },
+        "emotional": {
+            "avg_emotion_score_30d": emotion_30d,
+            "avg_emotion_score_7d": emotion_7d,
+            "emotion_volatility": noisy(0.5 + risk * 2, 0.4, 0, 5),
+            "avg_energy_level_30d": noisy(3 + engaged * 5, 0.8, 1, 10),
+            "avg_energy_level_7d": noisy(3 + engaged * 5, 1.2, 1, 10),
+            "stress_days_count_30d": int(_clip(rng.gauss(risk * 15, 3), 0, 30)),
+            "low_energy_days_count_30d": int(_clip(rng.gauss(risk * 12, 3), 0, 30)),
+            "emotion_trend": round(_clip((emotion_7d - emotion_30d) / 5, -1, 1), 3),
+        },
+        "performance": {
+            "ark_progress_rate_30d": noisy(engaged * 0.8, 0.12),
+            "ark_progress_rate_7d": noisy(engaged * 0.8, 0.18),
+            "completed_arks_count": int(_clip(rng.gauss(engaged * 6, 2), 0, 30)),
+            "active_arks_count": int(_clip(rng.gauss(2, 1), 0, 8)),
+            "milestone_completion_rate": noisy(engaged * 0.85, 0.12),
+            "xp_earned_30d": xp_30d,
+            "xp_earned_7d": int(xp_30d / 4 * _clip(rng.gauss(1, 0.3), 0, 2)),
+            "xp_earning_rate": round(xp_30d / 30, 3),
+            "level": int(_clip(rng.gauss(engaged * 15 + 2, 3), 1, 50)),
+            "progress_decline_days_30d": int(_clip(rng.gauss(risk * 12, 3), 0, 30)),
+        },
+        "behavioral": {
+            "consistency_score": noisy(engaged * 0.9, 0.1),
+            "activity_days_count_30d": int(_clip(rng.gauss(engaged * 25, 4), 0, 30)),
+            "activity_days_count_7d": int(_clip(rng.gauss(engaged * 6, 1.5), 0, 7)),
+            "avg_daily_activity_time": noisy(engaged * 90, 20, 0, 480),
+            "peak_activity_hour": rng.randint(7, 23),
+            "weekend_activity_ratio": noisy(0.3, 0.15),
+            "behavioral_change_score": noisy(risk * 0.7, 0.15),
+        },
+        "profile": {
+            "grade_level": rng.randint(9, 16),
+            "motivation_level": noisy(2 + engaged * 7, 1.5, 1, 10),
+            "confidence_level": noisy(2 + engaged * 6, 1.5, 1, 10),
+            "stress_level": noisy(2 + risk * 7, 1.5, 1, 10),
+            "has_onboarding": rng.random() < 0.85,
+            "days_since_onboarding": rng.randint(1, 720),
+            "interests_count": rng.randint(0, 12),
+            "goals_count": rng.randint(0, 8),
+        },
+        "social": {
+            "intervention_count_30d": int(_clip(rng.gauss(risk * 4, 1), 0, 15)),
+            "peer_match_count": int(_clip(rng.gauss(engaged * 5, 2), 0, 20)),
+            "social_engagement_score": noisy(engaged * 0.8, 0.15),
+        },
+    }
+
+
+def generate_label(label_type: str, features: Dict[str, Dict[str, Any]], risk: float, rng: random.Random) -> Dict[str, Any]:
+    if label_type == "dropout":
+        dropped = rng.random() < _sigmoid((risk - 0.6) * 8)
+        return {"outcome_type": "dropout" if dropped else "retained"}
+    if label_type == "burnout":
+        stress = features["emotional"]["stress_days_count_30d"] / 30 + features["profile"]["stress_level"] / 10
+        severity = "high" if rng.random() < _sigmoid((stress - 0.9) * 6) else "low"
+        return {"value": severity}
+    if label_type == "career_success":
+        index = min(int((1 - risk) * len(CAREER_OUTCOMES) + rng.gauss(0, 0.7)), len(CAREER_OUTCOMES) - 1)
+        return {"category": CAREER_OUTCOMES[max(index, 0)]}
+    if label_type == "ark_difficulty":
+        score = _clip(1 + features["performance"]["ark_progress_rate_30d"] * 4 + rng.gauss(0, 0.4), 1, 5)
+        return {"difficulty_score": round(score, 2)}
+    if label_type == "sentiment":
+        mood = features["emotional"]["avg_emotion_score_7d"]
+        label = "positive" if mood >= 7 else "negative" if mood <= 4 else "neutral"
+        return {"text": rng.choice(SENTIMENT_TEXTS[label]), "label": label}
+    raise ValueError(f"Unknown label type '{label_type}'")
+
+
+def generate_rows(
+    students: int,
+    vectors_per_student: int = 3,
+    label_types: Iterable[str] = LABEL_TYPES,
+    seed: int = 7,
+) -> Tuple[List[Tuple[Any, ...]], List[Tuple[Any, ...]]]:
+    """Rows for ``ml_feature_store`` and ``ml_training_data``; each student is labeled once per type."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    label_types = list(label_types)
+    feature_rows: List[Tuple[Any, ...]] = []
+    training_rows: List[Tuple[Any, ...]] = []
+
+    for _ in range(students):
+        student_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        risk = rng.betavariate(2, 3)
+        latest: Optional[Tuple[str, Dict[str, Any], datetime]] = None
+        for offset in range(vectors_per_student):
+            vector_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            extracted_at = now - timedelta(days=offset, minutes=rng.randint(0, 600))
+            features = generate_feature_vector(rng, _clip(risk + rng.gauss(0, 0.05), 0, 1))
+            feature_rows.append(
+                (vector_id, student_id, FEATURE_VERSION, json.dumps(features), extracted_at.isoformat(), extracted_at.isoformat())
+            )
+            if latest is None:
+                latest = (vector_id, features, extracted_at)
+
+        vector_id, features, extracted_at = latest
+        for label_type in label_types:
+            labeled_at = extracted_at + timedelta(hours=rng.randint(1, 72))
+            training_rows.append(
+                (
+                    str(uuid.UUID(int=rng.getrandbits(128))),
+                    student_id,
+                    vector_id,
+                    label_type,
+                    json.dumps(generate_label(label_type, features, risk, rng)),
+                    1.0 if rng.random() < 0.9 else 0.6,
+                    "synthetic",
+                    labeled_at.isoformat(),
+                    labeled_at.isoformat(),
+                )
+            )
+    return feature_rows, training_rows
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def seed_database(conn: sqlite3.Connection, students: int, vectors_per_student: int = 3, seed: int = 7) -> Dict[str, int]:
+    feature_rows, training_rows = generate_rows(students, vectors_per_student, seed=seed)
+    conn.executemany("INSERT INTO ml_feature_store VALUES (?, ?, ?, ?, ?, ?)", feature_rows)
+    conn.executemany("INSERT INTO ml_training_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", training_rows)
+    conn.commit()
+    return {"ml_feature_store": len(feature_rows), "ml_training_data": len(training_rows)}
+
+
+def register_models(conn: sqlite3.Connection, registry_dir: Path) -> List[str]:
+    """Mark every ``<type>_model*.pkl`` under ``registry_dir`` as the deployed version of its type."""
+    now = datetime.utcnow().isoformat()
+    registered = []
+    for path in sorted(registry_dir.glob("*.pkl")):
+        model_type = path.stem.split("_model")[0]
+        conn.execute("UPDATE ml_model_versions SET deployed = 0 WHERE model_type = ?", (model_type,))
+        conn.execute(
+            "INSERT OR REPLACE INTO ml_model_versions "
+            "(id, model_name, version, model_type, model_path, deployed, deployed_at, created_at) "
+            "VALUES (?, ?, ?, ?, ?, 1, ?, ?)",
+            (f"synthetic-{model_type}", f"{model_type}_model", "1.0.0", model_type, path.name, now, now),
+        )
+        registered.append(model_type)
+    conn.commit()
+    return registered
+
+
+def export_parquet(conn: sqlite3.Connection, out_dir: Path) -> None:
+    import pandas as pd
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for table in TABLES:
+        pd.read_sql_query(f"SELECT * FROM {table}", conn).to_parquet(out_dir / f"{table}.parquet", index=False)
+
+
+def import_parquet(conn: sqlite3.Connection, in_dir: Path) -> Dict[str, int]:
+    import pandas as pd
+
+    counts = {}
+    for table in TABLES:
+        path = in_dir / f"{table}.parquet"
+        if not path.exists():
+            continue
+        frame = pd.read_parquet(path)
+        frame = frame.astype(object).where(frame.notna(), None)
+        placeholders = ", ".join("?" for _ in frame.columns)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(frame.columns)}) VALUES ({placeholders})",
+            frame.itertuples(index=False, name=None),
+        )
+        counts[table] = len(frame)
+    conn.commit()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic ML feature store")
+    parser.add_argument("--db", required=True, help="SQLite file to create or extend")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--vectors-per-student", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--registry-dir", default=None, help="Register model artifacts found here as deployed")
+    parser.add_argument("--parquet-dir", default=None, help="Also export the tables as Parquet")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    report: Dict[str, Any] = {"rows": seed_database(conn, args.students, args.vectors_per_student, args.seed)}
+    if args.registry_dir:
+        report["deployed"] = register_models(conn, Path(args.registry_dir))
+    if args.parquet_dir:
+        export_parquet(conn, Path(args.parquet_dir))
+        report["parquet_dir"] = args.parquet_dir
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Shared fixtures: the service on a seeded SQLite feature store with small
+deployed dropout, burnout and career models.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pytest
+
+_ROOT = Path(__file__).resolve().parents[1]
+_WORKDIR = Path(tempfile.mkdtemp(prefix="ml-serving-tests-"))
+
+# The backend and registry location are read when the app is imported
+os.environ["ML_DATA_BACKEND"] = "sqlite"
+os.environ["DATABASE_URL"] = f"sqlite:///{_WORKDIR / 'serving.sqlite3'}"
+os.environ["MODEL_REGISTRY_DIR"] = str(_WORKDIR / "models")
+os.environ.pop("MODEL_RELOAD_TOKEN", None)
+os.environ["RISK_CASCADE_ENABLED"] = "false"
+sys.path.insert(0, str(_ROOT))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from feature_schema import get_schema  # noqa: E402
+from lightgbm import LGBMClassifier  # noqa: E402
+from xgboost import XGBClassifier  # noqa: E402
+
+from app import main  # noqa: E402
+from app.datastore import get_data_backend  # noqa: E402
+from app.registry import clear_model_cache, extract_feature_matrix  # noqa: E402
+from app.resilience import BREAKERS  # noqa: E402
+from app.rule_based import rule_based_burnout, rule_based_dropout  # noqa: E402
+from bench.synthetic import connect, register_models, seed_database  # noqa: E402
+
+STUDENTS = 40
+CAREER_BUCKETS = ["career_builder", "career_explorer", "career_focused", "career_transition"]
+
+
+def _train_models(records, registry_dir: Path) -> None:
+    feature_names = list(get_schema().names)
+    matrix = extract_feature_matrix([record["features"] for record in records], feature_names)
+    for model_type, rule in (("dropout", rule_based_dropout), ("burnout", rule_based_burnout)):
+        scores = np.array([rule(record["features"])["score"] for record in records])
+        labels = (scores > np.median(scores)).astype(int)
+        model = XGBClassifier(n_estimators=10, max_depth=3, n_jobs=1).fit(matrix, labels)
+        joblib.dump({"model": model, "scaler": None, "feature_names": feature_names}, registry_dir / f"{model_type}_model_v1.pkl")
+
+    buckets = np.arange(len(records)) % len(CAREER_BUCKETS)
+    career = LGBMClassifier(n_estimators=10, min_child_samples=2, verbose=-1, n_jobs=1).fit(matrix, buckets)
+    joblib.dump(
+        {"model": career, "scaler": None, "feature_names": feature_names, "classes": CAREER_BUCKETS},
+        registry_dir / "career_model_v1.pkl",
+    )
+
+
+@pytest.fixture(scope="session")
+def student_ids():
+    registry_dir = Path(os.environ["MODEL_REGISTRY_DIR"])
+    registry_dir.mkdir(parents=True, exist_ok=True)
+    conn = connect(os.environ["DATABASE_URL"].removeprefix("sqlite:///"))
+    seed_database(conn, STUDENTS, vectors_per_student=1)
+    ids = [row["student_id"] for row in conn.execute("SELECT DISTINCT student_id FROM ml_feature_store ORDER BY student_id")]
+    backend = get_data_backend()
+    records = [backend.latest_feature_row(student_id, "1.0.0") for student_id in ids]
+    _train_models(records, registry_dir)
+    register_models(conn, registry_dir)
+    conn.close()
+    return ids
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    """Every test starts with cold caches and closed breakers."""
+    clear_model_cache()
+    for cache in (main.FEATURE_CACHE, main.CAREER_CACHE, main.SENTIMENT_CACHE, main.EXPLANATION_CACHE):
+        cache.clear()
+    for breaker in BREAKERS.values():
+        breaker.record_success()
+    yield
+
+
+@pytest.fixture
+def backend():
+    return get_data_backend()
+
+
+@pytest.fixture
+def client(student_ids):
+    return TestClient(main.app)
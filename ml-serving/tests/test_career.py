@@ -0,0 +1,44 @@
+"""Career rankings and their per-student cache."""
+
+
+def _unavailable(*args, **kwargs):
+    raise ConnectionError("backend unreachable")
+
+
+def _career(client, student_id, **extra):
+    response = client.post("/predict/career", json={"student_id": student_id, **extra})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_model_rankings_are_cached(client, student_ids):
+    first = _career(client, student_ids[0])
+    assert first["metadata"]["used_fallback"] is False and first["cached"] is False
+    second = _career(client, student_ids[0])
+    assert second["cached"] is True
+    assert second["recommendations"] == first["recommendations"]
+
+
+def test_fallback_rankings_are_not_cached(client, backend, student_ids, monkeypatch):
+    student_id = student_ids[1]
+    monkeypatch.setattr(backend, "deployed_model", _unavailable)
+    outage = _career(client, student_id)
+    assert outage["metadata"]["used_fallback"] is True
+
+    # Once the registry is back the model ranks the student; the fallback was never stored
+    monkeypatch.undo()
+    recovered = _career(client, student_id)
+    assert recovered["cached"] is False
+    assert recovered["metadata"]["used_fallback"] is False
+
+
+def test_forced_fallback_bypasses_the_cache(client, student_ids):
+    student_id = student_ids[2]
+    _career(client, student_id, force_fallback=True)
+    assert _career(client, student_id)["cached"] is False
+
+
+def test_batch_precompute_fills_the_cache(client, student_ids):
+    response = client.post("/predict/career/batch", json={"student_ids": student_ids[:5], "precompute": True}).json()
+    assert response["precomputed"] == 5 and response["predictions"] == []
+    assert all(_career(client, student_id)["cached"] for student_id in student_ids[:5])
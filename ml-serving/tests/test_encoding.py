@@ -0,0 +1,39 @@
+"""Content negotiation between JSON and msgpack response bodies."""
+
+import json
+
+import msgpack
+import pytest
+
+from app.encoding import MSGPACK_MEDIA_TYPES
+
+
+@pytest.mark.parametrize("media_type", MSGPACK_MEDIA_TYPES)
+def test_msgpack_when_accepted(client, student_ids, media_type):
+    request = {"student_id": student_ids[0]}
+    as_json = client.post("/predict/risk", json=request).json()
+    response = client.post("/predict/risk", json=request, headers={"Accept": f"{media_type}, application/json;q=0.5"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    body = msgpack.unpackb(response.content, raw=False)
+    assert body["dropout"]["score"] == as_json["dropout"]["score"]
+    assert body["dropout"]["factors"] == as_json["dropout"]["factors"]
+
+
+@pytest.mark.parametrize("accept", [None, "application/json", "*/*"])
+def test_json_by_default(client, student_ids, accept):
+    headers = {"Accept": accept} if accept else {}
+    response = client.post("/predict/career", json={"student_id": student_ids[0]}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.content)["recommendations"]
+
+
+def test_batch_payloads_negotiate_too(client, student_ids):
+    response = client.post(
+        "/predict/career/batch",
+        json={"student_ids": student_ids[:3]},
+        headers={"Accept": "application/msgpack"},
+    )
+    body = msgpack.unpackb(response.content, raw=False)
+    assert [item["student_id"] for item in body["predictions"]] == student_ids[:3]
@@ -0,0 +1,48 @@
+"""Per-feature contributions: on demand on /predict/risk, batched and cached on /predict/risk/explain."""
+
+from app import explain, main
+
+
+def test_risk_scoring_skips_contributions_by_default(client, student_ids, monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "compute_contributions", lambda *args: calls.append(args) or explain.compute_contributions(*args))
+    response = client.post("/predict/risk", json={"student_id": student_ids[0]}).json()
+    assert response["dropout"]["metadata"]["used_fallback"] is False
+    assert calls == []
+    assert len(main.EXPLANATION_CACHE) == 0
+
+
+def test_explain_flag_computes_and_caches_factors(client, student_ids):
+    student_id = student_ids[0]
+    explained = client.post("/predict/risk", json={"student_id": student_id, "explain": True}).json()
+    assert len(main.EXPLANATION_CACHE) == 2
+
+    # Later plain calls reuse the cached contributions for their factors
+    plain = client.post("/predict/risk", json={"student_id": student_id}).json()
+    assert plain["dropout"]["factors"] == explained["dropout"]["factors"]
+
+
+def test_explain_endpoint_caches_per_student(client, student_ids):
+    request = {"student_ids": student_ids[:3], "top_k": 3}
+    first = client.post("/predict/risk/explain", json=request).json()
+    assert first["unavailable"] == {}
+    assert len(first["explanations"]) == 6
+    assert all(not item["cached"] and len(item["contributions"]) <= 3 for item in first["explanations"])
+
+    second = client.post("/predict/risk/explain", json=request).json()
+    assert all(item["cached"] for item in second["explanations"])
+
+
+def test_contributions_use_the_configured_threads(client, student_ids, monkeypatch):
+    import xgboost
+
+    threads = []
+    original = xgboost.DMatrix
+
+    def dmatrix(data, *args, **kwargs):
+        threads.append(kwargs.get("nthread"))
+        return original(data, *args, **kwargs)
+
+    monkeypatch.setattr(xgboost, "DMatrix", dmatrix)
+    client.post("/predict/risk/explain", json={"student_ids": student_ids[:2]})
+    assert threads and all(count == 1 for count in threads)
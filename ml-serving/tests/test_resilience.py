@@ -0,0 +1,62 @@
+"""Time budgets, circuit breakers and stale fallbacks for the feature store and registry."""
+
+from app.resilience import BREAKER_FAILURE_THRESHOLD, BREAKERS
+
+
+def _unavailable(*args, **kwargs):
+    raise ConnectionError("backend unreachable")
+
+
+def test_feature_store_outage_serves_stale_vector(client, backend, student_ids, monkeypatch):
+    student_id = student_ids[0]
+    fresh = client.post("/predict/risk", json={"student_id": student_id}).json()
+    assert fresh["dropout"]["metadata"]["stale"] is False
+
+    monkeypatch.setattr(backend, "latest_feature_row", _unavailable)
+    stale = client.post("/predict/risk", json={"student_id": student_id}).json()
+    assert stale["dropout"]["metadata"]["stale"] is True
+    assert "backend unreachable" in stale["dropout"]["metadata"]["stale_reason"]
+    assert stale["dropout"]["score"] == fresh["dropout"]["score"]
+
+
+def test_feature_store_outage_without_cache_is_503(client, backend, student_ids, monkeypatch):
+    monkeypatch.setattr(backend, "latest_feature_row", _unavailable)
+    response = client.post("/predict/risk", json={"student_id": student_ids[0]})
+    assert response.status_code == 503
+
+
+def test_breaker_opens_and_keeps_serving_stale(client, backend, student_ids, monkeypatch):
+    student_id = student_ids[0]
+    client.post("/predict/risk", json={"student_id": student_id})
+
+    monkeypatch.setattr(backend, "latest_feature_row", _unavailable)
+    for _ in range(BREAKER_FAILURE_THRESHOLD):
+        client.post("/predict/risk", json={"student_id": student_id})
+    assert client.get("/health").json()["circuit_breakers"]["feature_store"]["state"] == "open"
+
+    # While open, the store is not called at all, even once it has recovered
+    monkeypatch.undo()
+    response = client.post("/predict/risk", json={"student_id": student_id}).json()
+    assert response["dropout"]["metadata"]["stale"] is True
+    assert "Circuit open" in response["dropout"]["metadata"]["stale_reason"]
+
+
+def test_registry_outage_serves_cached_artifact(client, backend, student_ids, monkeypatch):
+    student_id = student_ids[0]
+    warm = client.post("/predict/risk", json={"student_id": student_id}).json()
+    assert warm["dropout"]["metadata"]["used_fallback"] is False
+
+    monkeypatch.setattr(backend, "deployed_model", _unavailable)
+    during = client.post("/predict/risk", json={"student_id": student_id}).json()
+    for model_type in ("dropout", "burnout"):
+        assert during[model_type]["metadata"]["used_fallback"] is False
+        assert during[model_type]["score"] == warm[model_type]["score"]
+    assert BREAKERS["registry"].failures > 0
+
+
+def test_registry_outage_without_cached_artifact_falls_back(client, backend, student_ids, monkeypatch):
+    monkeypatch.setattr(backend, "deployed_model", _unavailable)
+    response = client.post("/predict/risk", json={"student_id": student_ids[0]}).json()
+    metadata = response["dropout"]["metadata"]
+    assert metadata["used_fallback"] is True
+    assert metadata["fallback_reason"].startswith("Model registry unavailable")
@@ -0,0 +1,49 @@
+"""What-if sweeps over a grid of perturbed features."""
+
+import pytest
+
+AXES = {
+    "engagement_checkin_completion_rate_7d": [0.2, 0.5, 0.9],
+    "emotional_stress_days_count_30d": [0, 10],
+}
+
+
+def _sweep(client, student_id, perturbations, **extra):
+    return client.post(
+        "/predict/risk/what-if",
+        json={"student_id": student_id, "perturbations": perturbations, **extra},
+    )
+
+
+@pytest.mark.parametrize("force_fallback", [False, True])
+def test_surface_shape(client, student_ids, force_fallback):
+    response = _sweep(client, student_ids[0], AXES, force_fallback=force_fallback)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["grid_shape"] == [3, 2]
+    assert body["axes"] == {name: [float(value) for value in values] for name, values in AXES.items()}
+    for model_type in ("dropout", "burnout"):
+        assert len(body["surfaces"][model_type]) == 6
+        assert body["metadata"][model_type]["used_fallback"] is force_fallback
+        assert 0 <= body["baseline"][model_type] <= 100
+
+
+def test_baseline_matches_risk_prediction(client, student_ids):
+    student_id = student_ids[3]
+    risk = client.post("/predict/risk", json={"student_id": student_id}).json()
+    sweep = _sweep(client, student_id, AXES).json()
+    assert sweep["baseline"]["dropout"] == pytest.approx(risk["dropout"]["score"], abs=0.01)
+
+
+def test_unknown_features_are_rejected(client, student_ids):
+    response = _sweep(client, student_ids[0], {**AXES, "engagement_made_up_signal": [1, 2]})
+    assert response.status_code == 422
+    assert "engagement_made_up_signal" in response.json()["detail"]
+    assert "engagement_checkin_completion_rate_7d" not in response.json()["detail"]
+
+
+def test_oversized_grid_is_rejected(client, student_ids, monkeypatch):
+    from app import main
+
+    monkeypatch.setattr(main, "WHAT_IF_MAX_POINTS", 5)
+    assert _sweep(client, student_ids[0], AXES).status_code == 413
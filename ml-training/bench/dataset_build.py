@@ -0,0 +1,238 @@
+"""
+Benchmark building the training DataFrame and decoding labels.
+
+    python bench/dataset_build.py                  # 1M rows, both builders
+    python bench/dataset_build.py --rows 200000 --output dataset-build.json
+
+Rows are fed page by page, as ``DataLoader`` receives them from PostgREST.
+The ``rowwise`` builder is the previous implementation: a flattened dict per
+row, ``pd.DataFrame(records)``, and labels decoded with ``Series.apply``. The
+``columnar`` builder is ``build_training_frame`` plus the bulk decoders in
+``utils``. Each builder runs in a fresh subprocess. Peak memory is that
+process's high-water RSS minus its RSS once the input pool exists. Input rows
+are drawn from a small pool of shared objects, so the pool stays small at any
+row count.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from data_loader import PAGE_SIZE, build_training_frame
+from utils import (
+    extract_binary_label,
+    extract_binary_labels,
+    extract_label_field,
+    extract_regression_target,
+    extract_regression_targets,
+    parse_label_value,
+    parse_label_values,
+)
+
+BUILDERS = ("rowwise", "columnar")
+POOL_SIZE = 5000
+CAREERS = ["career_explorer", "career_builder", "career_leader", "career_champion"]
+
+# Category -> {key: kind}, in the layout the feature extractor writes
+FEATURE_LAYOUT = {
+    "engagement": {"checkin_completion_rate_30d": "rate", "checkin_completion_rate_7d": "rate", "current_streak": "count",
+                   "longest_streak": "count", "streak_break_count": "count", "chat_message_count_30d": "count",
+                   "chat_session_count_30d": "count", "avg_chat_message_length": "float"},
+    "emotional": {"avg_emotion_score_30d": "float", "avg_emotion_score_7d": "float", "emotion_volatility": "float",
+                  "avg_energy_level_30d": "float", "avg_energy_level_7d": "float", "stress_days_count_30d": "count",
+                  "low_energy_days_count_30d": "count", "emotion_trend": "float"},
+    "performance": {"ark_progress_rate_30d": "rate", "ark_progress_rate_7d": "rate", "completed_arks_count": "count",
+                    "active_arks_count": "count", "milestone_completion_rate": "rate", "xp_earned_30d": "count",
+                    "xp_earned_7d": "count", "xp_earning_rate": "float", "level": "count",
+                    "progress_decline_days_30d": "count"},
+    "behavioral": {"consistency_score": "rate", "activity_days_count_30d": "count", "activity_days_count_7d": "count",
+                   "avg_daily_activity_time": "float", "peak_activity_hour": "count", "weekend_activity_ratio": "rate",
+                   "behavioral_change_score": "rate"},
+    "profile": {"grade_level": "count", "motivation_level": "float", "confidence_level": "float",
+                "stress_level": "float", "has_onboarding": "bool", "days_since_onboarding": "count",
+                "interests_count": "count", "goals_count": "count"},
+    "social": {"intervention_count_30d": "count", "peer_match_count": "count", "social_engagement_score": "rate"},
+}
+
+
+def _value(rng: random.Random, kind: str) -> Any:
+    if kind == "rate":
+        return round(rng.random(), 3)
+    if kind == "count":
+        return rng.randint(0, 60)
+    if kind == "bool":
+        return rng.random() < 0.85
+    return round(rng.uniform(0, 10), 3)
+
+
+def build_pool(size: int = POOL_SIZE, seed: int = 11) -> List[Dict[str, Any]]:
+    """Distinct ``ml_training_data`` rows (with embedded features) to draw pages from."""
+    rng = random.Random(seed)
+    pool = []
+    for index in range(size):
+        features = {
+            category: {key: _value(rng, kind) for key, kind in keys.items()}
+            for category, keys in FEATURE_LAYOUT.items()
+        }
+        pool.append(
+            {
+                "id": f"{index:08x}-0000-0000-0000-000000000000",
+                "student_id": f"{index % 997:08x}-0000-0000-0000-000000000000",
+                "feature_vector_id": f"{index:08x}-1111-0000-0000-000000000000",
+                "labeled_at": "2024-05-01T00:00:00+00:00",
+                "label_value": {"outcome_type": rng.choice(["dropout", "retained"])},
+                # Labels the other trainers decode, in the shapes their label types use
+                "other_labels": {
+                    "burnout": {"value": rng.choice(["high", "low"])},
+                    "career": {"category": rng.choice(CAREERS)},
+                    "difficulty": {"difficulty_score": round(rng.uniform(1, 5), 2)},
+                },
+                "ml_feature_store": {"features": features, "extraction_timestamp": "2024-04-30T00:00:00+00:00"},
+            }
+        )
+    return pool
+
+
+def pages(pool: List[Dict[str, Any]], rows: int, page_size: int = PAGE_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    for start in range(0, rows, page_size):
+        yield [pool[index % len(pool)] for index in range(start, min(start + page_size, rows))]
+
+
+def _flatten_features(features: Dict) -> Dict:
+    flattened: Dict[str, Any] = {}
+    for category, values in features.items():
+        if isinstance(values, dict):
+            for key, value in values.items():
+                flattened[f"{category}_{key}"] = value
+        else:
+            flattened[category] = values
+    return flattened
+
+
+def rowwise_frame(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    records = []
+    for row in rows:
+        record = _flatten_features(row.get("ml_feature_store", {}).get("features", {}))
+        record["label"] = row.get("label_value")
+        record["student_id"] = row.get("student_id")
+        record["feature_vector_id"] = row.get("feature_vector_id")
+        records.append(record)
+    return pd.DataFrame(records)
+
+
+def rowwise_labels(labels: Dict[str, pd.Series]) -> Dict[str, Any]:
+    return {
+        "dropout": labels["dropout"].apply(lambda x: 1 if x.get("outcome_type") == "dropout" else 0),
+        "burnout": labels["burnout"].apply(
+            lambda value: extract_binary_label(value, positive_values=["high", "severe", "burnout", True, 1])
+        ),
+        "career": labels["career"].apply(parse_label_value),
+        "difficulty": labels["difficulty"].apply(
+            lambda value: extract_regression_target(value, key="difficulty_score", default=2.5)
+        ),
+    }
+
+
+def columnar_labels(labels: Dict[str, pd.Series]) -> Dict[str, Any]:
+    return {
+        "dropout": (extract_label_field(labels["dropout"], "outcome_type") == "dropout").astype(np.int8),
+        "burnout": extract_binary_labels(labels["burnout"], positive_values=["high", "severe", "burnout", True, 1]),
+        "career": parse_label_values(labels["career"]),
+        "difficulty": extract_regression_targets(labels["difficulty"], key="difficulty_score", default=2.5),
+    }
+
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as fp:
+        return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def run_builder(builder: str, rows: int) -> Dict[str, Any]:
+    pool = build_pool()
+    other_labels = {
+        label_type: pd.Series([pool[index % len(pool)]["other_labels"][label_type] for index in range(rows)])
+        for label_type in ("burnout", "career", "difficulty")
+    }
+    baseline = _rss_bytes()
+
+    started = time.perf_counter()
+    if builder == "rowwise":
+        df = pd.concat([rowwise_frame(page) for page in pages(pool, rows)], ignore_index=True, sort=False)
+    else:
+        df = build_training_frame(pages(pool, rows), include_meta=False)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    decoded = (rowwise_labels if builder == "rowwise" else columnar_labels)({"dropout": df["label"], **other_labels})
+    decode_seconds = time.perf_counter() - started
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+    features = df.drop(columns=["label", "student_id", "feature_vector_id"])
+    return {
+        "builder": builder,
+        "rows": len(df),
+        "build_seconds": round(build_seconds, 3),
+        "decode_seconds": round(decode_seconds, 3),
+        "rows_per_second": round(len(df) / (build_seconds + decode_seconds), 1),
+        "peak_memory_delta_bytes": peak - baseline,
+        "feature_bytes": int(features.memory_usage(index=False).sum()),
+        "feature_dtypes": {str(dtype): int(count) for dtype, count in features.dtypes.value_counts().items()},
+        "checksum": {
+            "features": float(np.nansum(features.to_numpy(dtype=np.float64))),
+            "labels": {
+                name: pd.Series(values).value_counts().sort_index().to_dict() if name == "career" else float(np.sum(values))
+                for name, values in decoded.items()
+            },
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark training DataFrame construction and label decoding")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--builders", nargs="*", default=list(BUILDERS), choices=BUILDERS)
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    parser.add_argument("--run", choices=BUILDERS, help=argparse.SUPPRESS)  # child process entry point
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_builder(args.run, args.rows)))
+        return
+
+    results = {}
+    for builder in args.builders:
+        print(f"Running {builder} builder on {args.rows} rows...", file=sys.stderr)
+        output = subprocess.run(
+            [sys.executable, __file__, "--run", builder, "--rows", str(args.rows)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results[builder] = json.loads(output.strip().splitlines()[-1])
+
+    report: Dict[str, Any] = {"rows": args.rows, "page_size": PAGE_SIZE, "results": results}
+    if "rowwise" in results and "columnar" in results:
+        before, after = results["rowwise"], results["columnar"]
+        report["speedup"] = round(
+            (before["build_seconds"] + before["decode_seconds"]) / (after["build_seconds"] + after["decode_seconds"]), 2
+        )
+        report["peak_memory_reduction"] = round(1 - after["peak_memory_delta_bytes"] / before["peak_memory_delta_bytes"], 3)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fp:
+            json.dump(report, fp, indent=2)
+
+
+if __name__ == "__main__":
+    main()
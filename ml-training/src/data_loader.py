@@ -3,20 +3,271 @@ Data Loader for ML Training
 Loads training data from Supabase
 """
 
+import json
 import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
 import requests
 import pandas as pd
-from typing import List, Dict, Tuple, Optional, Any
+from requests.adapters import HTTPAdapter
+from pathlib import Path
+from typing import List, Dict, Set, Tuple, Optional, Any, Iterable, Iterator, Deque, Sequence
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
+from feature_schema import FEATURE_VERSION, FeatureSchema, load_schema
+
+from dataset_cache import CACHE_DIR, DatasetCache, EXTRACTED_AT, LABELED_AT, META_COLUMNS, ROW_ID, ROW_GROUP_ROWS
 
 load_dotenv()
 
+# Rows requested per Range page; PostgREST may cap this lower with db-max-rows
+PAGE_SIZE = int(os.getenv("SUPABASE_PAGE_SIZE", "1000"))
+FETCH_WORKERS = int(os.getenv("SUPABASE_FETCH_WORKERS", "4"))
+TIMEOUT_SECONDS = float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "30"))
+MAX_RETRIES = int(os.getenv("SUPABASE_MAX_RETRIES", "5"))
+BACKOFF_SECONDS = float(os.getenv("SUPABASE_BACKOFF_SECONDS", "0.5"))
+# Set to 0 to always read training data straight from Supabase
+USE_CACHE = os.getenv("TRAINING_CACHE", "1") not in {"0", "false", "no"}
+# Ids per ``id=in.(...)`` request (feature vectors, rows missed by the watermarks)
+ID_BATCH_SIZE = 100
+
+# Label rows without their features, which come from the loader's shared FeatureMatrix
+LABEL_SELECT = "id,student_id,feature_vector_id,label_value,labeled_at,ml_feature_store!inner(extraction_timestamp)"
+# Label rows with their features embedded, for streaming a label set without the FeatureMatrix
+STREAM_SELECT = "id,label_value,ml_feature_store!inner(features)"
+# Label rows with their features embedded, in the columns a cached snapshot stores
+CACHE_SELECT = (
+    "id,student_id,feature_vector_id,label_value,labeled_at,ml_feature_store!inner(extraction_timestamp,features)"
+)
+FEATURE_DTYPE = np.float32
+# Rows per chunk handed to out-of-core training
+CHUNK_ROWS = int(os.getenv("TRAINING_CHUNK_ROWS", str(ROW_GROUP_ROWS)))
+# Parent directory for label sets spooled with the cache disabled; the system temp dir by default
+SPOOL_DIR = os.getenv("TRAINING_SPOOL_DIR") or None
+
+
+def _stable_order(order: Optional[str]) -> str:
+    """Append the primary key so offset pages never overlap or skip rows on ties."""
+    if not order:
+        return "id.asc"
+    columns = [term.split(".")[0] for term in order.split(",")]
+    return order if "id" in columns else f"{order},id.asc"
+
+
+def _content_range_total(header: Optional[str]) -> Optional[int]:
+    # "0-999/12345", "0-999/*" or "*/0"
+    if not header or "/" not in header:
+        return None
+    total = header.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else None
+
+
+def schema_feature_names(version: str = FEATURE_VERSION) -> List[str]:
+    """Model input columns of a feature version, in order; what ``DataLoader.get_feature_names`` returns."""
+    return list(load_schema(version).names)
+
+
+def flatten_feature_columns(
+    vectors: Sequence[Dict[str, Any]],
+    schema: Optional[FeatureSchema] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Extract the schema's ``<category>_<key>`` columns from nested feature vectors.
+
+    Uses the same compiled extractor as ml-serving: columns come out in schema
+    order at the schema dtype, with missing or non-numeric values replaced by
+    the feature's default. Keys the schema does not define are ignored.
+    """
+    schema = schema or load_schema(FEATURE_VERSION)
+    extractor = schema.extractor()
+    return dict(zip(extractor.names, extractor.columns(vectors)))
+
+
+def label_columns(rows: List[Dict[str, Any]], include_meta: bool = True) -> Dict[str, Any]:
+    """Label and key columns for one page of ``ml_training_data`` rows."""
+    columns: Dict[str, Any] = {
+        "label": [row.get("label_value") for row in rows],
+        "student_id": [row.get("student_id") for row in rows],
+        "feature_vector_id": [row.get("feature_vector_id") for row in rows],
+    }
+    if include_meta:
+        columns[ROW_ID] = [row.get("id") for row in rows]
+        columns[LABELED_AT] = [row.get("labeled_at") for row in rows]
+        columns[EXTRACTED_AT] = [(row.get("ml_feature_store") or {}).get("extraction_timestamp") for row in rows]
+    return columns
+
+
+def training_columns(
+    rows: List[Dict[str, Any]],
+    include_meta: bool = True,
+    schema: Optional[FeatureSchema] = None,
+) -> Dict[str, Any]:
+    """Columns for one page of ``ml_training_data`` rows joined with their features."""
+    columns: Dict[str, Any] = flatten_feature_columns(
+        [(row.get("ml_feature_store") or {}).get("features") or {} for row in rows], schema
+    )
+    columns.update(label_columns(rows, include_meta))
+    return columns
+
+
+class FrameBuilder:
+    """
+    Assemble page columns into one DataFrame.
+
+    Float32 columns are copied into a single preallocated block, releasing
+    each page's arrays as they are consumed. Peak memory therefore stays near
+    one copy of the feature matrix rather than the two ``pd.concat`` needs.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.parts: Dict[str, List[Tuple[int, Any]]] = {}
+
+    def append(self, columns: Dict[str, Any]) -> None:
+        length = 0
+        for name, values in columns.items():
+            self.parts.setdefault(name, []).append((self.rows, values))
+            length = len(values)
+        self.rows += length
+
+    def build(self) -> pd.DataFrame:
+        if not self.rows:
+            return pd.DataFrame()
+        names = list(self.parts)
+        numeric = [
+            name
+            for name in names
+            if all(isinstance(values, np.ndarray) and values.dtype == FEATURE_DTYPE for _, values in self.parts[name])
+        ]
+        # Column-major, the layout pandas keeps its blocks in
+        block = np.empty((len(numeric), self.rows), dtype=FEATURE_DTYPE)
+        for position, name in enumerate(numeric):
+            parts = self.parts.pop(name)
+            if sum(len(values) for _, values in parts) < self.rows:
+                block[position] = np.nan  # column missing from some pages
+            for offset, values in parts:
+                block[position, offset : offset + len(values)] = values
+        df = pd.DataFrame(block.T, columns=numeric, copy=False)
+
+        for name in names:
+            if name not in self.parts:
+                continue
+            column = np.full(self.rows, None, dtype=object)
+            for offset, values in self.parts.pop(name):
+                column[offset : offset + len(values)] = pd.Series(values, dtype=object).to_numpy()
+            df[name] = column
+        return df
+
+
+def build_training_frame(
+    pages: Iterable[List[Dict[str, Any]]],
+    include_meta: bool = True,
+    schema: Optional[FeatureSchema] = None,
+) -> pd.DataFrame:
+    """One DataFrame from pages of joined training rows; only a single page of raw JSON is held at a time."""
+    builder = FrameBuilder()
+    for rows in pages:
+        builder.append(training_columns(rows, include_meta, schema))
+    return builder.build()
+
+
+class FeatureMatrix:
+    """
+    Extracted feature vectors keyed by ``ml_feature_store.id``.
+
+    Values live in one column-major block at the schema dtype. A loader keeps
+    one for all the label sets it reads, so a vector referenced by several
+    label types is downloaded and extracted once and joined locally.
+    """
+
+    def __init__(self, schema: FeatureSchema):
+        self.schema = schema
+        self.names = list(schema.names)
+        self.position: Dict[str, int] = {}
+        self.values = np.empty((len(self.names), 0), dtype=schema.dtype)
+        self._pending: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self.position)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + sum(block.nbytes for block in self._pending)
+
+    def missing(self, ids: Iterable[Any]) -> List[str]:
+        return [key for key in dict.fromkeys(ids) if key is not None and key not in self.position]
+
+    def add(self, ids: Sequence[str], columns: np.ndarray) -> None:
+        """Store ``columns`` (features x vectors, as ``FeatureExtractor.columns`` returns) under ``ids``."""
+        keep = [index for index, key in enumerate(ids) if key not in self.position]
+        if len(keep) < len(ids):
+            ids, columns = [ids[index] for index in keep], columns[:, keep]
+        offset = len(self.position)
+        self.position.update((key, offset + index) for index, key in enumerate(ids))
+        self._pending.append(columns)
+
+    def take(self, ids: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """Columns for ``ids`` in order, plus a mask of the ids that were found."""
+        if self._pending:
+            # Appends arrive once per label set; fold them into the block before indexing
+            self.values = np.concatenate([self.values, *self._pending], axis=1)
+            self._pending = []
+        positions = np.fromiter((self.position.get(key, -1) for key in ids), dtype=np.intp, count=len(ids))
+        found = positions >= 0
+        return self.values[:, positions[found]], found
+
+
+class TrainingChunks:
+    """
+    Re-iterable chunks of a training Parquet file, for out-of-core training.
+
+    Each chunk is ``(row ids, (rows, features) float32 matrix, labels)`` and
+    is decoded from the file on demand, so only one chunk is in memory at a
+    time. Instances only hold the path and can be passed to other processes.
+    """
+
+    def __init__(self, path: Any, names: Sequence[str], chunk_rows: int = CHUNK_ROWS):
+        self.path = str(path)
+        self.names = list(names)
+        self.chunk_rows = chunk_rows
+
+    def __len__(self) -> int:
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(self.path).metadata.num_rows
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, np.ndarray, List[Any]]]:
+        import pyarrow.parquet as pq
+
+        reader = pq.ParquetFile(self.path)
+        for batch in reader.iter_batches(batch_size=self.chunk_rows, columns=[*self.names, ROW_ID, "label"]):
+            matrix = np.empty((batch.num_rows, len(self.names)), dtype=FEATURE_DTYPE)
+            for position, name in enumerate(self.names):
+                matrix[:, position] = batch.column(name).to_numpy(zero_copy_only=False)
+            ids = batch.column(ROW_ID).to_numpy(zero_copy_only=False)
+            yield ids, matrix, [json.loads(label) for label in batch.column("label").to_pylist()]
+
 
 class SupabaseRestClient:
     """Minimal Supabase REST helper using the PostgREST endpoint."""
 
-    def __init__(self, url: str, key: str):
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        page_size: int = PAGE_SIZE,
+        workers: int = FETCH_WORKERS,
+        timeout: float = TIMEOUT_SECONDS,
+    ):
         self.base_url = url.rstrip("/")
+        self.page_size = page_size
+        self.workers = workers
+        self.timeout = timeout
+        self.last_fetch: Dict[str, Any] = {}
         self.rest_url = f"{self.base_url}/rest/v1"
         self.session = requests.Session()
         self.session.headers.update(
@@ -28,17 +279,171 @@ class SupabaseRestClient:
                 "Prefer": "return=representation",
             }
         )
+        retry = Retry(
+            total=MAX_RETRIES,
+            backoff_factor=BACKOFF_SECONDS,  # sleeps backoff * 2**(attempt - 1)
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        # One pooled connection per page worker
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 1), max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
-    def get(self, table: str, params: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
-        response = self.session.get(f"{self.rest_url}/{table}", params=params or {})
+    def _fetch_range(
+        self,
+        table: str,
+        params: Dict[str, str],
+        offset: int,
+        size: int,
+        count: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        headers = {"Range-Unit": "items", "Range": f"{offset}-{offset + size - 1}"}
+        if count:
+            headers["Prefer"] = "count=exact"
+        response = self.session.get(
+            f"{self.rest_url}/{table}",
+            params=params,
+            headers=headers,
+            timeout=self.timeout,
+        )
+        if response.status_code == 416:  # offset past the end of the result set
+            return [], None
         response.raise_for_status()
-        return response.json()  # type: ignore[return-value]
+        return response.json(), _content_range_total(response.headers.get("Content-Range"))
+
+    def iter_pages(
+        self,
+        table: str,
+        params: Optional[Dict[str, str]] = None,
+        page_size: Optional[int] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield the rows of a query one Range page at a time, in query order.
+
+        The first page also asks for the exact row count; the remaining pages
+        are then fetched concurrently by ``workers`` threads. A ``limit`` param
+        caps the total.
+        """
+        params = dict(params or {})
+        limit = int(params.pop("limit")) if "limit" in params else None
+        params["order"] = _stable_order(params.get("order"))
+        page_size = page_size or self.page_size
+        started = time.perf_counter()
+        stats = {"table": table, "rows": 0, "pages": 0}
+
+        def emit(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            stats["rows"] += len(rows)
+            stats["pages"] += 1
+            return rows
+
+        first_size = page_size if limit is None else min(page_size, limit)
+        rows, total = self._fetch_range(table, params, 0, first_size, count=self.workers > 1)
+        if rows:
+            yield emit(rows)
+        offset = len(rows)
+        if total is not None and limit is not None:
+            total = min(total, limit)
+
+        if rows and total is not None and self.workers > 1:
+            # Pages of the size the server actually returned, which may be capped below page_size
+            step = len(rows)
+            pending: Deque[Future] = deque()
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="supabase-page") as pool:
+                for start in range(offset, total, step):
+                    pending.append(pool.submit(self._fetch_range, table, params, start, min(step, total - start)))
+                    # Bounded read-ahead keeps at most a few pages in memory
+                    if len(pending) >= self.workers * 2:
+                        yield emit(pending.popleft().result()[0])
+                while pending:
+                    yield emit(pending.popleft().result()[0])
+        elif rows and (total is None or offset < total):
+            while limit is None or offset < limit:
+                size = page_size if limit is None else min(page_size, limit - offset)
+                rows, total = self._fetch_range(table, params, offset, size)
+                if not rows:
+                    break
+                yield emit(rows)
+                # Advance by what was returned: the server may cap pages below page_size
+                offset += len(rows)
+                if total is not None and offset >= total:
+                    break
+
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 3)
+        stats["rows_per_second"] = round(stats["rows"] / elapsed, 1) if elapsed > 0 else None
+        self.last_fetch = stats
+        print(
+            f"Fetched {stats['rows']} rows from {table} in {elapsed:.2f}s "
+            f"({stats['rows_per_second']} rows/s, {stats['pages']} pages)"
+        )
+
+    def _fetch_all(self, table: str, params: Dict[str, str], size: int) -> List[Dict[str, Any]]:
+        rows, total = self._fetch_range(table, params, 0, size, count=True)
+        # Only needed when the server caps pages below ``size``
+        while rows and total is not None and len(rows) < total:
+            more, _ = self._fetch_range(table, params, len(rows), size)
+            if not more:
+                break
+            rows.extend(more)
+        return rows
+
+    def iter_in(
+        self,
+        table: str,
+        column: str,
+        values: Sequence[str],
+        params: Optional[Dict[str, str]] = None,
+        batch_size: int = ID_BATCH_SIZE,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the rows whose ``column`` is in ``values``, one ``in.(...)`` batch per request, fetched concurrently."""
+        params = dict(params or {})
+        params["order"] = _stable_order(params.get("order"))
+        started = time.perf_counter()
+        stats = {"table": table, "rows": 0, "pages": 0}
+        batches = [values[start : start + batch_size] for start in range(0, len(values), batch_size)]
+
+        pending: Deque[Future] = deque()
+        with ThreadPoolExecutor(max_workers=max(self.workers, 1), thread_name_prefix="supabase-in") as pool:
+            for batch in batches:
+                batch_params = {**params, column: f"in.({','.join(batch)})"}
+                pending.append(pool.submit(self._fetch_all, table, batch_params, len(batch)))
+                if len(pending) >= self.workers * 2:
+                    rows = pending.popleft().result()
+                    stats["rows"] += len(rows)
+                    stats["pages"] += 1
+                    yield rows
+            while pending:
+                rows = pending.popleft().result()
+                stats["rows"] += len(rows)
+                stats["pages"] += 1
+                yield rows
+
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 3)
+        stats["rows_per_second"] = round(stats["rows"] / elapsed, 1) if elapsed > 0 else None
+        self.last_fetch = stats
+        if batches:
+            print(
+                f"Fetched {stats['rows']} rows from {table} in {elapsed:.2f}s "
+                f"({stats['rows_per_second']} rows/s, {stats['pages']} id batches)"
+            )
+
+    def get(self, table: str, params: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        return [row for page in self.iter_pages(table, params) for row in page]
 
 
 class DataLoader:
     """Load training data from Supabase"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        use_cache: bool = USE_CACHE,
+        cache_dir: Optional[str] = None,
+        feature_version: str = FEATURE_VERSION,
+    ):
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = (
             os.getenv("SUPABASE_SERVICE_ROLE_KEY")
@@ -50,39 +455,348 @@ class DataLoader:
             raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY (or SUPABASE_KEY) must be set in .env")
 
         self.supabase = SupabaseRestClient(supabase_url, supabase_key)
+        # Column order, dtype and defaults for every frame this loader builds
+        self.schema = load_schema(feature_version)
+        # Snapshots are only comparable within one feature version
+        self.cache = DatasetCache(os.path.join(cache_dir or CACHE_DIR, self.schema.version)) if use_cache else None
+        # Feature vectors fetched so far, shared by every label set this loader reads
+        self.features = FeatureMatrix(self.schema)
+        # label_type -> snapshot id of the last cached load, for reproducing a run
+        self.snapshots: Dict[str, str] = {}
+        # Per-loader spool for uncached label sets; removed with the loader
+        self._spool: Optional[tempfile.TemporaryDirectory] = None
 
     def load_training_data(
         self,
         label_type: str,
-        limit: Optional[int] = None
+        limit: Optional[int] = None,
+        refresh: bool = True,
+        snapshot: Optional[str] = None,
     ) -> pd.DataFrame:
         """
         Load labeled training data for a specific label type
+
+        With the cache enabled, only rows labeled or re-extracted since the
+        cached snapshot are downloaded and merged into a new snapshot.
+        ``refresh=False`` reads the current snapshot without touching the
+        network, and ``snapshot`` reloads a specific earlier one. ``limit``
+        bypasses the cache.
         """
+        if self.cache is None or limit:
+            return self._fetch_training_frame(self._training_params(label_type, limit), include_meta=False)
+
+        if snapshot or not refresh:
+            stored = self.cache.read(label_type, snapshot)
+            entry = self.cache.snapshot_info(label_type, snapshot)
+            if entry is not None:
+                self.snapshots[label_type] = entry["id"]
+                print(f"Loaded {label_type} snapshot {entry['id']} from cache ({len(stored)} rows)")
+                return self._from_cache_frame(stored)
+            print(f"No cached {label_type} snapshot; fetching from Supabase")
+
+        return self._from_cache_frame(self._refresh_cache(label_type))
+
+    def _training_params(self, label_type: str, limit: Optional[int] = None) -> Dict[str, str]:
         params = {
-            "select": "*,ml_feature_store!inner(features,student_id,extraction_timestamp)",
+            "select": LABEL_SELECT,
             "label_type": f"eq.{label_type}",
             "label_confidence": "eq.1",
+            "ml_feature_store.feature_version": f"eq.{self.schema.version}",
         }
         if limit:
             params["limit"] = str(limit)
+        return params
 
-        rows = self.supabase.get("ml_training_data", params=params)
+    def _fetch_training_frame(
+        self,
+        params: Dict[str, str],
+        include_meta: bool = True,
+        ids: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Label rows matching ``params`` (and ``ids``), joined locally with their vectors from ``self.features``."""
+        if ids is None:
+            pages = self.supabase.iter_pages("ml_training_data", params=params)
+        else:
+            pages = self.supabase.iter_in("ml_training_data", "id", ids, params=params)
+        builder = FrameBuilder()
+        for rows in pages:
+            builder.append(label_columns(rows, include_meta))
+        labels = builder.build()
+        if labels.empty:
+            return labels
 
-        if not rows:
-            return pd.DataFrame()
+        self._load_features(labels["feature_vector_id"])
+        columns, found = self.features.take(labels["feature_vector_id"].tolist())
+        if not found.all():
+            # Vectors deleted between the label read and the feature read
+            print(f"Dropped {int((~found).sum())} label rows whose feature vectors are gone")
+            labels = labels[found].reset_index(drop=True)
+        features = pd.DataFrame(columns.T, columns=self.features.names, copy=False)
+        return pd.concat([features, labels], axis=1)
+
+    def _load_features(self, feature_vector_ids: Iterable[Any]) -> None:
+        """Fetch and extract the vectors in ``feature_vector_ids`` that are not held yet."""
+        missing = self.features.missing(feature_vector_ids)
+        if not missing:
+            return
+        extractor = self.schema.extractor()
+        for rows in self.supabase.iter_in("ml_feature_store", "id", missing, params={"select": "id,features"}):
+            if rows:
+                self.features.add(
+                    [row["id"] for row in rows], extractor.columns([row.get("features") or {} for row in rows])
+                )
+
+    def training_chunks(
+        self,
+        label_type: str,
+        refresh: bool = True,
+        snapshot: Optional[str] = None,
+        chunk_rows: int = CHUNK_ROWS,
+    ) -> Optional[TrainingChunks]:
+        """
+        A label set as ``TrainingChunks``, without building its DataFrame
+
+        With the cache enabled, the chunks stream a cached snapshot: the
+        current one after an incremental refresh (rewritten row group by row
+        group, see ``_refresh_snapshot``), the current one as is with
+        ``refresh=False``, or ``snapshot``. With the cache disabled, the label
+        set is read page by page with its features embedded and spooled to a
+        temporary directory owned by this loader, so the feature vectors are
+        never held in memory. Returns None when there are no rows.
+        """
+        if self.cache is not None:
+            path = None
+            if snapshot or not refresh:
+                path = self.cache.snapshot_path(label_type, snapshot)
+                if path is not None:
+                    self.snapshots[label_type] = self.cache.snapshot_info(label_type, snapshot)["id"]
+                else:
+                    print(f"No cached {label_type} snapshot; fetching from Supabase")
+            if path is None:
+                path = self._refresh_snapshot(label_type)
+            return TrainingChunks(path, self.schema.names, chunk_rows) if path else None
+
+        if self._spool is None:
+            self._spool = tempfile.TemporaryDirectory(prefix="training-spool-", dir=SPOOL_DIR)
+        path = self._spool_training_data(label_type, os.path.join(self._spool.name, f"{label_type}.parquet"))
+        return TrainingChunks(path, self.schema.names, chunk_rows) if path else None
+
+    def _spool_training_data(self, label_type: str, path: str) -> Optional[str]:
+        """Write a label set with its features to ``path``, one page per row group."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        params = {**self._training_params(label_type), "select": STREAM_SELECT}
+        tmp = f"{path}.tmp"
+        writer = None
+        rows_written = 0
+        try:
+            for rows in self.supabase.iter_pages("ml_training_data", params=params):
+                if not rows:
+                    continue
+                columns = flatten_feature_columns(
+                    [(row.get("ml_feature_store") or {}).get("features") or {} for row in rows], self.schema
+                )
+                columns[ROW_ID] = [row.get("id") for row in rows]
+                columns["label"] = [json.dumps(row.get("label_value")) for row in rows]
+                table = pa.table(columns)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema)
+                writer.write_table(table)
+                rows_written += len(rows)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            return None
+        os.replace(tmp, path)
+        print(f"Spooled {rows_written} {label_type} rows to {path}")
+        return path
+
+    def _refresh_cache(self, label_type: str) -> pd.DataFrame:
+        """Bring the cached snapshot up to date and return it in stored form."""
+        cached = self.cache.read(label_type)
+        params = self._training_params(label_type)
+
+        if cached.empty:
+            merged = self._to_cache_frame(self._fetch_training_frame(params))
+            stats = {"fetched": len(merged), "added": len(merged), "updated": 0, "removed": 0}
+        else:
+            marks = self.cache.watermarks(label_type)
+            changed_frames = []
+            # gte, not gt: rows written in the same instant as the watermark may have landed after it
+            if marks["labeled_at"]:
+                changed_frames.append(self._fetch_training_frame({**params, "labeled_at": f"gte.{marks['labeled_at']}"}))
+            if marks["extraction_timestamp"]:
+                changed_frames.append(
+                    self._fetch_training_frame(
+                        {**params, "ml_feature_store.extraction_timestamp": f"gte.{marks['extraction_timestamp']}"}
+                    )
+                )
+
+            live_ids = self._live_ids(params)
+            changed = pd.concat(changed_frames, ignore_index=True, sort=False) if changed_frames else pd.DataFrame()
+            known = set(cached[ROW_ID]) | (set(changed[ROW_ID]) if not changed.empty else set())
+            missing = sorted(live_ids - known)
+            if missing:
+                changed = pd.concat([changed, self._fetch_training_frame(params, ids=missing)], ignore_index=True, sort=False)
 
-        records = []
-        for row in rows:
-            feature_vector = row.get("ml_feature_store", {}).get("features", {})
-            label = row.get("label_value")
-            record = self._flatten_features(feature_vector)
-            record["label"] = label
-            record["student_id"] = row.get("student_id")
-            record["feature_vector_id"] = row.get("feature_vector_id")
-            records.append(record)
+            if not changed.empty:
+                changed = self._to_cache_frame(changed).drop_duplicates(ROW_ID, keep="last")
+                changed = changed[changed[ROW_ID].isin(live_ids)]
+            previous = cached.set_index(ROW_ID)[[LABELED_AT, EXTRACTED_AT]]
+            changed_ids = set(changed[ROW_ID]) if not changed.empty else set()
+            kept = cached[cached[ROW_ID].isin(live_ids) & ~cached[ROW_ID].isin(changed_ids)]
+            merged = pd.concat([kept, changed], ignore_index=True, sort=False) if changed_ids else kept
 
-        return pd.DataFrame(records)
+            stats = {"fetched": len(changed), "added": 0, "updated": 0, "removed": int((~cached[ROW_ID].isin(live_ids)).sum())}
+            if changed_ids:
+                existing = changed[changed[ROW_ID].isin(previous.index)]
+                before = previous.loc[existing[ROW_ID]]
+                stats["added"] = len(changed) - len(existing)
+                stats["updated"] = int(
+                    (
+                        (before[LABELED_AT].values != existing[LABELED_AT].values)
+                        | (before[EXTRACTED_AT].values != existing[EXTRACTED_AT].values)
+                    ).sum()
+                )
+
+        # Same order as a fresh paginated read, so a snapshot always loads identically
+        merged = merged.sort_values(ROW_ID, kind="stable").reset_index(drop=True) if not merged.empty else merged
+        snapshot_id = self.cache.write(label_type, merged, stats)
+        self.snapshots[label_type] = snapshot_id
+        print(
+            f"Cached {label_type} snapshot {snapshot_id}: {len(merged)} rows "
+            f"(+{stats['added']} ~{stats['updated']} -{stats['removed']}, {stats['fetched']} fetched)"
+        )
+        return merged
+
+    def _refresh_snapshot(self, label_type: str) -> Optional[Path]:
+        """
+        Bring the cached snapshot up to date without building its DataFrame; returns its path
+
+        The previous snapshot's row groups are copied minus deleted and
+        changed rows, then the changed rows are appended page by page with
+        their features embedded. Only one row group is held at a time and the
+        loader's FeatureMatrix is left alone. Rows whose timestamps still
+        match the stored ones keep their place, so an unchanged label set
+        keeps its snapshot. Returns None when there are no rows.
+        """
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        params = self._training_params(label_type)
+        page_params = {**params, "select": CACHE_SELECT}
+        previous_path = self.cache.snapshot_path(label_type)
+        stats = {"fetched": 0, "added": 0, "updated": 0, "removed": 0}
+
+        if previous_path is None:
+            pages = self.supabase.iter_pages("ml_training_data", params=page_params)
+            dropped: List[Any] = []
+        else:
+            stored = pq.read_table(previous_path, columns=META_COLUMNS).to_pydict()
+            stored_marks = dict(zip(stored[ROW_ID], zip(stored[LABELED_AT], stored[EXTRACTED_AT])))
+            live_ids = self._live_ids(params)
+            changed = {
+                row_id
+                for row_id, marks in self._changed_marks(label_type, params).items()
+                if row_id in live_ids and stored_marks.get(row_id) != marks
+            }
+            changed |= live_ids - stored_marks.keys()
+            removed = stored_marks.keys() - live_ids
+            stats["added"] = len(changed - stored_marks.keys())
+            stats["updated"] = len(changed) - stats["added"]
+            stats["removed"] = len(removed)
+            if not changed and not removed:
+                self.snapshots[label_type] = self.cache.snapshot_info(label_type)["id"]
+                print(f"Cached {label_type} snapshot {self.snapshots[label_type]} is up to date ({len(stored_marks)} rows)")
+                return previous_path if stored_marks else None
+            pages = self.supabase.iter_in("ml_training_data", "id", sorted(changed), params=page_params)
+            dropped = sorted(changed | removed)
+
+        def tables() -> Iterator[Any]:
+            import pyarrow as pa
+
+            if previous_path is not None:
+                reader = pq.ParquetFile(previous_path)
+                drop = pa.array(dropped, type=reader.schema_arrow.field(ROW_ID).type)
+                for index in range(reader.num_row_groups):
+                    group = reader.read_row_group(index)
+                    yield group.filter(pc.invert(pc.is_in(group.column(ROW_ID), value_set=drop)))
+            for rows in pages:
+                if rows:
+                    stats["fetched"] += len(rows)
+                    yield self._cache_table(rows)
+            if previous_path is None:
+                stats["added"] = stats["fetched"]
+
+        snapshot_id = self.cache.write_tables(label_type, self._cache_schema(), tables(), stats)
+        self.snapshots[label_type] = snapshot_id
+        rows = self.cache.snapshot_info(label_type)["rows"]
+        print(
+            f"Cached {label_type} snapshot {snapshot_id}: {rows} rows "
+            f"(+{stats['added']} ~{stats['updated']} -{stats['removed']}, {stats['fetched']} fetched)"
+        )
+        return self.cache.snapshot_path(label_type) if rows else None
+
+    def _live_ids(self, params: Dict[str, str]) -> Set[Any]:
+        # The id list catches deletions, demoted confidences and back-dated inserts; it
+        # keeps the inner join so rows of another feature version never count as missing
+        return {
+            row["id"]
+            for rows in self.supabase.iter_pages(
+                "ml_training_data", params={**params, "select": "id,ml_feature_store!inner(feature_version)"}
+            )
+            for row in rows
+        }
+
+    def _changed_marks(self, label_type: str, params: Dict[str, str]) -> Dict[Any, Tuple[Any, Any]]:
+        """Stored-form ``(labeled_at, extraction_timestamp)`` of rows at or past the cached watermarks."""
+        marks = self.cache.watermarks(label_type)
+        changed: Dict[Any, Tuple[Any, Any]] = {}
+        # gte, not gt: rows written in the same instant as the watermark may have landed after it
+        for column, mark in (
+            ("labeled_at", marks["labeled_at"]),
+            ("ml_feature_store.extraction_timestamp", marks["extraction_timestamp"]),
+        ):
+            if not mark:
+                continue
+            for rows in self.supabase.iter_pages("ml_training_data", params={**params, column: f"gte.{mark}"}):
+                for row in rows:
+                    extracted = (row.get("ml_feature_store") or {}).get("extraction_timestamp")
+                    changed[row["id"]] = (row.get("labeled_at"), extracted)
+        return changed
+
+    def _cache_table(self, rows: List[Dict[str, Any]]) -> Any:
+        """One page of ``CACHE_SELECT`` rows as an Arrow table in stored form."""
+        import pyarrow as pa
+
+        columns = training_columns(rows, schema=self.schema)
+        columns["label"] = [json.dumps(label) for label in columns["label"]]
+        return pa.table(columns)
+
+    def _cache_schema(self) -> Any:
+        """Arrow schema of a stored snapshot: the features, then the label, keys and bookkeeping as text."""
+        import pyarrow as pa
+
+        feature_type = pa.from_numpy_dtype(self.schema.dtype)
+        text = ["label", "student_id", "feature_vector_id", *META_COLUMNS]
+        return pa.schema([*((name, feature_type) for name in self.schema.names), *((name, pa.string()) for name in text)])
+
+    def _to_cache_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Serialise labels to JSON text so Parquet stores one string column for them."""
+        if df.empty:
+            return df
+        df["label"] = [json.dumps(label) for label in df["label"]]  # frames here are freshly built, never shared
+        return df
+
+    def _from_cache_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        if df.empty:
+            return pd.DataFrame()
+        for column in META_COLUMNS:
+            del df[column]  # drops from the object block only; the float block is not copied
+        df["label"] = [json.loads(label) for label in df["label"]]
+        return df
 
     def load_feature_vectors(
         self,
@@ -96,19 +810,14 @@ class DataLoader:
         if limit:
             params["limit"] = str(limit)
 
-        rows = self.supabase.get("ml_feature_store", params=params)
-        if not rows:
-            return pd.DataFrame()
-
-        records = []
-        for row in rows:
-            feature_vector = row.get("features", {})
-            record = self._flatten_features(feature_vector)
-            record["student_id"] = row.get("student_id")
-            record["feature_version"] = row.get("feature_version")
-            record["extraction_timestamp"] = row.get("extraction_timestamp")
-            records.append(record)
-        return pd.DataFrame(records)
+        builder = FrameBuilder()
+        for rows in self.supabase.iter_pages("ml_feature_store", params=params):
+            columns: Dict[str, Any] = flatten_feature_columns([row.get("features") or {} for row in rows], self.schema)
+            columns["student_id"] = [row.get("student_id") for row in rows]
+            columns["feature_version"] = [row.get("feature_version") for row in rows]
+            columns["extraction_timestamp"] = [row.get("extraction_timestamp") for row in rows]
+            builder.append(columns)
+        return builder.build()
 
     def load_student_outcomes(
         self,
@@ -143,25 +852,14 @@ class DataLoader:
         if limit:
             params["limit"] = str(limit)
 
-        return self.supabase.get("ml_training_data", params=params)
-
-    def _flatten_features(self, features: Dict) -> Dict:
-        """Flatten nested feature structure into flat dictionary"""
-        flattened: Dict[str, Any] = {}
-        for category, values in features.items():
-            if isinstance(values, dict):
-                for key, value in values.items():
-                    flattened[f"{category}_{key}"] = value
-            else:
-                flattened[category] = values
-        return flattened
+        records: List[Dict[str, Any]] = []
+        for rows in self.supabase.iter_pages("ml_training_data", params=params):
+            records.extend(rows)
+        return records
 
     def get_feature_names(self, label_type: str) -> List[str]:
-        df = self.load_training_data(label_type, limit=1)
-        if df.empty:
-            return []
-        exclude_cols = ["label", "student_id", "feature_vector_id"]
-        return [col for col in df.columns if col not in exclude_cols]
+        """Model input columns, in order; fixed by the feature schema, so the same for every label type."""
+        return list(self.schema.names)
 
     def split_train_test(
         self,
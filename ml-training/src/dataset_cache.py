@@ -0,0 +1,219 @@
+"""
+Dataset Cache for ML Training
+Local Parquet snapshots of labeled training data, refreshed incrementally
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "cache"
+CACHE_DIR = Path(os.getenv("TRAINING_CACHE_DIR", str(DEFAULT_CACHE_DIR)))
+# Older snapshots beyond this many are deleted when a new one is written
+KEEP_SNAPSHOTS = int(os.getenv("TRAINING_CACHE_KEEP_SNAPSHOTS", "5"))
+# Rows per Parquet row group, the unit an out-of-core reader decodes at a time
+ROW_GROUP_ROWS = int(os.getenv("TRAINING_CACHE_ROW_GROUP_ROWS", "50000"))
+
+# Bookkeeping columns stored alongside the features and dropped on load
+ROW_ID = "_row_id"
+LABELED_AT = "_labeled_at"
+EXTRACTED_AT = "_extraction_timestamp"
+META_COLUMNS = [ROW_ID, LABELED_AT, EXTRACTED_AT]
+
+
+def _max_timestamp(series: pd.Series) -> Optional[str]:
+    values = series.dropna()
+    if values.empty:
+        return None
+    # Keep PostgREST's own string so the next filter compares exactly what it returned
+    parsed = pd.to_datetime(values, utc=True, format="ISO8601")
+    return str(values.iloc[int(parsed.values.argmax())])
+
+
+def content_digest(df: pd.DataFrame) -> str:
+    """Hash of row ids and their timestamps; equal digests mean identical snapshots."""
+    if df.empty:
+        return hashlib.sha1(b"").hexdigest()
+    hashed = pd.util.hash_pandas_object(df[META_COLUMNS].astype(str), index=False)
+    return hashlib.sha1(hashed.values.tobytes()).hexdigest()
+
+
+class DatasetCache:
+    """Parquet snapshots per label type plus a JSON manifest of watermarks"""
+
+    def __init__(self, cache_dir: Optional[Path] = None, keep_snapshots: int = KEEP_SNAPSHOTS):
+        self.cache_dir = Path(cache_dir or CACHE_DIR)
+        self.keep_snapshots = keep_snapshots
+
+    def _label_dir(self, label_type: str) -> Path:
+        return self.cache_dir / label_type
+
+    def _manifest_path(self, label_type: str) -> Path:
+        return self._label_dir(label_type) / "manifest.json"
+
+    def manifest(self, label_type: str) -> Dict[str, Any]:
+        path = self._manifest_path(label_type)
+        if not path.exists():
+            return {"label_type": label_type, "current": None, "snapshots": []}
+        with path.open("r", encoding="utf-8") as fp:
+            return json.load(fp)
+
+    def _write_manifest(self, label_type: str, manifest: Dict[str, Any]) -> None:
+        path = self._manifest_path(label_type)
+        tmp = path.with_suffix(".json.tmp")
+        with tmp.open("w", encoding="utf-8") as fp:
+            json.dump(manifest, fp, indent=2)
+        os.replace(tmp, path)
+
+    def snapshot_info(self, label_type: str, snapshot_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        manifest = self.manifest(label_type)
+        snapshot_id = snapshot_id or manifest.get("current")
+        for entry in manifest["snapshots"]:
+            if entry["id"] == snapshot_id:
+                return entry
+        return None
+
+    def watermarks(self, label_type: str) -> Dict[str, Optional[str]]:
+        entry = self.snapshot_info(label_type)
+        if not entry:
+            return {"labeled_at": None, "extraction_timestamp": None}
+        return {
+            "labeled_at": entry.get("max_labeled_at"),
+            "extraction_timestamp": entry.get("max_extraction_timestamp"),
+        }
+
+    def snapshot_path(self, label_type: str, snapshot_id: Optional[str] = None) -> Optional[Path]:
+        """Parquet file of a snapshot (the current one by default), or None if there is none."""
+        entry = self.snapshot_info(label_type, snapshot_id)
+        if entry is None:
+            if snapshot_id:
+                raise ValueError(f"Unknown {label_type} snapshot '{snapshot_id}'")
+            return None
+        path = self._label_dir(label_type) / entry["file"]
+        if not path.exists():
+            raise ValueError(f"Snapshot '{entry['id']}' was pruned from {path.parent}")
+        return path
+
+    def read(self, label_type: str, snapshot_id: Optional[str] = None) -> pd.DataFrame:
+        """Read a snapshot, including bookkeeping columns; the current one by default."""
+        path = self.snapshot_path(label_type, snapshot_id)
+        if path is None:
+            return pd.DataFrame()
+        return pd.read_parquet(path)
+
+    def write(self, label_type: str, df: pd.DataFrame, stats: Dict[str, int]) -> str:
+        """Store ``df`` as the current snapshot unless it matches it; returns the snapshot id."""
+        digest = content_digest(df)
+        current = self.snapshot_info(label_type)
+        if current and current.get("digest") == digest:
+            return current["id"]
+
+        tmp = self._pending_path(label_type)
+        df.to_parquet(tmp, index=False, row_group_size=ROW_GROUP_ROWS)
+        return self._publish(
+            label_type,
+            tmp,
+            {
+                "rows": len(df),
+                "digest": digest,
+                "max_labeled_at": _max_timestamp(df[LABELED_AT]) if not df.empty else None,
+                "max_extraction_timestamp": _max_timestamp(df[EXTRACTED_AT]) if not df.empty else None,
+                **stats,
+            },
+        )
+
+    def write_tables(self, label_type: str, schema: Any, tables: Iterable[Any], stats: Dict[str, int]) -> str:
+        """
+        Store a stream of Arrow ``tables`` as the current snapshot unless it matches it.
+
+        Tables are cast to ``schema`` and buffered up to ``ROW_GROUP_ROWS``
+        rows, so at most one row group is held at a time. The digest and
+        watermarks are accumulated as they pass and equal what ``write`` would
+        record for the same rows. ``stats`` is read once ``tables`` is
+        exhausted, so a generator may fill it in as it goes.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tmp = self._pending_path(label_type)
+        digest = hashlib.sha1()
+        marks: Dict[str, List[str]] = {LABELED_AT: [], EXTRACTED_AT: []}
+        buffered: List[Any] = []
+        buffered_rows = rows = 0
+        try:
+            with pq.ParquetWriter(tmp, schema) as writer:
+                for table in tables:
+                    if not table.num_rows:
+                        continue
+                    table = table.select(schema.names).cast(schema)
+                    meta = pd.DataFrame(
+                        {column: pd.Series(table.column(column).to_pylist(), dtype=object) for column in META_COLUMNS}
+                    )
+                    digest.update(pd.util.hash_pandas_object(meta.astype(str), index=False).values.tobytes())
+                    for column, values in marks.items():
+                        latest = _max_timestamp(meta[column])
+                        if latest is not None:
+                            values.append(latest)
+                    buffered.append(table)
+                    buffered_rows += table.num_rows
+                    rows += table.num_rows
+                    while buffered_rows >= ROW_GROUP_ROWS:
+                        combined = pa.concat_tables(buffered)
+                        writer.write_table(combined.slice(0, ROW_GROUP_ROWS))
+                        buffered, buffered_rows = [combined.slice(ROW_GROUP_ROWS)], buffered_rows - ROW_GROUP_ROWS
+                if buffered_rows:
+                    writer.write_table(pa.concat_tables(buffered))
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        current = self.snapshot_info(label_type)
+        if current and current.get("digest") == digest.hexdigest():
+            tmp.unlink()
+            return current["id"]
+        return self._publish(
+            label_type,
+            tmp,
+            {
+                "rows": rows,
+                "digest": digest.hexdigest(),
+                "max_labeled_at": _max_timestamp(pd.Series(marks[LABELED_AT], dtype=object)),
+                "max_extraction_timestamp": _max_timestamp(pd.Series(marks[EXTRACTED_AT], dtype=object)),
+                **stats,
+            },
+        )
+
+    def _pending_path(self, label_type: str) -> Path:
+        label_dir = self._label_dir(label_type)
+        label_dir.mkdir(parents=True, exist_ok=True)
+        return label_dir / f"pending-{os.getpid()}.parquet.tmp"
+
+    def _publish(self, label_type: str, tmp: Path, entry: Dict[str, Any]) -> str:
+        """Move a written snapshot into place and make it current; returns its id."""
+        manifest = self.manifest(label_type)
+        snapshot_id = f"{datetime.utcnow():%Y%m%dT%H%M%SZ}-{entry['digest'][:8]}"
+        filename = f"{snapshot_id}.parquet"
+        os.replace(tmp, self._label_dir(label_type) / filename)
+
+        manifest["snapshots"].append(
+            {"id": snapshot_id, "file": filename, "created_at": datetime.utcnow().isoformat(), **entry}
+        )
+        manifest["current"] = snapshot_id
+        self._prune(label_type, manifest)
+        self._write_manifest(label_type, manifest)
+        return snapshot_id
+
+    def _prune(self, label_type: str, manifest: Dict[str, Any]) -> None:
+        if self.keep_snapshots <= 0:
+            return
+        snapshots: List[Dict[str, Any]] = manifest["snapshots"]
+        for entry in snapshots[: -self.keep_snapshots]:
+            path = self._label_dir(label_type) / entry["file"]
+            if path.exists():
+                path.unlink()
+        manifest["snapshots"] = snapshots[-self.keep_snapshots :]
@@ -0,0 +1,202 @@
+"""
+Out-of-core XGBoost Training
+Streams training chunks through an xgboost.DataIter into external-memory hist training
+"""
+
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import xgboost
+
+from utils import training_threads
+
+# Share of rows (by row-id hash) held out for early stopping
+VALIDATION_FRACTION = float(os.getenv("TRAINING_EXTMEM_VALIDATION_FRACTION", "0.1"))
+# Directory for XGBoost's on-disk page cache; the system temp dir by default
+EXTMEM_CACHE_DIR = os.getenv("TRAINING_EXTMEM_CACHE_DIR") or None
+# Recorded as the ``cv`` metric of out-of-core models, which are fitted once without cross-validation
+CV_SKIPPED = "skipped (external memory)"
+
+TRAIN, VALIDATION, TEST = 0, 1, 2
+
+# (row ids, (rows, features) matrix, raw labels)
+Chunk = Tuple[np.ndarray, np.ndarray, List[Any]]
+
+
+def assign_split(ids: Any, test_size: float, validation_fraction: float) -> np.ndarray:
+    """
+    Stable train/validation/test assignment of rows
+
+    Rows are assigned by a hash of their id rather than a shuffle, so every
+    pass over the chunks puts a row in the same split without holding the
+    row order in memory.
+
+    Args:
+        ids: Row ids of one chunk
+        test_size: Share of rows for the test split
+        validation_fraction: Share of rows for early stopping
+
+    Returns:
+        ``TRAIN``, ``VALIDATION`` or ``TEST`` per row
+    """
+    position = (pd.util.hash_array(np.asarray(ids, dtype=object)) % 10_000) / 10_000
+    split = np.full(len(position), TRAIN, dtype=np.int8)
+    split[position < test_size + validation_fraction] = VALIDATION
+    split[position < test_size] = TEST
+    return split
+
+
+def _split_chunks(
+    chunks: Iterable[Chunk],
+    target: Callable[[List[Any]], np.ndarray],
+    part: int,
+    test_size: float,
+    validation_fraction: float,
+) -> Iterable[Tuple[np.ndarray, np.ndarray]]:
+    for ids, matrix, labels in chunks:
+        mask = assign_split(ids, test_size, validation_fraction) == part
+        if not mask.any():
+            continue
+        X = np.nan_to_num(matrix[mask], nan=0.0, copy=False)  # as fillna(0) in memory
+        y = np.asarray(target([label for label, keep in zip(labels, mask) if keep]))
+        yield X, y
+
+
+class ChunkIter(xgboost.DataIter):
+    """Feeds one split of a chunk source to XGBoost a chunk at a time"""
+
+    def __init__(
+        self,
+        chunks: Iterable[Chunk],
+        target: Callable[[List[Any]], np.ndarray],
+        part: int,
+        test_size: float,
+        validation_fraction: float,
+        cache_prefix: str,
+    ):
+        self.chunks = chunks
+        self.target = target
+        self.part = part
+        self.test_size = test_size
+        self.validation_fraction = validation_fraction
+        self.rows = 0
+        self._iter: Optional[Iterable[Tuple[np.ndarray, np.ndarray]]] = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self) -> None:
+        self._iter = None
+
+    def next(self, input_data: Callable) -> bool:
+        if self._iter is None:
+            self.rows = 0
+            self._iter = iter(
+                _split_chunks(self.chunks, self.target, self.part, self.test_size, self.validation_fraction)
+            )
+        batch = next(self._iter, None)
+        if batch is None:
+            return False
+        X, y = batch
+        self.rows += len(y)
+        input_data(data=X, label=y)
+        return True
+
+
+def _booster_params(model: Any) -> Dict[str, Any]:
+    """Native training parameters of an XGBoost sklearn estimator"""
+    params = {key: value for key, value in model.get_xgb_params().items() if value is not None}
+    params.pop("use_label_encoder", None)
+    params["nthread"] = params.pop("n_jobs", None) or training_threads()
+    if "random_state" in params:
+        params["seed"] = params.pop("random_state")
+    params["tree_method"] = "hist"
+    return params
+
+
+def _external_matrix(source: ChunkIter, max_bin: int, nthread: int, ref: Any = None) -> Any:
+    """Paged training matrix over ``source``, cached on disk under its ``cache_prefix``"""
+    if hasattr(xgboost, "ExtMemQuantileDMatrix"):  # xgboost >= 3.0 quantises while reading the pages
+        return xgboost.ExtMemQuantileDMatrix(source, max_bin=max_bin, ref=ref, nthread=nthread)
+    # xgboost 2.x pages the raw chunks and quantises them with ``max_bin`` from the training params
+    return xgboost.DMatrix(source, nthread=nthread)
+
+
+def fit_out_of_core(
+    model: Any,
+    chunks: Iterable[Chunk],
+    target: Callable[[List[Any]], np.ndarray],
+    test_size: float = 0.2,
+    early_stopping_rounds: Optional[int] = None,
+    validation_fraction: float = VALIDATION_FRACTION,
+    max_bin: int = 256,
+) -> Dict[str, Any]:
+    """
+    Fit an XGBoost estimator from chunks without materialising the full matrix
+
+    The train and validation splits are streamed through ``ChunkIter`` into
+    an external-memory matrix (``ExtMemQuantileDMatrix`` on xgboost 3, a
+    paged ``DMatrix`` on 2.x), which keeps its pages in an on-disk cache. Boosting runs for up to ``model.n_estimators`` rounds and stops
+    early on the validation split. Test rows are predicted chunk by chunk.
+
+    Args:
+        model: Unfitted ``XGBClassifier`` (binary) or ``XGBRegressor``; loaded with the trained booster
+        chunks: Re-iterable source of ``(row ids, matrix, raw labels)`` chunks
+        target: Maps a chunk's raw labels to model targets
+        test_size: Share of rows held out for evaluation
+        early_stopping_rounds: Rounds without validation improvement before stopping (None disables)
+        validation_fraction: Share of rows used for early stopping
+        max_bin: Histogram bins per feature
+
+    Returns:
+        Dictionary with the fitted ``model``, test ``y_test`` and ``predictions``
+        (positive-class probability or values), per-split ``rows``, ``n_estimators`` and ``seconds``
+    """
+    started = time.perf_counter()
+    if not early_stopping_rounds:
+        validation_fraction = 0.0
+    params = {**_booster_params(model), "max_bin": max_bin}
+
+    with tempfile.TemporaryDirectory(prefix="xgb-extmem-", dir=EXTMEM_CACHE_DIR) as cache_dir:
+        def matrix(part: int, ref: Any = None) -> Tuple[Any, ChunkIter]:
+            source = ChunkIter(chunks, target, part, test_size, validation_fraction, os.path.join(cache_dir, str(part)))
+            return _external_matrix(source, max_bin, params["nthread"], ref=ref), source
+
+        dtrain, train_source = matrix(TRAIN)
+        dvalid, evals, validation_rows = None, [], 0
+        if validation_fraction > 0:
+            dvalid, valid_source = matrix(VALIDATION, ref=dtrain)
+            validation_rows = valid_source.rows
+            if validation_rows:
+                evals = [(dvalid, "validation")]
+        booster = xgboost.train(
+            params,
+            dtrain,
+            num_boost_round=model.n_estimators,
+            evals=evals,
+            early_stopping_rounds=early_stopping_rounds if evals else None,
+            verbose_eval=False,
+        )
+        if evals:
+            booster = booster[: booster.best_iteration + 1]
+        train_rows = train_source.rows
+        del dtrain, dvalid, evals  # release the page caches before their directory goes
+
+    model.load_model(bytearray(booster.save_raw("ubj")))
+    model.set_params(n_estimators=booster.num_boosted_rounds())
+
+    y_test, predictions = [], []
+    for X, y in _split_chunks(chunks, target, TEST, test_size, validation_fraction):
+        y_test.append(y)
+        predictions.append(booster.inplace_predict(X))
+
+    return {
+        "model": model,
+        "y_test": np.concatenate(y_test) if y_test else np.array([]),
+        "predictions": np.concatenate(predictions) if predictions else np.array([]),
+        "rows": {"train": train_rows, "validation": validation_rows, "test": int(sum(len(y) for y in y_test))},
+        "n_estimators": booster.num_boosted_rounds(),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
@@ -2,9 +2,13 @@
 Utility functions for ML training
 """
 
+import hashlib
+import os
+import time
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Any, Optional, Union
+from typing import Callable, Dict, List, Any, Optional, Sequence, Tuple, Union
 import json
 from pathlib import Path
 
@@ -164,21 +168,37 @@ def save_config(config: Dict[str, Any], config_path: str):
     with open(config_path, 'w') as f:
         json.dump(config, f, indent=2)
 
+def available_cpus() -> int:
+    """CPUs this process may run on (respects affinity masks and container cpusets)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def training_threads() -> int:
+    """
+    Threads one trainer may give its model (XGBoost/LightGBM ``n_jobs``)
+
+    ``TRAINING_THREADS`` when set, which ``run_pipeline`` does for each
+    parallel job; otherwise every available CPU.
+    """
+    threads = int(os.getenv("TRAINING_THREADS", "0"))
+    return threads if threads > 0 else available_cpus()
+
+
 def ensure_dir(path: str):
     """Ensure directory exists"""
     Path(path).mkdir(parents=True, exist_ok=True)
 
 
+LABEL_VALUE_KEYS = ("value", "label", "outcome_value", "numerical_value", "category")
+REGRESSION_TARGET_KEYS = ("score", "value", "difficulty", "numerical_value")
+
+
 def parse_label_value(label: Any) -> Any:
     """Extract primitive value from nested label structures"""
     if isinstance(label, dict):
-        for key in (
-            "value",
-            "label",
-            "outcome_value",
-            "numerical_value",
-            "category",
-        ):
+        for key in LABEL_VALUE_KEYS:
             if key in label:
                 return parse_label_value(label[key])
         if len(label) == 1:
@@ -264,7 +284,7 @@ def extract_regression_target(
             except (TypeError, ValueError):
                 return default
 
-        for candidate in ("score", "value", "difficulty", "numerical_value"):
+        for candidate in REGRESSION_TARGET_KEYS:
             if candidate in label:
                 try:
                     return float(label[candidate])
@@ -277,3 +297,485 @@ def extract_regression_target(
     except (TypeError, ValueError):
         return default
 
+
+def _as_list(labels: Sequence[Any]) -> List[Any]:
+    return labels.tolist() if hasattr(labels, "tolist") else list(labels)
+
+
+def _object_array(values: List[Any]) -> np.ndarray:
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+_MISSING = object()
+_PRIMITIVES = (str, int, float, bool, type(None))
+
+
+def _reference_key(values: List[Any], priority: Sequence[str]) -> Tuple[Optional[str], Tuple[str, ...]]:
+    """
+    The key the scalar decoder reads from the first dict label, and the
+    higher-priority keys a row must not contain for that key to apply to it.
+    """
+    reference = next((value for value in values if type(value) is dict), None)
+    if reference is None:
+        return None, ()
+    for index, key in enumerate(priority):
+        if key in reference:
+            return key, tuple(priority[:index])
+    return None, ()
+
+
+def _map_unique(values: np.ndarray, decode: Callable[[Any], Any], dtype: Any) -> np.ndarray:
+    """Apply ``decode`` once per distinct value and broadcast the results."""
+    codes, uniques = pd.factorize(values)
+    if any(isinstance(value, (bool, int, float, np.number)) for value in uniques):
+        # factorize treats True, 1 and 1.0 as one value, which the scalar decoders do not
+        return np.array([decode(value) for value in values], dtype=dtype)
+    decoded = np.array([decode(value) for value in uniques], dtype=dtype)
+    result = np.empty(len(values), dtype=dtype)
+    valid = codes >= 0
+    result[valid] = decoded[codes[valid]]
+    for index in np.flatnonzero(~valid):  # None and NaN decode differently
+        result[index] = decode(values[index])
+    return result
+
+
+def parse_label_values(labels: Sequence[Any]) -> np.ndarray:
+    """
+    Vectorised ``parse_label_value`` over a column of labels
+
+    The key to read is resolved once from the first dict label. Rows where
+    that key holds a primitive and no higher-priority key is present read it
+    directly; any others take the scalar path.
+
+    Args:
+        labels: Label structures, e.g. ``df["label"]``
+    """
+    values = _as_list(labels)
+    key, earlier = _reference_key(values, LABEL_VALUE_KEYS)
+    single = False
+    if key is None:
+        reference = next((value for value in values if type(value) is dict), None)
+        if reference is None or len(reference) != 1:
+            return _object_array([parse_label_value(value) for value in values])
+        key, earlier, single = next(iter(reference)), LABEL_VALUE_KEYS, True
+    return _object_array(
+        [
+            found
+            if type(value) is dict
+            and type(found := value.get(key, _MISSING)) in _PRIMITIVES
+            and (not single or len(value) == 1)
+            and (not earlier or value.keys().isdisjoint(earlier))
+            else parse_label_value(value)
+            for value in values
+        ]
+    )
+
+
+def extract_binary_labels(
+    labels: Sequence[Any],
+    positive_values: Optional[List[Union[str, int, float, bool]]] = None,
+    default: int = 0,
+) -> np.ndarray:
+    """Vectorised ``extract_binary_label``; returns int8"""
+    return _map_unique(
+        parse_label_values(labels),
+        lambda value: extract_binary_label(value, positive_values=positive_values, default=default),
+        np.int8,
+    )
+
+
+def extract_multiclass_labels(
+    labels: Sequence[Any],
+    mapping: Optional[Dict[str, int]] = None,
+    default: int = 0,
+) -> np.ndarray:
+    """Vectorised ``extract_multiclass_label``; returns int32"""
+    return _map_unique(
+        parse_label_values(labels),
+        lambda value: extract_multiclass_label(value, mapping=mapping, default=default),
+        np.int32,
+    )
+
+
+def extract_label_field(labels: Sequence[Any], key: str) -> np.ndarray:
+    """``label.get(key)`` for every dict label, None otherwise"""
+    return _object_array([value.get(key) if type(value) is dict else None for value in _as_list(labels)])
+
+
+def extract_regression_targets(
+    labels: Sequence[Any],
+    key: Optional[str] = None,
+    default: float = 0.0,
+) -> np.ndarray:
+    """
+    Vectorised ``extract_regression_target``; returns float32
+
+    Args:
+        labels: Label structures, e.g. ``df["label"]``
+        key: Preferred key inside dict labels
+        default: Value to use when a label cannot be parsed
+    """
+    values = _as_list(labels)
+    field, earlier = _reference_key(values, [candidate for candidate in [key, *REGRESSION_TARGET_KEYS] if candidate])
+    picked = [
+        value if type(value) is not dict
+        else value.get(field) if field and (not earlier or value.keys().isdisjoint(earlier))
+        else None
+        for value in values
+    ]
+    # numpy would read a one-element list as its element; only primitives convert here
+    picked = [value if type(value) in _PRIMITIVES else None for value in picked]
+    try:
+        targets = np.array(picked, dtype=np.float64)
+    except (TypeError, ValueError):
+        targets = np.array(pd.to_numeric(pd.Series(picked, dtype=object), errors="coerce"), dtype=np.float64)
+    # Missing keys, non-primitives and unconvertible values take the scalar path and its defaults
+    for index in np.flatnonzero(np.isnan(targets)):
+        targets[index] = extract_regression_target(values[index], key=key, default=default)
+    return targets.astype(np.float32)
+
+
+# Fold preprocessing results kept per process; each entry holds one fold's transformed data
+CV_CACHE_SIZE = int(os.getenv("TRAINING_CV_CACHE_SIZE", "32"))
+_SPLIT_CACHE: "OrderedDict[Tuple, Any]" = OrderedDict()
+_PREPROCESS_CACHE: "OrderedDict[Tuple, Any]" = OrderedDict()
+
+CV_SCORERS = ("f1", "f1_weighted", "roc_auc", "rmse")
+
+
+def _digest(data: Any) -> str:
+    if hasattr(data, "tocsr"):  # scipy sparse
+        data = data.tocsr()
+        parts = [data.data, data.indices, data.indptr]
+    elif isinstance(data, (pd.DataFrame, pd.Series)):
+        parts = [pd.util.hash_pandas_object(data, index=False).values]
+    else:
+        array = np.asarray(data)
+        parts = [pd.util.hash_array(array.ravel()) if array.dtype == object else np.ascontiguousarray(array)]
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(np.ascontiguousarray(part).view(np.uint8))
+    return digest.hexdigest()
+
+
+def _remember(cache: "OrderedDict[Tuple, Any]", key: Tuple, value: Any) -> Any:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > CV_CACHE_SIZE:
+        cache.popitem(last=False)
+    return value
+
+
+def _take(data: Any, index: np.ndarray) -> Any:
+    return data.iloc[index] if isinstance(data, (pd.DataFrame, pd.Series)) else data[index]
+
+
+def cv_splits(
+    y: Sequence[Any],
+    n_splits: int = 5,
+    stratify: bool = True,
+    random_state: int = 42,
+    validation_fraction: float = 0.1,
+) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Shuffled K-fold splits, cached per label vector
+
+    Each fold is ``(fit_index, early_stopping_index, holdout_index)``: a
+    ``validation_fraction`` slice of the fold's training rows is held back
+    for early stopping, so out-of-fold scores never see it.
+
+    Args:
+        y: Labels or targets
+        n_splits: Number of folds
+        stratify: Keep class proportions in every fold (classification)
+        random_state: Seed for the shuffles
+        validation_fraction: Share of each fold's training rows used for early stopping (0 disables)
+    """
+    from sklearn.model_selection import KFold, StratifiedKFold, train_test_split
+
+    y = np.asarray(y)
+    key = (_digest(y), n_splits, stratify, random_state, validation_fraction)
+    if key in _SPLIT_CACHE:
+        _SPLIT_CACHE.move_to_end(key)
+        return _SPLIT_CACHE[key]
+
+    splitter = (
+        StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+        if stratify
+        else KFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    )
+    folds = []
+    for train_index, holdout_index in splitter.split(np.zeros(len(y)), y if stratify else None):
+        stop_index = np.array([], dtype=train_index.dtype)
+        if validation_fraction > 0:
+            try:
+                train_index, stop_index = train_test_split(
+                    train_index,
+                    test_size=validation_fraction,
+                    random_state=random_state,
+                    stratify=y[train_index] if stratify else None,
+                )
+            except ValueError:  # a class too small to stratify the slice
+                train_index, stop_index = train_test_split(
+                    train_index, test_size=validation_fraction, random_state=random_state
+                )
+        folds.append((np.sort(train_index), np.sort(stop_index), holdout_index))
+    return _remember(_SPLIT_CACHE, key, folds)
+
+
+def _fold_data(
+    X: Any,
+    folds: List[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+    fold: int,
+    preprocessor: Any,
+    x_digest: str,
+    y_digest: str,
+) -> Tuple[Any, Any, Any]:
+    """Fold ``fold`` of ``X`` split three ways, with ``preprocessor`` fitted on the fit rows only (cached)."""
+    from sklearn.base import clone
+
+    fit_index, stop_index, holdout_index = folds[fold]
+    if preprocessor is None:
+        # Plain row slices are cheap; caching them would only hold copies of X
+        return _take(X, fit_index), _take(X, stop_index) if len(stop_index) else None, _take(X, holdout_index)
+
+    key = (x_digest, y_digest, len(folds), fold, repr(preprocessor))
+    if key in _PREPROCESS_CACHE:
+        _PREPROCESS_CACHE.move_to_end(key)
+        return _PREPROCESS_CACHE[key]
+
+    fitted = clone(preprocessor)
+    parts = (
+        fitted.fit_transform(_take(X, fit_index)),
+        fitted.transform(_take(X, stop_index)) if len(stop_index) else None,
+        fitted.transform(_take(X, holdout_index)),
+    )
+    return _remember(_PREPROCESS_CACHE, key, parts)
+
+
+def _boosting_library(model: Any) -> Optional[str]:
+    module = type(model).__module__
+    if module.startswith("xgboost"):
+        return "xgboost"
+    if module.startswith("lightgbm"):
+        return "lightgbm"
+    return None
+
+
+def fit_with_early_stopping(
+    model: Any,
+    X_fit: Any,
+    y_fit: Any,
+    X_stop: Any = None,
+    y_stop: Any = None,
+    early_stopping_rounds: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Fit ``model``, stopping boosting once the early-stopping set stops improving
+
+    Args:
+        model: Unfitted estimator; XGBoost and LightGBM models stop early, others fit normally
+        X_fit, y_fit: Training rows
+        X_stop, y_stop: Early-stopping rows (optional)
+        early_stopping_rounds: Rounds without improvement before stopping
+
+    Returns:
+        Number of boosting rounds kept, or None when the model did not stop early
+    """
+    library = _boosting_library(model)
+    if not early_stopping_rounds or X_stop is None or len(y_stop) == 0 or library is None:
+        model.fit(X_fit, y_fit)
+        return None
+
+    if library == "xgboost":
+        model.set_params(early_stopping_rounds=early_stopping_rounds)
+        model.fit(X_fit, y_fit, eval_set=[(X_stop, y_stop)], verbose=False)
+        return int(model.best_iteration) + 1
+
+    import inspect
+    import lightgbm
+
+    model.set_params(verbose=-1)
+    # LightGBM 4.6+ takes eval_X/eval_y and deprecates eval_set
+    if "eval_X" in inspect.signature(model.fit).parameters:
+        eval_kwargs = {"eval_X": (X_stop,), "eval_y": (y_stop,)}
+    else:
+        eval_kwargs = {"eval_set": [(X_stop, y_stop)]}
+    model.fit(
+        X_fit,
+        y_fit,
+        callbacks=[lightgbm.early_stopping(early_stopping_rounds, verbose=False)],
+        **eval_kwargs,
+    )
+    return int(model.best_iteration_) or None
+
+
+def _predict_oof(model: Any, X: Any, classes: Optional[np.ndarray]) -> np.ndarray:
+    if classes is None:
+        return np.asarray(model.predict(X), dtype=np.float64)
+    proba = model.predict_proba(X)
+    if len(classes) == 2 and list(model.classes_) == list(classes):
+        return proba[:, 1]
+    # A fold may miss a rare class; align its columns with the full class list
+    aligned = np.zeros((proba.shape[0], len(classes)))
+    aligned[:, np.searchsorted(classes, model.classes_)] = proba
+    return aligned[:, 1] if len(classes) == 2 else aligned
+
+
+def _score(scoring: str, y_true: np.ndarray, predictions: np.ndarray, classes: Optional[np.ndarray]) -> float:
+    from sklearn.metrics import f1_score, mean_squared_error, roc_auc_score
+
+    if scoring == "rmse":
+        return float(np.sqrt(mean_squared_error(y_true, predictions)))
+    if scoring == "roc_auc":
+        return float(roc_auc_score(y_true == classes[-1], predictions))
+    if predictions.ndim == 1:
+        predicted = np.where(predictions >= 0.5, classes[1], classes[0])
+    else:
+        predicted = classes[predictions.argmax(axis=1)]
+    if scoring == "f1":
+        return float(f1_score(y_true, predicted, pos_label=classes[-1], zero_division=0))
+    return float(f1_score(y_true, predicted, average="weighted", zero_division=0))
+
+
+def calibration_report(y_true: Sequence[Any], proba: np.ndarray, bins: int = 10) -> Dict[str, Any]:
+    """
+    Reliability of binary probabilities
+
+    Args:
+        y_true: 0/1 labels
+        proba: Predicted probability of the positive class
+        bins: Equal-width probability bins
+
+    Returns:
+        Brier score, expected calibration error and per-bin mean prediction vs observed rate
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    proba = np.asarray(proba, dtype=np.float64)
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    which = np.clip(np.digitize(proba, edges[1:-1]), 0, bins - 1)
+    table, ece = [], 0.0
+    for index in range(bins):
+        mask = which == index
+        if not mask.any():
+            continue
+        predicted, observed = float(proba[mask].mean()), float(y_true[mask].mean())
+        ece += mask.mean() * abs(predicted - observed)
+        table.append({"bin": [float(edges[index]), float(edges[index + 1])], "count": int(mask.sum()),
+                      "mean_predicted": predicted, "observed_rate": observed})
+    return {"brier": float(np.mean((proba - y_true) ** 2)), "ece": float(ece), "bins": table}
+
+
+def cross_validate_oof(
+    estimator: Any,
+    X: Any,
+    y: Sequence[Any],
+    scoring: str,
+    n_splits: int = 5,
+    stratify: Optional[bool] = None,
+    random_state: int = 42,
+    preprocessor: Any = None,
+    early_stopping_rounds: Optional[int] = 50,
+    validation_fraction: float = 0.1,
+    n_jobs: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    K-fold cross-validation producing out-of-fold predictions in one pass
+
+    Folds run in parallel threads within ``training_threads()`` (XGBoost,
+    LightGBM and numpy release the GIL), each fold's model getting an equal
+    share of the threads. Boosted models stop early on a slice of the fold's
+    training rows. Fold splits and each fold's fitted ``preprocessor``
+    output are cached per process, so repeated runs on the same data (other
+    hyperparameters, another estimator) only refit the model.
+
+    Args:
+        estimator: Unfitted model; cloned per fold
+        X: Features (DataFrame, array, sparse matrix, or texts with a preprocessor)
+        y: Labels or targets
+        scoring: One of ``CV_SCORERS``
+        n_splits: Number of folds
+        stratify: Stratify folds; defaults to True for every scorer except ``rmse``
+        random_state: Seed for the fold shuffles
+        preprocessor: Unfitted transformer fitted per fold (e.g. ``StandardScaler``, ``TfidfVectorizer``)
+        early_stopping_rounds: Boosting rounds without improvement before a fold stops (None disables)
+        validation_fraction: Share of each fold's training rows used for early stopping
+        n_jobs: Folds run at once; defaults to the thread budget
+
+    Returns:
+        Dictionary with per-fold ``scores``, their ``mean``/``std``, pooled ``oof_score``,
+        ``oof`` predictions (positive-class probability, class probabilities or values),
+        ``n_estimators`` (median rounds kept when folds stopped early), ``fold_rounds``,
+        binary ``calibration`` and ``seconds``
+    """
+    from joblib import Parallel, delayed
+    from sklearn.base import clone
+
+    if scoring not in CV_SCORERS:
+        raise ValueError(f"Unknown scoring '{scoring}'; expected one of {CV_SCORERS}")
+
+    started = time.perf_counter()
+    y = np.asarray(y)
+    is_classifier = scoring != "rmse"
+    stratify = is_classifier if stratify is None else stratify
+    classes = np.unique(y) if is_classifier else None
+    folds = cv_splits(y, n_splits, stratify, random_state, validation_fraction if early_stopping_rounds else 0.0)
+
+    budget = training_threads()
+    fold_jobs = max(1, min(n_jobs or budget, len(folds)))
+    fold_threads = max(1, budget // fold_jobs)
+    x_digest = _digest(X) if preprocessor is not None else ""
+    y_digest = _digest(y)
+
+    def run_fold(fold: int) -> Tuple[np.ndarray, Optional[int]]:
+        X_fit, X_stop, X_holdout = _fold_data(X, folds, fold, preprocessor, x_digest, y_digest)
+        fit_index, stop_index, _ = folds[fold]
+        model = clone(estimator)
+        if _boosting_library(model) is not None:
+            model.set_params(n_jobs=fold_threads)
+        rounds = fit_with_early_stopping(
+            model, X_fit, y[fit_index], X_stop, y[stop_index], early_stopping_rounds
+        )
+        return _predict_oof(model, X_holdout, classes), rounds
+
+    results = Parallel(n_jobs=fold_jobs, prefer="threads")(delayed(run_fold)(fold) for fold in range(len(folds)))
+
+    first = results[0][0]
+    oof = np.zeros((len(y),) + first.shape[1:], dtype=np.float64)
+    scores = []
+    for (_, _, holdout_index), (predictions, _) in zip(folds, results):
+        oof[holdout_index] = predictions
+        scores.append(_score(scoring, y[holdout_index], predictions, classes))
+
+    rounds = [rounds for _, rounds in results if rounds]
+    report: Dict[str, Any] = {
+        "scoring": scoring,
+        "scores": np.array(scores),
+        "mean": float(np.mean(scores)),
+        "std": float(np.std(scores)),
+        "oof": oof,
+        "oof_score": _score(scoring, y, oof, classes),
+        "n_estimators": int(np.median(rounds)) if rounds else None,
+        "fold_rounds": [rounds for _, rounds in results],
+        "calibration": None,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    if classes is not None and len(classes) == 2:
+        report["calibration"] = calibration_report(y == classes[1], oof)
+    return report
+
+
+def cv_metrics(report: Dict[str, Any]) -> Dict[str, float]:
+    """Flat ``cv_*`` metrics from a ``cross_validate_oof`` report, for metadata and MLflow"""
+    name = report["scoring"]
+    metrics = {
+        f"cv_{name}": report["mean"],
+        f"cv_{name}_std": report["std"],
+        f"cv_oof_{name}": report["oof_score"],
+    }
+    if report["calibration"]:
+        metrics["cv_brier"] = report["calibration"]["brier"]
+        metrics["cv_ece"] = report["calibration"]["ece"]
+    return metrics
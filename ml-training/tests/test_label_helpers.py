@@ -0,0 +1,111 @@
+"""
+Vectorised label helpers against their scalar counterparts
+Random label columns must decode identically row by row
+"""
+
+import math
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils import (
+    LABEL_VALUE_KEYS,
+    REGRESSION_TARGET_KEYS,
+    extract_binary_label,
+    extract_binary_labels,
+    extract_label_field,
+    extract_multiclass_label,
+    extract_multiclass_labels,
+    extract_regression_target,
+    extract_regression_targets,
+    parse_label_value,
+    parse_label_values,
+)
+
+COLUMNS = 500
+KEYS = list(dict.fromkeys([*LABEL_VALUE_KEYS, *REGRESSION_TARGET_KEYS, "reason", "meta"]))
+PRIMITIVES = [
+    0, 1, 2, -3, 0.0, 1.0, 0.5, 2.75, float("nan"), True, False, None,
+    "1", "0", "0.5", " 2.5 ", "abc", "", "true", "yes", "dropout", "burnout", "nan",
+    "career_explorer", "Career_Builder", "career_leader", "career_champion",
+]
+MAPPING = {"1": 1, "0": 0, "True": 1, "abc": 2, "career_leader": 3}
+
+
+def random_label(rng: random.Random, depth: int = 0):
+    kind = rng.random()
+    if depth >= 3 or kind < 0.45:
+        return rng.choice(PRIMITIVES)
+    if kind < 0.6:
+        return [random_label(rng, depth + 1) for _ in range(rng.randint(0, 2))]
+    return {key: random_label(rng, depth + 1) for key in rng.sample(KEYS, rng.randint(1, 3))}
+
+
+def random_column(rng: random.Random):
+    # Mostly one label shape per column, as in the feature store, with some noise rows
+    template = random_label(rng)
+    column = []
+    for _ in range(rng.randint(1, 40)):
+        if isinstance(template, dict) and rng.random() < 0.8:
+            column.append({key: random_label(rng, 2) for key in template})
+        else:
+            column.append(random_label(rng))
+    return column
+
+
+def same(left, right) -> bool:
+    if isinstance(left, float) and isinstance(right, float) and math.isnan(left) and math.isnan(right):
+        return True
+    return type(left) is type(right) and left == right
+
+
+@pytest.fixture(scope="module")
+def columns():
+    rng = random.Random(20240601)
+    return [random_column(rng) for _ in range(COLUMNS)]
+
+
+def test_parse_label_values(columns):
+    for column in columns:
+        for label, value in zip(column, parse_label_values(column)):
+            assert same(value, parse_label_value(label)), label
+
+
+@pytest.mark.parametrize("positive_values", [None, [1, "yes", True], ["abc", 0.5]])
+def test_extract_binary_labels(columns, positive_values):
+    for column in columns:
+        expected = [extract_binary_label(label, positive_values=positive_values) for label in column]
+        assert extract_binary_labels(column, positive_values=positive_values).tolist() == expected, column
+
+
+@pytest.mark.parametrize("mapping", [None, MAPPING])
+def test_extract_multiclass_labels(columns, mapping):
+    for column in columns:
+        expected = [extract_multiclass_label(label, mapping=mapping, default=-1) for label in column]
+        assert extract_multiclass_labels(column, mapping=mapping, default=-1).tolist() == expected, column
+
+
+@pytest.mark.parametrize("key", [None, "score", "value", "reason"])
+def test_extract_regression_targets(columns, key):
+    for column in columns:
+        expected = np.array([extract_regression_target(label, key=key, default=-1.0) for label in column], dtype=np.float32)
+        np.testing.assert_array_equal(extract_regression_targets(column, key=key, default=-1.0), expected, err_msg=str(column))
+
+
+def test_regression_targets_do_not_unwrap_lists():
+    labels = [[1], {"score": [1]}, [[2.5]]]
+    expected = [extract_regression_target(label) for label in labels]
+    assert extract_regression_targets(labels).tolist() == expected
+
+
+@pytest.mark.parametrize("key", ["reason", "value"])
+def test_extract_label_field(columns, key):
+    for column in columns:
+        expected = [label.get(key) if isinstance(label, dict) else None for label in column]
+        assert all(same(a, b) for a, b in zip(extract_label_field(column, key), expected)), column
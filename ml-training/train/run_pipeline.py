@@ -1,10 +1,19 @@
 """
-Run the full ML training pipeline sequentially for all models.
+Run the full ML training pipeline for all models.
 
 This script loads labeled datasets from Supabase, trains the Dropout,
 Burnout, Career, Difficulty, and Sentiment models (skipping any that
 lack data), writes per-model reports, and registers successful runs to
 `ml_model_versions` when Supabase credentials are provided.
+
+With ``--jobs N`` (or ``TRAINING_JOBS``) the models train in a pool of N
+worker processes, each limited to its share of the CPUs.
+
+With ``--search`` each boosted model's hyperparameters are first chosen by
+successive halving over boosting rounds, with trials run in the same pool.
+
+With ``--external-memory`` the XGBoost models stream their data from Parquet
+chunks instead of loading it into a DataFrame.
 """
 
 from __future__ import annotations
@@ -12,20 +21,49 @@ from __future__ import annotations
 import os
 import sys
 import json
+import time
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Union
 
+import numpy as np
 import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
 
 # Add src directory to path for shared utilities
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
 
-from data_loader import DataLoader
-from train_dropout_model import train_dropout_model
-from train_burnout_model import train_burnout_model
-from train_career_model import train_career_model
-from train_difficulty_model import train_difficulty_model
+from data_loader import DataLoader, TrainingChunks
+from utils import available_cpus, cross_validate_oof, training_threads
+from train_dropout_model import (
+    SEARCH_SPACE as DROPOUT_SEARCH_SPACE,
+    build_dropout_model,
+    prepare_dropout_data,
+    train_dropout_model,
+)
+from train_burnout_model import (
+    SEARCH_SPACE as BURNOUT_SEARCH_SPACE,
+    build_burnout_model,
+    prepare_burnout_data,
+    train_burnout_model,
+)
+from train_career_model import (
+    SEARCH_SPACE as CAREER_SEARCH_SPACE,
+    build_career_model,
+    prepare_career_data,
+    train_career_model,
+)
+from train_difficulty_model import (
+    SEARCH_SPACE as DIFFICULTY_SEARCH_SPACE,
+    build_difficulty_model,
+    prepare_difficulty_data,
+    train_difficulty_model,
+)
 from train_sentiment_model import train_sentiment_model
 
 try:
@@ -38,6 +76,29 @@ try:
 except ImportError:  # pragma: no cover - best effort optional dependency
     APIError = Exception
 
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # pragma: no cover - ships with scikit-learn
+    threadpool_limits = None
+
+# Models trained at once; 1 trains them one after another in this process
+TRAINING_JOBS = int(os.getenv("TRAINING_JOBS", "1"))
+# Threads per job; 0 splits the available CPUs evenly between the jobs
+TRAINING_THREADS_PER_JOB = int(os.getenv("TRAINING_THREADS_PER_JOB", "0"))
+
+# --search: configurations sampled per model, halving rate, wall-clock budget per model
+SEARCH_TRIALS = int(os.getenv("TRAINING_SEARCH_TRIALS", "18"))
+SEARCH_ETA = int(os.getenv("TRAINING_SEARCH_ETA", "3"))
+SEARCH_BUDGET_SECONDS = float(os.getenv("TRAINING_SEARCH_BUDGET", "300"))
+SEARCH_FOLDS = 3
+SEARCH_EARLY_STOPPING_ROUNDS = 20
+
+# Datasets of the current run by model key. Forked workers inherit them
+# instead of receiving a pickled copy.
+_DATASETS: Dict[str, Union[pd.DataFrame, TrainingChunks]] = {}
+# Scaled (X, y) training split of the model being searched, shared the same way
+_SEARCH_DATA: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
 
 MODELS = [
     {
@@ -45,24 +106,55 @@ MODELS = [
         "label_type": "dropout",
         "train_fn": train_dropout_model,
         "min_samples": 50,
+        "external_memory": True,
+        "search": {
+            "prepare": prepare_dropout_data,
+            "build": build_dropout_model,
+            "space": DROPOUT_SEARCH_SPACE,
+            "scoring": "f1",
+            "max_rounds": 400,
+        },
     },
     {
         "key": "burnout",
         "label_type": "burnout",
         "train_fn": train_burnout_model,
         "min_samples": 50,
+        "external_memory": True,
+        "search": {
+            "prepare": prepare_burnout_data,
+            "build": build_burnout_model,
+            "space": BURNOUT_SEARCH_SPACE,
+            "scoring": "f1",
+            "max_rounds": 600,
+        },
     },
     {
         "key": "career",
         "label_type": "career_success",
         "train_fn": train_career_model,
         "min_samples": 50,
+        "search": {
+            "prepare": prepare_career_data,
+            "build": build_career_model,
+            "space": CAREER_SEARCH_SPACE,
+            "scoring": "f1_weighted",
+            "max_rounds": 600,
+        },
     },
     {
         "key": "difficulty",
         "label_type": "ark_difficulty",
         "train_fn": train_difficulty_model,
         "min_samples": 50,
+        "external_memory": True,
+        "search": {
+            "prepare": prepare_difficulty_data,
+            "build": build_difficulty_model,
+            "space": DIFFICULTY_SEARCH_SPACE,
+            "scoring": "rmse",
+            "max_rounds": 800,
+        },
     },
     {
         "key": "sentiment",
@@ -82,8 +174,11 @@ def build_reports_dir() -> Path:
 
 def save_summary(reports_dir: Path, model_key: str, summary: Dict[str, Any]) -> None:
     path = reports_dir / f"{model_key}_summary.json"
-    with path.open("w", encoding="utf-8") as fp:
+    # Write then rename, so a reader never sees a half-written summary
+    tmp = path.with_suffix(".json.tmp")
+    with tmp.open("w", encoding="utf-8") as fp:
         json.dump(summary, fp, indent=2, default=str)
+    os.replace(tmp, path)
 
 
 def register_model_version(metadata: Dict[str, Any]) -> Optional[str]:
@@ -127,89 +222,429 @@ def register_model_version(metadata: Dict[str, Any]) -> Optional[str]:
     return None
 
 
-def load_dataset(config: Dict[str, Any], loader: DataLoader):
+def load_dataset(config: Dict[str, Any], loader: DataLoader, refresh: bool = True):
     label_type = config["label_type"]
     if config.get("uses_raw_records"):
         records = loader.load_raw_training_records(label_type)
         if not records:
             return pd.DataFrame()
         return pd.DataFrame(records)
-    return loader.load_training_data(label_type)
-
-
-def run_pipeline(use_mlflow: bool = False) -> List[Dict[str, Any]]:
-    loader = DataLoader()
-    reports_dir = build_reports_dir()
-    results: List[Dict[str, Any]] = []
-
-    for cfg in MODELS:
-        key = cfg["key"]
-        print(f"\n=== Training {key.upper()} model ===")
-
-        df = load_dataset(cfg, loader)
-        sample_count = len(df)
-
-        summary: Dict[str, Any] = {
-            "model_type": key,
-            "label_type": cfg["label_type"],
-            "timestamp": datetime.utcnow().isoformat(),
-            "samples": sample_count,
-        }
-
-        if sample_count < cfg.get("min_samples", 1):
-            reason = (
-                f"Insufficient data: need at least {cfg['min_samples']} samples, found {sample_count}."
-            )
-            print(reason)
-            summary["status"] = "skipped"
-            summary["reason"] = reason
-            save_summary(reports_dir, key, summary)
-            results.append(summary)
-            continue
-
-        try:
-            train_fn = cfg["train_fn"]
-            if cfg.get("uses_raw_records"):
-                outcome = train_fn(use_mlflow=use_mlflow, dataframe=df)
+    return loader.load_training_data(label_type, refresh=refresh)
+
+
+def threads_per_job(jobs: int, threads: int = TRAINING_THREADS_PER_JOB) -> int:
+    return threads if threads > 0 else max(1, available_cpus() // max(jobs, 1))
+
+
+def _init_worker(threads: int) -> None:
+    # Trainers read this through utils.training_threads() for the model's n_jobs
+    os.environ["TRAINING_THREADS"] = str(threads)
+    for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    if threadpool_limits is not None:
+        # Runtimes loaded before the fork ignore the environment; cap them directly
+        threadpool_limits(limits=threads)
+
+
+def _process_pool(jobs: int, threads: int, tasks: int) -> Tuple[ProcessPoolExecutor, bool]:
+    """Pool of ``jobs`` workers capped at ``threads`` each; also says whether workers are forked."""
+    # fork shares module state with the workers copy-on-write; other start methods pickle task data
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    pool = ProcessPoolExecutor(
+        max_workers=min(jobs, max(tasks, 1)),
+        mp_context=multiprocessing.get_context("fork" if fork else None),
+        initializer=_init_worker,
+        initargs=(threads,),
+    )
+    return pool, fork
+
+
+def train_model(
+    key: str,
+    use_mlflow: bool,
+    df: Union[pd.DataFrame, TrainingChunks, None] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Train one model on its prepared dataset; returns the fields to add to its summary."""
+    cfg = next(cfg for cfg in MODELS if cfg["key"] == key)
+    if df is None:
+        df = _DATASETS[key]
+    data = {"chunks": df} if isinstance(df, TrainingChunks) else {"dataframe": df}
+    started = time.perf_counter()
+    try:
+        outcome = cfg["train_fn"](use_mlflow=use_mlflow, **data, **(params or {}))
+    except Exception as exc:  # noqa: BLE001
+        message = f"Training failed: {exc}"
+        print(message)
+        return {"status": "error", "reason": message, "training_seconds": round(time.perf_counter() - started, 3)}
+
+    result: Dict[str, Any] = {"training_seconds": round(time.perf_counter() - started, 3), "threads": training_threads()}
+    if not outcome:
+        result.update(status="skipped", reason="Training function returned no result")
+        return result
+
+    # The fitted model stays behind; trainers have already saved the artifact
+    _, metrics, metadata = outcome
+    result.update(status="trained", metrics=metrics, metadata=metadata)
+    return result
+
+
+def sample_configs(space: Dict[str, List[Any]], count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Up to ``count`` distinct configurations drawn from the grid ``space``."""
+    grid = list(itertools.product(*space.values()))
+    order = np.random.default_rng(seed).permutation(len(grid))[:count]
+    return [dict(zip(space, grid[index])) for index in order]
+
+
+def halving_schedule(configs: int, max_rounds: int, eta: int = SEARCH_ETA) -> List[Tuple[int, int]]:
+    """(configurations, boosting rounds) per rung; each rung keeps 1/eta of the configurations at eta times the rounds."""
+    rungs = 0
+    while configs // eta ** (rungs + 1) >= 1:
+        rungs += 1
+    return [
+        (max(1, configs // eta**rung), max(1, round(max_rounds / eta ** (rungs - rung))))
+        for rung in range(rungs + 1)
+    ]
+
+
+def run_trial(
+    key: str,
+    params: Dict[str, Any],
+    rounds: int,
+    deadline: float,
+    data: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Cross-validate one configuration with at most ``rounds`` boosting rounds; None once past ``deadline``."""
+    if time.time() >= deadline:
+        return None
+    search = next(cfg for cfg in MODELS if cfg["key"] == key)["search"]
+    X, y = data if data is not None else _SEARCH_DATA[key]
+    cv = cross_validate_oof(
+        search["build"](n_estimators=rounds, **params),
+        X,
+        y,
+        search["scoring"],
+        n_splits=SEARCH_FOLDS,
+        early_stopping_rounds=SEARCH_EARLY_STOPPING_ROUNDS,
+    )
+    return {
+        "score": cv["mean"],
+        "rounds": cv["n_estimators"] or rounds,
+        # Every fold stopped before the cap, so more rounds would give the same fits
+        "converged": all(
+            fold_rounds is not None and fold_rounds + SEARCH_EARLY_STOPPING_ROUNDS <= rounds
+            for fold_rounds in cv["fold_rounds"]
+        ),
+        "seconds": cv["seconds"],
+    }
+
+
+def search_model(
+    cfg: Dict[str, Any],
+    df: pd.DataFrame,
+    feature_cols: List[str],
+    jobs: int = TRAINING_JOBS,
+    threads: int = TRAINING_THREADS_PER_JOB,
+    trials: int = SEARCH_TRIALS,
+    budget: float = SEARCH_BUDGET_SECONDS,
+) -> Dict[str, Any]:
+    """
+    Successive-halving search over ``cfg["search"]["space"]``, with boosting rounds as the resource.
+
+    Every configuration is cross-validated with few rounds; the best 1/eta
+    go on to eta times the rounds, until the last rung runs ``max_rounds``.
+    Folds stop early on their own validation slice, and configurations that
+    converged below a rung's rounds keep their score instead of refitting.
+    Trials run in a pool of ``jobs`` processes and are not started once
+    ``budget`` seconds have passed. Only the trainer's training split is
+    searched, so its test rows stay unseen.
+    """
+    key = cfg["key"]
+    search = cfg["search"]
+    started = time.perf_counter()
+    X, y = search["prepare"](df, feature_cols)
+    classification = search["scoring"] != "rmse"
+    y = np.asarray(y)
+    if classification:
+        y = np.unique(y, return_inverse=True)[1]  # 0..k-1, as the trainers' encoders give
+        if len(np.unique(y)) < 2:
+            return {"status": "skipped", "reason": "Labels contain only one class"}
+
+    # The trainers' default split and scaling
+    X_train, _, y_train, _ = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y if classification else None
+    )
+    X_train = StandardScaler().fit_transform(X_train)
+
+    configs = sample_configs(search["space"], trials)
+    schedule = halving_schedule(len(configs), search["max_rounds"])
+    sign = 1.0 if classification else -1.0  # rmse: lower is better
+    deadline = time.time() + budget
+    results: Dict[int, Dict[str, Any]] = {}
+    # Latest results of the configurations that survived the last complete rung
+    standing: Dict[int, Dict[str, Any]] = {}
+    cost = [0.0] * len(configs)
+    rungs: List[Dict[str, Any]] = []
+    alive = list(range(len(configs)))
+    exhausted = False
+
+    print(
+        f"\n=== Searching {key.upper()}: {len(configs)} configurations, "
+        f"rungs {[rounds for _, rounds in schedule]} rounds, {budget:.0f}s budget ==="
+    )
+    _SEARCH_DATA[key] = (X_train, y_train)
+    pool, fork = _process_pool(jobs, threads_per_job(jobs, threads), len(configs)) if jobs > 1 else (None, True)
+    try:
+        for rung, (keep, rounds) in enumerate(schedule):
+            if rung:
+                alive = sorted(alive, key=lambda index: -sign * results[index]["score"])[:keep]
+            todo = [index for index in alive if not (index in results and results[index]["converged"])]
+            if pool is None:
+                outcomes = {index: run_trial(key, configs[index], rounds, deadline) for index in todo}
             else:
-                outcome = train_fn(use_mlflow=use_mlflow, dataframe=df)
-        except Exception as exc:  # noqa: BLE001
-            message = f"Training failed: {exc}"
-            print(message)
-            summary["status"] = "error"
-            summary["reason"] = message
-            save_summary(reports_dir, key, summary)
-            results.append(summary)
-            continue
-
-        if not outcome:
-            summary["status"] = "skipped"
-            summary["reason"] = "Training function returned no result"
-            save_summary(reports_dir, key, summary)
-            results.append(summary)
-            continue
-
-        model, metrics, metadata = outcome
-        summary["status"] = "trained"
-        summary["metrics"] = metrics
-        summary["metadata"] = metadata
-
-        registration_error = register_model_version(metadata)
+                data = None if fork else (X_train, y_train)
+                futures = {pool.submit(run_trial, key, configs[index], rounds, deadline, data): index for index in todo}
+                outcomes = {futures[future]: future.result() for future in as_completed(futures)}
+
+            finished = [index for index in todo if outcomes[index] is not None]
+            for index in finished:
+                results[index] = {**outcomes[index], "max_rounds": rounds}
+                cost[index] += outcomes[index]["seconds"]
+            rungs.append(
+                {
+                    "rounds": rounds,
+                    "configurations": len(alive),
+                    "fits": len(finished),
+                    "best_score": max(
+                        (results[index]["score"] for index in alive if index in finished or index not in todo),
+                        key=lambda score: sign * score,
+                        default=None,
+                    ),
+                }
+            )
+            if len(finished) < len(todo):
+                # Out of time: a partly run rung only counts if there is no complete one
+                exhausted = True
+                if not standing:
+                    standing = {index: results[index] for index in finished}
+                break
+            standing = {index: results[index] for index in alive}
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        _SEARCH_DATA.pop(key, None)
+
+    seconds = round(time.perf_counter() - started, 3)
+    if not standing:
+        return {"status": "budget_exhausted", "reason": "No trial finished within the budget", "seconds": seconds}
+
+    best = max(standing, key=lambda index: sign * standing[index]["score"])
+    summary = {
+        "status": "budget_exhausted" if exhausted else "completed",
+        "strategy": "successive_halving",
+        "scoring": search["scoring"],
+        "greater_is_better": classification,
+        "eta": SEARCH_ETA,
+        "folds": SEARCH_FOLDS,
+        "early_stopping_rounds": SEARCH_EARLY_STOPPING_ROUNDS,
+        "configurations": len(configs),
+        "rungs": rungs,
+        # n_estimators is the rung's cap; the trainer's early-stopped CV picks the final rounds
+        "best_params": {**configs[best], "n_estimators": standing[best]["max_rounds"]},
+        "best_score": standing[best]["score"],
+        "best_rounds": standing[best]["rounds"],
+        "best_cost_seconds": round(cost[best], 3),
+        "fits": sum(rung["fits"] for rung in rungs),
+        "fit_seconds": round(sum(cost), 3),
+        "budget_seconds": budget,
+        "seconds": seconds,
+    }
+    print(
+        f"Best {key} configuration: {summary['best_params']} "
+        f"({search['scoring']} {summary['best_score']:.4f}, {summary['fits']} fits in {seconds:.1f}s)"
+    )
+    return summary
+
+
+def _finish(reports_dir: Path, summary: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    summary.update(result)
+    if summary["status"] == "trained":
+        registration_error = register_model_version(summary["metadata"])
         if registration_error:
             summary["registration_status"] = registration_error
             print(registration_error)
         else:
             summary["registration_status"] = "registered"
             print("Model metadata registered in Supabase.")
+    save_summary(reports_dir, summary["model_type"], summary)
+    return summary
+
+
+def prepare_model(
+    cfg: Dict[str, Any],
+    loader: DataLoader,
+    reports_dir: Path,
+    refresh: bool = True,
+    external_memory: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """Load a model's dataset into ``_DATASETS``; returns its summary, already saved if it was skipped."""
+    key = cfg["key"]
+    print(f"\n=== Loading {key.upper()} data ===")
+
+    if external_memory and cfg.get("external_memory"):
+        # Only a Parquet file is prepared; the trainer streams it chunk by chunk
+        df = loader.training_chunks(cfg["label_type"], refresh=refresh)
+        sample_count = len(df) if df is not None else 0
+    else:
+        df = load_dataset(cfg, loader, refresh=refresh)
+        sample_count = len(df)
+    if isinstance(df, pd.DataFrame) and not cfg.get("uses_raw_records") and len(loader.features):
+        print(
+            f"Shared feature matrix: {len(loader.features)} vectors "
+            f"({loader.features.nbytes / 1e6:.1f} MB)"
+        )
 
+    summary: Dict[str, Any] = {
+        "model_type": key,
+        "label_type": cfg["label_type"],
+        "timestamp": datetime.utcnow().isoformat(),
+        "samples": sample_count,
+    }
+    if cfg["label_type"] in loader.snapshots:
+        # Reload with DataLoader().load_training_data(label_type, snapshot=...)
+        summary["snapshot_id"] = loader.snapshots[cfg["label_type"]]
+
+    if sample_count < cfg.get("min_samples", 1):
+        reason = (
+            f"Insufficient data: need at least {cfg['min_samples']} samples, found {sample_count}."
+        )
+        print(reason)
+        summary["status"] = "skipped"
+        summary["reason"] = reason
         save_summary(reports_dir, key, summary)
-        results.append(summary)
+        return summary
+
+    _DATASETS[key] = df
+    return summary
+
+
+def run_pipeline(
+    use_mlflow: bool = False,
+    use_cache: bool = True,
+    refresh: bool = True,
+    jobs: int = TRAINING_JOBS,
+    threads: int = TRAINING_THREADS_PER_JOB,
+    search: bool = False,
+    search_trials: int = SEARCH_TRIALS,
+    search_budget: float = SEARCH_BUDGET_SECONDS,
+    external_memory: bool = False,
+) -> List[Dict[str, Any]]:
+    # One loader for every model: its FeatureMatrix downloads each referenced feature vector once
+    loader = DataLoader(use_cache=use_cache)
+    reports_dir = build_reports_dir()
+    results: Dict[str, Dict[str, Any]] = {}
+    _DATASETS.clear()
+
+    def search_params(cfg: Dict[str, Any], summary: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not search or "search" not in cfg:
+            return None
+        if isinstance(_DATASETS[cfg["key"]], TrainingChunks):
+            print(f"Skipping the {cfg['key']} search: it needs the data in memory")
+            return None
+        feature_cols = loader.get_feature_names(cfg["label_type"])
+        summary["search"] = search_model(
+            cfg, _DATASETS[cfg["key"]], feature_cols, jobs, threads, search_trials, search_budget
+        )
+        return summary["search"].get("best_params")
+
+    if jobs <= 1:
+        if threads > 0:
+            _init_worker(threads)
+        for cfg in MODELS:
+            summary = prepare_model(cfg, loader, reports_dir, refresh, external_memory)
+            if cfg["key"] in _DATASETS:
+                params = search_params(cfg, summary)
+                print(f"\n=== Training {cfg['key'].upper()} model ===")
+                summary = _finish(reports_dir, summary, train_model(cfg["key"], use_mlflow, params=params))
+                del _DATASETS[cfg["key"]]
+            results[cfg["key"]] = summary
+        return [results[cfg["key"]] for cfg in MODELS]
+
+    # Load everything first (network I/O, shared feature matrix), then train in parallel
+    pending: Dict[str, Dict[str, Any]] = {}
+    for cfg in MODELS:
+        summary = prepare_model(cfg, loader, reports_dir, refresh, external_memory)
+        if cfg["key"] in _DATASETS:
+            pending[cfg["key"]] = summary
+        else:
+            results[cfg["key"]] = summary
+
+    # Searches run one model at a time, each spreading its trials over the pool
+    params: Dict[str, Optional[Dict[str, Any]]] = {}
+    for cfg in MODELS:
+        if cfg["key"] in pending:
+            params[cfg["key"]] = search_params(cfg, pending[cfg["key"]])
+
+    budget = threads_per_job(jobs, threads)
+    print(f"\n=== Training {len(pending)} models: {jobs} jobs x {budget} threads ===")
+    pool, fork = _process_pool(jobs, budget, len(pending))
+    with pool:
+        futures = {
+            pool.submit(train_model, key, use_mlflow, None if fork else _DATASETS[key], params[key]): key
+            for key in pending
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:  # noqa: BLE001 - e.g. a worker killed by the OOM killer
+                result = {"status": "error", "reason": f"Training failed: {exc}"}
+            summary = _finish(reports_dir, pending[key], result)
+            print(f"Finished {key}: {summary['status']} ({summary.get('training_seconds', '?')}s)")
+            results[key] = summary
 
-    return results
+    _DATASETS.clear()
+    return [results[cfg["key"]] for cfg in MODELS]
 
 
 if __name__ == "__main__":
-    final_results = run_pipeline()
+    parser = argparse.ArgumentParser(description="Train all models")
+    parser.add_argument("--mlflow", action="store_true", help="Log runs to MLflow")
+    parser.add_argument("--no-cache", action="store_true", help="Read training data straight from Supabase")
+    parser.add_argument("--offline", action="store_true", help="Train on the cached snapshots without refreshing")
+    parser.add_argument("--jobs", type=int, default=TRAINING_JOBS, help="Models to train in parallel processes")
+    parser.add_argument(
+        "--threads-per-job",
+        type=int,
+        default=TRAINING_THREADS_PER_JOB,
+        help="Threads each job may use (default: CPUs / jobs)",
+    )
+    parser.add_argument(
+        "--external-memory",
+        action="store_true",
+        help="Stream the XGBoost models' data from Parquet chunks instead of loading it",
+    )
+    parser.add_argument("--search", action="store_true", help="Tune boosted models by successive halving first")
+    parser.add_argument("--search-trials", type=int, default=SEARCH_TRIALS, help="Configurations sampled per model")
+    parser.add_argument(
+        "--search-budget",
+        type=float,
+        default=SEARCH_BUDGET_SECONDS,
+        help="Wall-clock seconds per model search",
+    )
+    args = parser.parse_args()
+
+    final_results = run_pipeline(
+        use_mlflow=args.mlflow,
+        use_cache=not args.no_cache,
+        refresh=not args.offline,
+        jobs=args.jobs,
+        threads=args.threads_per_job,
+        search=args.search,
+        search_trials=args.search_trials,
+        search_budget=args.search_budget,
+        external_memory=args.external_memory,
+    )
     print("\nPipeline complete. Summary:")
     for result in final_results:
         print(
@@ -6,25 +6,76 @@ Gradient Boosting classifier for predicting burnout risk
 import os
 import sys
 import argparse
-from typing import Optional
+from typing import Any, List, Optional, Sequence, Tuple
 import mlflow
 import mlflow.xgboost
 import pandas as pd
+import numpy as np
 from xgboost import XGBClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
 
-from data_loader import DataLoader
+from data_loader import DataLoader, TrainingChunks, schema_feature_names
+from external_memory import CV_SKIPPED, fit_out_of_core
 from utils import (
+    cross_validate_oof,
+    cv_metrics,
     evaluate_classification_model,
     save_model_metadata,
     ensure_dir,
-    extract_binary_label,
+    extract_binary_labels,
+    training_threads,
 )
 
+# Searched by run_pipeline.py --search; n_estimators is the halving resource
+SEARCH_SPACE = {
+    "max_depth": [3, 4, 5, 6],
+    "learning_rate": [0.02, 0.05, 0.1],
+    "subsample": [0.7, 0.9, 1.0],
+    "colsample_bytree": [0.6, 0.8, 1.0],
+}
+
+
+def burnout_labels(labels: Sequence[Any]) -> np.ndarray:
+    """0/1 burnout labels from raw label values"""
+    return extract_binary_labels(labels, positive_values=["high", "severe", "burnout", True, 1])
+
+
+def prepare_burnout_data(df: pd.DataFrame, feature_cols: List[str]) -> Tuple[pd.DataFrame, pd.Series]:
+    """Feature frame and 0/1 burnout labels"""
+    X = df[feature_cols].fillna(0)
+    y = pd.Series(burnout_labels(df["label"]), index=df.index)
+    return X, y
+
+
+def build_burnout_model(
+    n_estimators: int = 200,
+    max_depth: int = 5,
+    learning_rate: float = 0.05,
+    subsample: float = 0.9,
+    colsample_bytree: float = 0.8,
+    random_state: int = 42,
+    base_score: Optional[float] = None,
+) -> XGBClassifier:
+    """Unfitted burnout classifier; XGBoost estimates ``base_score`` when it is None"""
+    return XGBClassifier(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        learning_rate=learning_rate,
+        subsample=subsample,
+        colsample_bytree=colsample_bytree,
+        random_state=random_state,
+        eval_metric="logloss",
+        scale_pos_weight=1.0,
+        objective="binary:logistic",
+        base_score=base_score,
+        use_label_encoder=False,
+        n_jobs=training_threads(),
+    )
+
 
 def train_burnout_model(
     test_size: float = 0.2,
@@ -34,8 +85,11 @@ def train_burnout_model(
     learning_rate: float = 0.05,
     subsample: float = 0.9,
     colsample_bytree: float = 0.8,
+    early_stopping_rounds: int = 20,
     use_mlflow: bool = True,
     dataframe: Optional[pd.DataFrame] = None,
+    external_memory: bool = False,
+    chunks: Optional[TrainingChunks] = None,
 ):
     """Train burnout prediction model"""
 
@@ -43,82 +97,99 @@ def train_burnout_model(
         mlflow.set_experiment("burnout_prediction")
         mlflow.start_run()
 
-    loader = DataLoader()
-    df = dataframe if dataframe is not None else loader.load_training_data("burnout")
-
-    if df.empty:
-        print("No burnout training data available. Label outcomes first.")
-        if use_mlflow:
-            mlflow.end_run()
-        return
-
-    feature_cols = loader.get_feature_names("burnout")
-
-    if not feature_cols:
-        print("No numeric features available for burnout model.")
-        if use_mlflow:
-            mlflow.end_run()
-        return
-
-    X = df[feature_cols].fillna(0)
-    y = df["label"].apply(
-        lambda value: extract_binary_label(
-            value, positive_values=["high", "severe", "burnout", True, 1]
+    if external_memory or chunks is not None:
+        # Unscaled, like the dropout model's out-of-core path
+        chunks = chunks if chunks is not None else DataLoader().training_chunks("burnout")
+        if chunks is None:
+            print("No burnout training data available. Label outcomes first.")
+            if use_mlflow:
+                mlflow.end_run()
+            return
+        report = fit_out_of_core(
+            build_burnout_model(n_estimators, max_depth, learning_rate, subsample, colsample_bytree, random_state),
+            chunks,
+            burnout_labels,
+            test_size=test_size,
+            early_stopping_rounds=early_stopping_rounds,
+        )
+        model, scaler, feature_cols = report["model"], None, chunks.names
+        print(
+            f"Trained out of core on {report['rows']['train']} rows: "
+            f"{model.n_estimators} rounds in {report['seconds']:.1f}s"
+        )
+        y_test, y_pred_proba = report["y_test"], report["predictions"]
+        y_pred = (y_pred_proba >= 0.5).astype(np.int8)
+        metrics = evaluate_classification_model(y_test, y_pred, y_pred_proba)
+        metrics["cv"] = CV_SKIPPED  # the chunks are fitted once, so there are no cv_* metrics
+        training_count = len(chunks)
+    else:
+        df = dataframe if dataframe is not None else DataLoader().load_training_data("burnout")
+
+        if df.empty:
+            print("No burnout training data available. Label outcomes first.")
+            if use_mlflow:
+                mlflow.end_run()
+            return
+
+        feature_cols = schema_feature_names()
+
+        if not feature_cols:
+            print("No numeric features available for burnout model.")
+            if use_mlflow:
+                mlflow.end_run()
+            return
+
+        X, y = prepare_burnout_data(df, feature_cols)
+
+        if y.nunique() < 2:
+            print("Training skipped: burnout labels contain only one class.")
+            if use_mlflow:
+                mlflow.end_run()
+            return
+
+        scaler = StandardScaler()
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=test_size, random_state=random_state, stratify=y
         )
-    )
-
-    if y.nunique() < 2:
-        print("Training skipped: burnout labels contain only one class.")
-        if use_mlflow:
-            mlflow.end_run()
-        return
 
-    scaler = StandardScaler()
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=test_size, random_state=random_state, stratify=y
-    )
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
 
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+        positive_rate = float(y.mean())
+        base_score = min(max(positive_rate if 0 < positive_rate < 1 else 0.5, 1e-6), 1 - 1e-6)
 
-    positive_rate = float(y.mean())
-    base_score = min(max(positive_rate if 0 < positive_rate < 1 else 0.5, 1e-6), 1 - 1e-6)
+        model = build_burnout_model(
+            n_estimators, max_depth, learning_rate, subsample, colsample_bytree, random_state, base_score
+        )
 
-    model = XGBClassifier(
-        n_estimators=n_estimators,
-        max_depth=max_depth,
-        learning_rate=learning_rate,
-        subsample=subsample,
-        colsample_bytree=colsample_bytree,
-        random_state=random_state,
-        eval_metric="logloss",
-        scale_pos_weight=1.0,
-        objective="binary:logistic",
-        base_score=base_score,
-        use_label_encoder=False,
-    )
+        # Cross-validation first: its early-stopped folds decide how many rounds the final fit needs
+        cv = cross_validate_oof(
+            model, scaler.transform(X), y, scoring="f1",
+            random_state=random_state, early_stopping_rounds=early_stopping_rounds,
+        )
+        print(
+            f"Cross-validation F1: {cv['mean']:.4f} (+/- {cv['std'] * 2:.4f}), "
+            f"OOF Brier: {cv['calibration']['brier']:.4f}"
+        )
+        if cv["n_estimators"]:
+            model.set_params(n_estimators=cv["n_estimators"])
 
-    model.fit(X_train_scaled, y_train)
+        model.fit(X_train_scaled, y_train)
 
-    y_pred = model.predict(X_test_scaled)
-    y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
+        y_pred = model.predict(X_test_scaled)
+        y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
 
-    metrics = evaluate_classification_model(y_test, y_pred, y_pred_proba)
+        metrics = evaluate_classification_model(y_test, y_pred, y_pred_proba)
+        metrics.update(cv_metrics(cv))
+        training_count = len(df)
 
     print("\nBurnout Model Performance:")
     for key, value in metrics.items():
-        if key == "confusion_matrix":
+        if isinstance(value, (list, str)):
             print(f"{key}: {value}")
         else:
             print(f"{key}: {value:.4f}")
 
-    cv_scores = cross_val_score(
-        model, scaler.transform(X), y, cv=5, scoring="f1", n_jobs=-1
-    )
-    print(
-        f"Cross-validation F1: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})"
-    )
-
     ensure_dir("../data/models")
     model_path = "../data/models/burnout_model_v1.pkl"
 
@@ -136,7 +207,8 @@ def train_burnout_model(
     if use_mlflow:
         mlflow.log_params(
             {
-                "n_estimators": n_estimators,
+                "n_estimators": model.n_estimators,
+                "early_stopping_rounds": early_stopping_rounds,
                 "max_depth": max_depth,
                 "learning_rate": learning_rate,
                 "subsample": subsample,
@@ -155,14 +227,15 @@ def train_burnout_model(
         model_type="burnout",
         metrics=metrics,
         hyperparameters={
-            "n_estimators": n_estimators,
+            "n_estimators": model.n_estimators,
+            "early_stopping_rounds": early_stopping_rounds,
             "max_depth": max_depth,
             "learning_rate": learning_rate,
             "subsample": subsample,
             "colsample_bytree": colsample_bytree,
         },
         model_path=model_path,
-        training_data_count=len(df),
+        training_data_count=training_count,
     )
 
     print("\nTraining complete. Metadata:")
@@ -179,7 +252,9 @@ if __name__ == "__main__":
     parser.add_argument("--learning-rate", type=float, default=0.05)
     parser.add_argument("--subsample", type=float, default=0.9)
     parser.add_argument("--colsample-bytree", type=float, default=0.8)
+    parser.add_argument("--early-stopping-rounds", type=int, default=20)
     parser.add_argument("--no-mlflow", action="store_true")
+    parser.add_argument("--external-memory", action="store_true", help="Stream training data instead of loading it")
 
     args = parser.parse_args()
 
@@ -191,6 +266,8 @@ if __name__ == "__main__":
         learning_rate=args.learning_rate,
         subsample=args.subsample,
         colsample_bytree=args.colsample_bytree,
+        early_stopping_rounds=args.early_stopping_rounds,
         use_mlflow=not args.no_mlflow,
+        external_memory=args.external_memory,
     )
 
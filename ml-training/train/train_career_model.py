@@ -7,24 +7,58 @@ import os
 import sys
 import argparse
 import json
-from typing import Optional
+from typing import List, Optional, Tuple
 import mlflow
 import mlflow.lightgbm
 import pandas as pd
 from lightgbm import LGBMClassifier
-from sklearn.model_selection import train_test_split, StratifiedKFold, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
 
 from data_loader import DataLoader
 from utils import (
+    cross_validate_oof,
+    cv_metrics,
     evaluate_classification_model,
     save_model_metadata,
     ensure_dir,
-    parse_label_value,
+    parse_label_values,
+    training_threads,
 )
 
+# Searched by run_pipeline.py --search; n_estimators is the halving resource
+SEARCH_SPACE = {
+    "learning_rate": [0.02, 0.05, 0.1],
+    "num_leaves": [7, 15, 31, 63],
+}
+
+
+def prepare_career_data(df: pd.DataFrame, feature_cols: List[str]) -> Tuple[pd.DataFrame, pd.Series]:
+    """Feature frame and career buckets, dropping rows without a usable label"""
+    labels = pd.Series(parse_label_values(df["label"]), index=df.index)
+    valid = labels.notna()
+    return df.loc[valid, feature_cols].fillna(0), labels[valid]
+
+
+def build_career_model(
+    n_estimators: int = 300,
+    learning_rate: float = 0.05,
+    num_leaves: int = 31,
+    random_state: int = 42,
+) -> LGBMClassifier:
+    """Unfitted career classifier"""
+    return LGBMClassifier(
+        n_estimators=n_estimators,
+        learning_rate=learning_rate,
+        num_leaves=num_leaves,
+        random_state=random_state,
+        objective="multiclass",
+        class_weight="balanced",
+        n_jobs=training_threads(),
+    )
+
 
 def train_career_model(
     test_size: float = 0.2,
@@ -32,6 +66,7 @@ def train_career_model(
     n_estimators: int = 300,
     learning_rate: float = 0.05,
     num_leaves: int = 31,
+    early_stopping_rounds: int = 30,
     use_mlflow: bool = True,
     dataframe: Optional[pd.DataFrame] = None,
 ):
@@ -57,18 +92,16 @@ def train_career_model(
             mlflow.end_run()
         return
 
-    df["label_value"] = df["label"].apply(parse_label_value)
-    df = df.dropna(subset=["label_value"])
+    X, labels = prepare_career_data(df, feature_cols)
 
-    if df.empty:
+    if X.empty:
         print("No valid labels found for career dataset.")
         if use_mlflow:
             mlflow.end_run()
         return
 
     encoder = LabelEncoder()
-    y = encoder.fit_transform(df["label_value"])
-    X = df[feature_cols].fillna(0)
+    y = encoder.fit_transform(labels)
 
     scaler = StandardScaler()
     X_train, X_test, y_train, y_test = train_test_split(
@@ -78,14 +111,16 @@ def train_career_model(
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
 
-    model = LGBMClassifier(
-        n_estimators=n_estimators,
-        learning_rate=learning_rate,
-        num_leaves=num_leaves,
-        random_state=random_state,
-        objective="multiclass",
-        class_weight="balanced",
+    model = build_career_model(n_estimators, learning_rate, num_leaves, random_state)
+
+    # Cross-validation first: its early-stopped folds decide how many rounds the final fit needs
+    cv = cross_validate_oof(
+        model, scaler.transform(X), y, scoring="f1_weighted",
+        random_state=random_state, early_stopping_rounds=early_stopping_rounds,
     )
+    print(f"Cross-validation F1 (weighted): {cv['mean']:.4f} (+/- {cv['std'] * 2:.4f})")
+    if cv["n_estimators"]:
+        model.set_params(n_estimators=cv["n_estimators"])
 
     model.fit(X_train_scaled, y_train)
 
@@ -94,6 +129,7 @@ def train_career_model(
 
     metrics = evaluate_classification_model(y_test, y_pred)
     metrics["num_classes"] = len(encoder.classes_)
+    metrics.update(cv_metrics(cv))
 
     print("\nCareer Model Performance:")
     for key, value in metrics.items():
@@ -102,13 +138,6 @@ def train_career_model(
         else:
             print(f"{key}: {value}")
 
-    X_scaled = scaler.transform(X)
-    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=random_state)
-    cv_scores = cross_val_score(model, X_scaled, y, cv=cv, scoring="f1_weighted")
-    print(
-        f"Cross-validation F1 (weighted): {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})"
-    )
-
     ensure_dir("../data/models")
     model_path = "../data/models/career_model_v1.pkl"
     encoder_path = "../data/models/career_label_encoder.json"
@@ -131,7 +160,8 @@ def train_career_model(
     if use_mlflow:
         mlflow.log_params(
             {
-                "n_estimators": n_estimators,
+                "n_estimators": model.n_estimators,
+                "early_stopping_rounds": early_stopping_rounds,
                 "learning_rate": learning_rate,
                 "num_leaves": num_leaves,
                 "test_size": test_size,
@@ -151,12 +181,13 @@ def train_career_model(
         model_type="career",
         metrics=metrics,
         hyperparameters={
-            "n_estimators": n_estimators,
+            "n_estimators": model.n_estimators,
+            "early_stopping_rounds": early_stopping_rounds,
             "learning_rate": learning_rate,
             "num_leaves": num_leaves,
         },
         model_path=model_path,
-        training_data_count=len(df),
+        training_data_count=len(X),
     )
 
     print("\nTraining complete. Metadata:")
@@ -171,6 +202,7 @@ if __name__ == "__main__":
     parser.add_argument("--n-estimators", type=int, default=300)
     parser.add_argument("--learning-rate", type=float, default=0.05)
     parser.add_argument("--num-leaves", type=int, default=31)
+    parser.add_argument("--early-stopping-rounds", type=int, default=30)
     parser.add_argument("--no-mlflow", action="store_true")
 
     args = parser.parse_args()
@@ -181,6 +213,7 @@ if __name__ == "__main__":
         n_estimators=args.n_estimators,
         learning_rate=args.learning_rate,
         num_leaves=args.num_leaves,
+        early_stopping_rounds=args.early_stopping_rounds,
         use_mlflow=not args.no_mlflow,
     )
 
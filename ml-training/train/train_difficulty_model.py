@@ -6,24 +6,66 @@ Gradient boosting regressor to predict optimal ARK difficulty level
 import os
 import sys
 import argparse
-from typing import Optional
+from typing import Any, List, Optional, Sequence, Tuple
 import mlflow
 import mlflow.xgboost
 import pandas as pd
+import numpy as np
 from xgboost import XGBRegressor
-from sklearn.model_selection import train_test_split, KFold, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
 
-from data_loader import DataLoader
+from data_loader import DataLoader, TrainingChunks, schema_feature_names
+from external_memory import CV_SKIPPED, fit_out_of_core
 from utils import (
+    cross_validate_oof,
+    cv_metrics,
     evaluate_regression_model,
     save_model_metadata,
     ensure_dir,
-    extract_regression_target,
+    extract_regression_targets,
+    training_threads,
 )
 
+# Searched by run_pipeline.py --search; n_estimators is the halving resource
+SEARCH_SPACE = {
+    "max_depth": [3, 4, 6, 8],
+    "learning_rate": [0.02, 0.05, 0.1, 0.2],
+}
+
+
+def difficulty_targets(labels: Sequence[Any]) -> np.ndarray:
+    """Difficulty scores from raw label values"""
+    return extract_regression_targets(labels, key="difficulty_score", default=2.5)
+
+
+def prepare_difficulty_data(df: pd.DataFrame, feature_cols: List[str]) -> Tuple[pd.DataFrame, pd.Series]:
+    """Feature frame and difficulty scores"""
+    X = df[feature_cols].fillna(0)
+    y = pd.Series(difficulty_targets(df["label"]), index=df.index)
+    return X, y
+
+
+def build_difficulty_model(
+    n_estimators: int = 400,
+    max_depth: int = 6,
+    learning_rate: float = 0.05,
+    random_state: int = 42,
+) -> XGBRegressor:
+    """Unfitted difficulty regressor"""
+    return XGBRegressor(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        learning_rate=learning_rate,
+        subsample=0.9,
+        colsample_bytree=0.8,
+        random_state=random_state,
+        objective="reg:squarederror",
+        n_jobs=training_threads(),
+    )
+
 
 def train_difficulty_model(
     test_size: float = 0.2,
@@ -31,8 +73,11 @@ def train_difficulty_model(
     n_estimators: int = 400,
     max_depth: int = 6,
     learning_rate: float = 0.05,
+    early_stopping_rounds: int = 30,
     use_mlflow: bool = True,
     dataframe: Optional[pd.DataFrame] = None,
+    external_memory: bool = False,
+    chunks: Optional[TrainingChunks] = None,
 ):
     """Train ARK difficulty prediction model"""
 
@@ -40,64 +85,81 @@ def train_difficulty_model(
         mlflow.set_experiment("ark_difficulty_prediction")
         mlflow.start_run()
 
-    loader = DataLoader()
-    df = dataframe if dataframe is not None else loader.load_training_data("ark_difficulty")
-
-    if df.empty:
-        print("No difficulty training data available. Label ARK difficulty outcomes first.")
-        if use_mlflow:
-            mlflow.end_run()
-        return
-
-    feature_cols = loader.get_feature_names("ark_difficulty")
-    if not feature_cols:
-        print("No features found for difficulty dataset.")
-        if use_mlflow:
-            mlflow.end_run()
-        return
-
-    X = df[feature_cols].fillna(0)
-    y = df["label"].apply(
-        lambda value: extract_regression_target(
-            value, key="difficulty_score", default=2.5
+    if external_memory or chunks is not None:
+        # Unscaled, like the dropout model's out-of-core path
+        chunks = chunks if chunks is not None else DataLoader().training_chunks("ark_difficulty")
+        if chunks is None:
+            print("No difficulty training data available. Label ARK difficulty outcomes first.")
+            if use_mlflow:
+                mlflow.end_run()
+            return
+        report = fit_out_of_core(
+            build_difficulty_model(n_estimators, max_depth, learning_rate, random_state),
+            chunks,
+            difficulty_targets,
+            test_size=test_size,
+            early_stopping_rounds=early_stopping_rounds,
+        )
+        model, scaler, feature_cols = report["model"], None, chunks.names
+        print(
+            f"Trained out of core on {report['rows']['train']} rows: "
+            f"{model.n_estimators} rounds in {report['seconds']:.1f}s"
+        )
+        y_test, y_pred = report["y_test"], report["predictions"]
+        metrics = evaluate_regression_model(y_test, y_pred)
+        metrics["cv"] = CV_SKIPPED  # the chunks are fitted once, so there are no cv_* metrics
+        training_count = len(chunks)
+    else:
+        df = dataframe if dataframe is not None else DataLoader().load_training_data("ark_difficulty")
+
+        if df.empty:
+            print("No difficulty training data available. Label ARK difficulty outcomes first.")
+            if use_mlflow:
+                mlflow.end_run()
+            return
+
+        feature_cols = schema_feature_names()
+        if not feature_cols:
+            print("No features found for difficulty dataset.")
+            if use_mlflow:
+                mlflow.end_run()
+            return
+
+        X, y = prepare_difficulty_data(df, feature_cols)
+
+        scaler = StandardScaler()
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=test_size, random_state=random_state
         )
-    )
 
-    scaler = StandardScaler()
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=test_size, random_state=random_state
-    )
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
 
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+        model = build_difficulty_model(n_estimators, max_depth, learning_rate, random_state)
 
-    model = XGBRegressor(
-        n_estimators=n_estimators,
-        max_depth=max_depth,
-        learning_rate=learning_rate,
-        subsample=0.9,
-        colsample_bytree=0.8,
-        random_state=random_state,
-        objective="reg:squarederror",
-    )
+        # Cross-validation first: its early-stopped folds decide how many rounds the final fit needs
+        cv = cross_validate_oof(
+            model, scaler.transform(X), y, scoring="rmse",
+            random_state=random_state, early_stopping_rounds=early_stopping_rounds,
+        )
+        print(f"Cross-validation RMSE: {cv['mean']:.4f} (+/- {cv['std'] * 2:.4f})")
+        if cv["n_estimators"]:
+            model.set_params(n_estimators=cv["n_estimators"])
 
-    model.fit(X_train_scaled, y_train)
+        model.fit(X_train_scaled, y_train)
 
-    y_pred = model.predict(X_test_scaled)
+        y_pred = model.predict(X_test_scaled)
 
-    metrics = evaluate_regression_model(y_test, y_pred)
+        metrics = evaluate_regression_model(y_test, y_pred)
+        metrics.update(cv_metrics(cv))
+        training_count = len(df)
 
     print("\nDifficulty Model Performance:")
     for key, value in metrics.items():
-        print(f"{key}: {value:.4f}")
-
-    X_scaled = scaler.transform(X)
-    cv = KFold(n_splits=5, shuffle=True, random_state=random_state)
-    cv_scores = cross_val_score(
-        model, X_scaled, y, cv=cv, scoring="neg_mean_squared_error"
-    )
-    rmse = ((-cv_scores).mean()) ** 0.5
-    print(f"Cross-validation RMSE: {rmse:.4f}")
+        if isinstance(value, str):
+            print(f"{key}: {value}")
+        else:
+            print(f"{key}: {value:.4f}")
 
     ensure_dir("../data/models")
     model_path = "../data/models/difficulty_model_v1.pkl"
@@ -116,14 +178,14 @@ def train_difficulty_model(
     if use_mlflow:
         mlflow.log_params(
             {
-                "n_estimators": n_estimators,
+                "n_estimators": model.n_estimators,
+                "early_stopping_rounds": early_stopping_rounds,
                 "max_depth": max_depth,
                 "learning_rate": learning_rate,
                 "test_size": test_size,
             }
         )
         mlflow.log_metrics(metrics)
-        mlflow.log_metric("cv_rmse", rmse)
         mlflow.log_artifact(model_path)
         mlflow.xgboost.log_model(model, "model")
         mlflow.end_run()
@@ -134,12 +196,13 @@ def train_difficulty_model(
         model_type="difficulty",
         metrics=metrics,
         hyperparameters={
-            "n_estimators": n_estimators,
+            "n_estimators": model.n_estimators,
+            "early_stopping_rounds": early_stopping_rounds,
             "max_depth": max_depth,
             "learning_rate": learning_rate,
         },
         model_path=model_path,
-        training_data_count=len(df),
+        training_data_count=training_count,
     )
 
     print("\nTraining complete. Metadata:")
@@ -156,7 +219,9 @@ if __name__ == "__main__":
     parser.add_argument("--n-estimators", type=int, default=400)
     parser.add_argument("--max-depth", type=int, default=6)
     parser.add_argument("--learning-rate", type=float, default=0.05)
+    parser.add_argument("--early-stopping-rounds", type=int, default=30)
     parser.add_argument("--no-mlflow", action="store_true")
+    parser.add_argument("--external-memory", action="store_true", help="Stream training data instead of loading it")
 
     args = parser.parse_args()
 
@@ -166,6 +231,8 @@ if __name__ == "__main__":
         n_estimators=args.n_estimators,
         max_depth=args.max_depth,
         learning_rate=args.learning_rate,
+        early_stopping_rounds=args.early_stopping_rounds,
         use_mlflow=not args.no_mlflow,
+        external_memory=args.external_memory,
     )
 
@@ -6,21 +6,70 @@ XGBoost classifier for predicting student dropout risk
 import os
 import sys
 import argparse
-from typing import Optional
+from typing import Any, List, Optional, Sequence, Tuple
 import mlflow
 import mlflow.xgboost
 import pandas as pd
 import numpy as np
 from xgboost import XGBClassifier
-from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, confusion_matrix
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from data_loader import DataLoader
-from utils import evaluate_classification_model, save_model_metadata, ensure_dir
+from data_loader import DataLoader, TrainingChunks, schema_feature_names
+from external_memory import CV_SKIPPED, fit_out_of_core
+from utils import (
+    cross_validate_oof,
+    cv_metrics,
+    evaluate_classification_model,
+    save_model_metadata,
+    ensure_dir,
+    extract_label_field,
+    training_threads,
+)
+
+# Searched by run_pipeline.py --search; n_estimators is the halving resource
+SEARCH_SPACE = {
+    "max_depth": [3, 4, 6, 8],
+    "learning_rate": [0.03, 0.05, 0.1, 0.2],
+}
+
+
+def dropout_labels(labels: Sequence[Any]) -> np.ndarray:
+    """0/1 dropout labels from raw label values"""
+    return (extract_label_field(labels, "outcome_type") == "dropout").astype(np.int8)
+
+
+def prepare_dropout_data(df: pd.DataFrame, feature_cols: List[str]) -> Tuple[pd.DataFrame, pd.Series]:
+    """Feature frame and 0/1 dropout labels"""
+    X = df[feature_cols].fillna(0)
+    y = pd.Series(dropout_labels(df["label"]), index=df.index)
+    return X, y
+
+
+def build_dropout_model(
+    n_estimators: int = 100,
+    max_depth: int = 6,
+    learning_rate: float = 0.1,
+    random_state: int = 42,
+    base_score: Optional[float] = None,
+) -> XGBClassifier:
+    """Unfitted dropout classifier; XGBoost estimates ``base_score`` when it is None"""
+    return XGBClassifier(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        learning_rate=learning_rate,
+        random_state=random_state,
+        eval_metric="logloss",
+        objective="binary:logistic",
+        base_score=base_score,
+        use_label_encoder=False,
+        n_jobs=training_threads(),
+    )
+
 
 def train_dropout_model(
     test_size: float = 0.2,
@@ -28,8 +77,11 @@ def train_dropout_model(
     n_estimators: int = 100,
     max_depth: int = 6,
     learning_rate: float = 0.1,
+    early_stopping_rounds: int = 20,
     use_mlflow: bool = True,
     dataframe: Optional[pd.DataFrame] = None,
+    external_memory: bool = False,
+    chunks: Optional[TrainingChunks] = None,
 ):
     """
     Train dropout risk prediction model
@@ -40,7 +92,11 @@ def train_dropout_model(
         n_estimators: Number of boosting rounds
         max_depth: Maximum tree depth
         learning_rate: Learning rate
+        early_stopping_rounds: Rounds without improvement before a CV fold stops (0 disables)
         use_mlflow: Whether to log to MLflow
+        dataframe: Training data already loaded by the caller
+        external_memory: Stream the data from Parquet chunks instead of loading a DataFrame
+        chunks: Chunks to stream (implies external_memory); fetched by the loader when omitted
     """
     
     # Initialize MLflow
@@ -50,59 +106,87 @@ def train_dropout_model(
     
     # Load data
     print("Loading training data...")
-    loader = DataLoader()
-    df = dataframe if dataframe is not None else loader.load_training_data("dropout")
+    if external_memory or chunks is not None:
+        # Chunks stream from Parquet into XGBoost's on-disk page cache: no DataFrame, no scaled copies.
+        # Trees do not need scaling, so the artifact's scaler is None (serving then uses raw features).
+        chunks = chunks if chunks is not None else DataLoader().training_chunks("dropout")
+        if chunks is None:
+            print("No training data available. Please label some student outcomes first.")
+            if use_mlflow:
+                mlflow.end_run()
+            return
+        report = fit_out_of_core(
+            build_dropout_model(n_estimators, max_depth, learning_rate, random_state),
+            chunks,
+            dropout_labels,
+            test_size=test_size,
+            early_stopping_rounds=early_stopping_rounds,
+        )
+        model, scaler, feature_cols = report["model"], None, chunks.names
+        print(
+            f"Trained out of core on {report['rows']['train']} rows: "
+            f"{model.n_estimators} rounds in {report['seconds']:.1f}s"
+        )
+        y_test, y_pred_proba = report["y_test"], report["predictions"]
+        y_pred = (y_pred_proba >= 0.5).astype(np.int8)
+        metrics = evaluate_classification_model(y_test, y_pred, y_pred_proba)
+        metrics["cv"] = CV_SKIPPED  # the chunks are fitted once, so there are no cv_* metrics
+        training_count = len(chunks)
+    else:
+        df = dataframe if dataframe is not None else DataLoader().load_training_data("dropout")
     
-    if df.empty:
-        print("No training data available. Please label some student outcomes first.")
-        return
+        if df.empty:
+            print("No training data available. Please label some student outcomes first.")
+            return
     
-    print(f"Loaded {len(df)} training examples")
+        print(f"Loaded {len(df)} training examples")
     
-    # Prepare features and labels
-    feature_cols = loader.get_feature_names("dropout")
-    X = df[feature_cols].fillna(0)
-    y = df["label"].apply(lambda x: 1 if x.get("outcome_type") == "dropout" else 0)
+        # Prepare features and labels
+        feature_cols = schema_feature_names()
+        X, y = prepare_dropout_data(df, feature_cols)
 
-    if y.nunique() < 2:
-        print("Training skipped: dropout labels contain only one class.")
-        if use_mlflow:
-            mlflow.end_run()
-        return
+        if y.nunique() < 2:
+            print("Training skipped: dropout labels contain only one class.")
+            if use_mlflow:
+                mlflow.end_run()
+            return
     
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=test_size, random_state=random_state, stratify=y
-    )
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=test_size, random_state=random_state, stratify=y
+        )
     
-    # Scale features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+        # Scale features
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
     
-    # Train model
-    print("Training model...")
-    positive_rate = float(y.mean())
-    base_score = min(max(positive_rate if 0 < positive_rate < 1 else 0.5, 1e-6), 1 - 1e-6)
+        positive_rate = float(y.mean())
+        base_score = min(max(positive_rate if 0 < positive_rate < 1 else 0.5, 1e-6), 1 - 1e-6)
 
-    model = XGBClassifier(
-        n_estimators=n_estimators,
-        max_depth=max_depth,
-        learning_rate=learning_rate,
-        random_state=random_state,
-        eval_metric="logloss",
-        objective="binary:logistic",
-        base_score=base_score,
-        use_label_encoder=False,
-    )
-    
-    model.fit(X_train_scaled, y_train)
+        model = build_dropout_model(n_estimators, max_depth, learning_rate, random_state, base_score)
+
+        # Cross-validation first: its early-stopped folds decide how many rounds the final fit needs
+        print("\nPerforming cross-validation...")
+        cv = cross_validate_oof(
+            model, X_train_scaled, y_train, scoring="f1",
+            random_state=random_state, early_stopping_rounds=early_stopping_rounds,
+        )
+        print(f"CV F1 Score: {cv['mean']:.4f} (+/- {cv['std'] * 2:.4f}), OOF Brier: {cv['calibration']['brier']:.4f}")
+        if cv["n_estimators"]:
+            model.set_params(n_estimators=cv["n_estimators"])
+
+        # Train model
+        print(f"Training model ({model.n_estimators} rounds)...")
+        model.fit(X_train_scaled, y_train)
     
-    # Evaluate
-    y_pred = model.predict(X_test_scaled)
-    y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
+        # Evaluate
+        y_pred = model.predict(X_test_scaled)
+        y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
     
-    metrics = evaluate_classification_model(y_test, y_pred, y_pred_proba)
+        metrics = evaluate_classification_model(y_test, y_pred, y_pred_proba)
+        metrics.update(cv_metrics(cv))
+        training_count = len(df)
     
     print("\nModel Performance:")
     print(f"Accuracy: {metrics['accuracy']:.4f}")
@@ -112,13 +196,6 @@ def train_dropout_model(
     if 'roc_auc' in metrics:
         print(f"ROC AUC: {metrics['roc_auc']:.4f}")
     
-    # Cross-validation
-    print("\nPerforming cross-validation...")
-    cv_scores = cross_val_score(
-        model, X_train_scaled, y_train, cv=5, scoring='f1'
-    )
-    print(f"CV F1 Score: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
-    
     # Save model
     ensure_dir("../data/models")
     model_path = f"../data/models/dropout_model_v1.pkl"
@@ -135,7 +212,8 @@ def train_dropout_model(
     # Log to MLflow
     if use_mlflow:
         mlflow.log_params({
-            'n_estimators': n_estimators,
+            'n_estimators': model.n_estimators,
+            'early_stopping_rounds': early_stopping_rounds,
             'max_depth': max_depth,
             'learning_rate': learning_rate,
             'test_size': test_size,
@@ -155,12 +233,13 @@ def train_dropout_model(
         model_type="dropout",
         metrics=metrics,
         hyperparameters={
-            'n_estimators': n_estimators,
+            'n_estimators': model.n_estimators,
+            'early_stopping_rounds': early_stopping_rounds,
             'max_depth': max_depth,
             'learning_rate': learning_rate
         },
         model_path=model_path,
-        training_data_count=len(df)
+        training_data_count=training_count
     )
     
     print("\nTraining completed successfully!")
@@ -173,7 +252,9 @@ if __name__ == "__main__":
     parser.add_argument("--n-estimators", type=int, default=100)
     parser.add_argument("--max-depth", type=int, default=6)
     parser.add_argument("--learning-rate", type=float, default=0.1)
+    parser.add_argument("--early-stopping-rounds", type=int, default=20)
     parser.add_argument("--no-mlflow", action="store_true")
+    parser.add_argument("--external-memory", action="store_true", help="Stream training data instead of loading it")
     
     args = parser.parse_args()
     
@@ -183,7 +264,9 @@ if __name__ == "__main__":
         n_estimators=args.n_estimators,
         max_depth=args.max_depth,
         learning_rate=args.learning_rate,
-        use_mlflow=not args.no_mlflow
+        early_stopping_rounds=args.early_stopping_rounds,
+        use_mlflow=not args.no_mlflow,
+        external_memory=args.external_memory,
     )
 
 
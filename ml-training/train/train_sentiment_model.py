@@ -10,7 +10,7 @@ import json
 from typing import Optional
 import mlflow
 import pandas as pd
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
@@ -19,10 +19,12 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
 
 from data_loader import DataLoader
 from utils import (
+    cross_validate_oof,
+    cv_metrics,
     evaluate_classification_model,
     save_model_metadata,
     ensure_dir,
-    parse_label_value,
+    parse_label_values,
 )
 
 
@@ -82,7 +84,7 @@ def train_sentiment_model(
         return
 
     df = pd.DataFrame(dataset)
-    df["label"] = df["label"].apply(parse_label_value)
+    df["label"] = parse_label_values(df["label"])
 
     X_train, X_test, y_train, y_test = train_test_split(
         df["text"], df["label"], test_size=test_size, random_state=random_state, stratify=df["label"]
@@ -116,6 +118,12 @@ def train_sentiment_model(
 
     metrics = evaluate_classification_model(y_test, y_pred, y_pred_proba)
     metrics["num_classes"] = df["label"].nunique()
+    # TF-IDF is refitted inside each fold (cached per fold), so no vocabulary leaks into the scores
+    cv = cross_validate_oof(
+        pipeline["clf"], df["text"], df["label"], scoring="f1_weighted",
+        random_state=random_state, preprocessor=pipeline["tfidf"], early_stopping_rounds=None,
+    )
+    metrics.update(cv_metrics(cv))
 
     print("\nSentiment Model Performance:")
     for key, value in metrics.items():
@@ -124,10 +132,7 @@ def train_sentiment_model(
         else:
             print(f"{key}: {value}")
 
-    cv_scores = cross_val_score(pipeline, df["text"], df["label"], cv=5, scoring="f1_weighted")
-    print(
-        f"Cross-validation F1 (weighted): {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})"
-    )
+    print(f"Cross-validation F1 (weighted): {cv['mean']:.4f} (+/- {cv['std'] * 2:.4f})")
 
     ensure_dir("../data/models")
     model_path = "../data/models/sentiment_model_v1.pkl"
@@ -145,7 +150,6 @@ def train_sentiment_model(
             }
         )
         mlflow.log_metrics(metrics)
-        mlflow.log_metric("cv_f1_weighted", cv_scores.mean())
         mlflow.log_artifact(model_path)
         mlflow.end_run()
 